@@ -0,0 +1,221 @@
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+import subprocess
+from contextlib import redirect_stdout
+from benchmarks.mock_spotify_api import MockSpotifyApi
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _result(name, items, seconds, requests, quantile, peak_bytes):
+    return {
+        'name': name, 'requests': requests, 'items': items, 'seconds': seconds,
+        'items_per_second': items / seconds if seconds else 0.0,
+        'p50_ms': quantile(0.5) * 1000, 'p90_ms': quantile(0.9) * 1000,
+        'p99_ms': quantile(0.99) * 1000, 'peak_mb': peak_bytes / 1024 / 1024,
+    }
+
+
+def _merged_latency(endpoints):
+    from spoterm.dao.request_stats import Histogram
+    histogram = Histogram()
+    for endpoint in endpoints:
+        latency = endpoint['latency_seconds']
+        cumulative = [latency['buckets'][str(b)] for b in histogram.buckets]
+        for i, count in enumerate(cumulative):
+            histogram.counts[i] += count - (cumulative[i - 1] if i else 0)
+        histogram.count += endpoint['requests']
+        histogram.sum += latency['sum']
+        histogram.max = max(histogram.max, latency['max'])
+    return histogram
+
+
+def _record_latencies(dao):
+    latencies = []
+    request = dao.session.request
+
+    def timed_request(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return request(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    dao.session.request = timed_request
+    return latencies
+
+
+def _bench_function(name, dao, run, trace_memory):
+    latencies = _record_latencies(dao)
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        items = run(dao)
+    seconds = time.perf_counter() - start
+    peak = 0
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return _result(name, items, seconds, len(latencies), lambda q: _percentile(latencies, q), peak)
+
+
+def _bench_script(name, argv, stdin_lines=None, items=None, stats=True):
+    with tempfile.TemporaryFile() as out, tempfile.TemporaryDirectory() as stats_dir:
+        stats_file = os.path.join(stats_dir, 'stats.json')
+        if stats:
+            argv = argv + ['--stats', 'json', '--stats-file', stats_file]
+        start = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, '-m', 'spoterm.cli'] + argv, stdin=subprocess.PIPE, stdout=out,
+                                stderr=subprocess.DEVNULL, universal_newlines=True)
+        proc.stdin.write('\n'.join(stdin_lines or []))
+        proc.stdin.close()
+        _, status, usage = os.wait4(proc.pid, 0)
+        seconds = time.perf_counter() - start
+        proc.returncode = os.WEXITSTATUS(status)
+        if proc.returncode:
+            raise RuntimeError(f'{name} exited with {proc.returncode}')
+        out.seek(0)
+        lines = len(out.read().splitlines())
+        endpoints = []
+        if stats:
+            with open(stats_file) as sf:
+                endpoints = json.load(sf)['endpoints']
+    latency = _merged_latency(endpoints)
+    return _result(name, items if items is not None else lines, seconds, latency.count, latency.quantile,
+                   usage.ru_maxrss * 1024)
+
+
+def _write_token_caches(token_cache_loc):
+    token = {'token': 'bench', 'token_expires': time.time() + 3600, 'refresh_token': 'bench'}
+    for name in ('.cc_token_cache.json', '.ac_token_cache.json'):
+        with open(os.path.join(token_cache_loc, name), 'w') as tc:
+            tc.write(json.dumps(token))
+
+
+def _bench_functions(server, token_cache_loc, concurrency, trace_memory):
+    from spoterm.dao.dao_factory import create_authorization_code_dao, create_client_credentials_dao
+    from spoterm.edit_playlist import add_tracks_to_playlist, delete_tracks_from_playlist, sync_playlist
+    from spoterm.get_my_followed_artists import get_my_followed_artists
+    from spoterm.get_my_playlists import get_my_playlists
+    from spoterm.get_playlist_tracks import get_playlist_tracks
+    from spoterm.track_info import get_track_data
+    from spoterm.export_library import export_library
+    from spoterm.search_library import search_library
+    from spoterm.dao.library_store import LibraryStore
+
+    cc_dao = create_client_credentials_dao('bench', 'bench', token_cache_loc, pool_size=concurrency)
+    ac_dao = create_authorization_code_dao('bench', 'bench', token_cache_loc, pool_size=concurrency)
+
+    playlists = [f'spotify:playlist:{p}' for p in server.playlist_ids]
+    track_uris = [u for p in server.playlist_ids for u in server.playlist(p)]
+    target, source = server.playlist_ids[0], server.playlist(server.playlist_ids[-1])
+    synced = server.playlist(target)[len(source) // 2:] + source[:len(source) // 2]
+    store = LibraryStore(os.path.join(token_cache_loc, 'bench_library.sqlite'))
+    queries = [(f'artist {i}', 'track', False) for i in range(100)]
+    queries += [('playlist', 'playlist', False), ('artst', 'artist', True), ('trak 1', 'track', True)]
+
+    benchmarks = [
+        ('get_track_data', cc_dao,
+         lambda dao: len(get_track_data(dao, track_uris, True, True, True, True, concurrency))),
+        ('get_playlist_tracks', cc_dao,
+         lambda dao: sum(len(t) for t in get_playlist_tracks(dao, playlists, concurrency).values())),
+        ('get_my_playlists', ac_dao, lambda dao: len(get_my_playlists(dao))),
+        ('get_my_followed_artists', ac_dao, lambda dao: len(get_my_followed_artists(dao))),
+        ('add_tracks_to_playlist', ac_dao,
+         lambda dao: add_tracks_to_playlist(dao, target, source, concurrency) and len(source)),
+        ('delete_tracks_from_playlist', ac_dao,
+         lambda dao: delete_tracks_from_playlist(dao, target, source, concurrency) and len(source)),
+        ('sync_playlist', ac_dao, lambda dao: sum(len(c) for c in sync_playlist(dao, target, synced, concurrency))),
+        ('export_library', ac_dao, lambda dao: export_library(dao, store, concurrency).playlist_tracks),
+        ('search_library', ac_dao,
+         lambda _: sum(len(search_library(store, query, kind, fuzzy=fuzzy)) for query, kind, fuzzy in queries)),
+    ]
+    try:
+        return [_bench_function(name, dao, run, trace_memory) for name, dao, run in benchmarks]
+    finally:
+        store.close()
+
+
+def _bench_scripts(server, token_cache_loc, concurrency):
+    library = os.path.join(token_cache_loc, 'library.sqlite')
+    playlists = [f'spotify:playlist:{p}' for p in server.playlist_ids]
+    track_uris = [u for p in server.playlist_ids for u in server.playlist(p)]
+    target, source = server.playlist_ids[0], server.playlist(server.playlist_ids[-1])
+    jobs = ['-j', str(concurrency)]
+    return [
+        _bench_script('spoterm track-info', ['track-info', '-f', 'ndjson', '-b', '-a', '-r', '-u'] + jobs,
+                      track_uris),
+        _bench_script('spoterm playlist-tracks', ['playlist-tracks'] + jobs, playlists),
+        _bench_script('spoterm my-playlists', ['my-playlists']),
+        _bench_script('spoterm followed-artists', ['followed-artists']),
+        _bench_script('spoterm edit-playlist', ['edit-playlist', '-p', target] + jobs, source, len(source)),
+        _bench_script('spoterm edit-playlist --delete', ['edit-playlist', '-p', target, '--delete'] + jobs,
+                      source, len(source)),
+        _bench_script('spoterm export', ['export', library] + jobs, items=len(track_uris)),
+        _bench_script('spoterm export (refresh)', ['export', library] + jobs, items=len(track_uris)),
+        _bench_script('spoterm search', ['search', library, 'artist', '1'], stats=False),
+        _bench_script('spoterm search --fuzzy', ['search', library, '--fuzzy', 'artst', '1'], stats=False),
+    ]
+
+
+def _print_results(results):
+    print(f'{"benchmark":34} {"requests":>8} {"items":>8} {"seconds":>8} {"items/s":>10} '
+          f'{"p50 ms":>8} {"p90 ms":>8} {"p99 ms":>8} {"peak MB":>8}')
+    for r in results:
+        print(f'{r["name"]:34} {r["requests"]:8} {r["items"]:8} {r["seconds"]:8.3f} {r["items_per_second"]:10.1f} '
+              f'{r["p50_ms"]:8.2f} {r["p90_ms"]:8.2f} {r["p99_ms"]:8.2f} {r["peak_mb"]:8.2f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run every command and core function against a mock Web API')
+    parser.add_argument('--playlists', type=int, default=10, help='Number of playlists served by the mock')
+    parser.add_argument('--tracks', type=int, default=250, help='Number of tracks per playlist')
+    parser.add_argument('--artists', type=int, default=200, help='Number of followed artists')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds the mock waits before every response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with a 503')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0,
+                        help='Fraction of requests answered with a 429')
+    parser.add_argument('--concurrency', '-j', type=int, default=4, help='Concurrency passed to every command')
+    parser.add_argument('--no-trace-memory', action='store_true',
+                        help='Skip tracemalloc for in process benchmarks, it slows them down noticeably')
+    parser.add_argument('--skip-scripts', action='store_true', help='Only benchmark functions in process')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON for regression tracking')
+    args = parser.parse_args()
+
+    server = MockSpotifyApi(playlists=args.playlists, tracks_per_playlist=args.tracks,
+                            followed_artists=args.artists, latency=args.latency, error_rate=args.error_rate,
+                            rate_limit_rate=args.rate_limit_rate)
+    with server, tempfile.TemporaryDirectory() as token_cache_loc:
+        os.environ.update({
+            'SPOTIFY_API_URL': server.api_url,
+            'SPOTIFY_ACCOUNTS_URL': server.accounts_url,
+            'SPOTIFY_CLIENT_ID': 'bench',
+            'SPOTIFY_CLIENT_SECRET': 'bench',
+            'SPOTIFY_TOKEN_CACHE_LOC': token_cache_loc,
+        })
+        _write_token_caches(token_cache_loc)
+        results = _bench_functions(server, token_cache_loc, args.concurrency, not args.no_trace_memory)
+        if not args.skip_scripts:
+            results += _bench_scripts(server, token_cache_loc, args.concurrency)
+
+    if args.json:
+        print(json.dumps({'results': results, 'statuses': dict(server.statuses)}, indent=2))
+    else:
+        _print_results(results)
+        print(f'mock responses by status: {dict(sorted(server.statuses.items()))}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from benchmarks.mock_spotify_api import MockSpotifyApi
+from spoterm.cli import SUBCOMMANDS
+
+
+TRACK_URI = 'spotify:track:' + '0' * 22
+
+
+def _time_command(command, env, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, env=env, check=True, stdout=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def _bench_env(token_cache_loc, api_url):
+    env = dict(os.environ)
+    env.update({
+        'SPOTIFY_CLIENT_ID': 'bench',
+        'SPOTIFY_CLIENT_SECRET': 'bench',
+        'SPOTIFY_TOKEN_CACHE_LOC': token_cache_loc,
+        'SPOTIFY_API_URL': api_url,
+    })
+    with open(os.path.join(token_cache_loc, '.cc_token_cache.json'), 'w') as tc:
+        tc.write(json.dumps({'token': 'bench', 'token_expires': time.time() + 3600}))
+    return env
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure import time and time to first request per subcommand')
+    parser.add_argument('--runs', '-n', type=int, default=5, help='Number of runs per measurement, best is kept')
+    parser.add_argument('--max-ms', '-m', type=float,
+                        help='Exit non-zero if any measurement is slower than this many milliseconds')
+    args = parser.parse_args()
+
+    results = {}
+    with MockSpotifyApi() as server, tempfile.TemporaryDirectory() as token_cache_loc:
+        env = _bench_env(token_cache_loc, server.api_url)
+        results['python startup'] = _time_command([sys.executable, '-c', 'pass'], env, args.runs)
+        for name, module in sorted(SUBCOMMANDS.items()):
+            results[f'import {name}'] = _time_command([sys.executable, '-c', f'import {module}'], env, args.runs)
+            results[f'{name} --help'] = _time_command(
+                [sys.executable, '-m', 'spoterm.cli', name, '--help'], env, args.runs)
+        results['track-info first request'] = _time_command(
+            [sys.executable, '-m', 'spoterm.cli', 'track-info', '-f', 'ndjson', TRACK_URI], env, args.runs)
+
+    for name, millis in results.items():
+        print(f'{name:32} {millis:8.1f} ms')
+
+    if args.max_ms is not None:
+        slow = [name for name, millis in results.items() if millis > args.max_ms]
+        if slow:
+            print(f'slower than {args.max_ms} ms: {", ".join(slow)}', file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
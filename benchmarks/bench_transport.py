@@ -0,0 +1,58 @@
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from spoterm.dao.http_session import create_session
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        body = json.dumps({'items': [{'track': {'uri': 'spotify:track:' + '0' * 22}}], 'next': None}).encode('UTF-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+def _run(get, url, requests_count):
+    start = time.perf_counter()
+    for _ in range(requests_count):
+        get(url).json()
+    return requests_count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare per-call connections against a pooled session')
+    parser.add_argument('--requests', '-n', type=int, default=500, help='Number of requests per run')
+    parser.add_argument('--url', '-u', type=str, help='URL to benchmark against, defaults to a local stub server')
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{server.server_address[1]}/v1/playlists/stub/tracks'
+
+    try:
+        before = _run(requests.get, url, args.requests)
+        after = _run(create_session().get, url, args.requests)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    print(f'requests.get:   {before:10.1f} req/s')
+    print(f'pooled session: {after:10.1f} req/s ({after / before:.2f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,343 @@
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlencode, urlparse, parse_qs
+
+
+TRACK_LIMIT = 50
+AUDIO_FEATURES_LIMIT = 100
+PLAYLIST_TRACKS_LIMIT = 100
+PAGE_LIMIT = 50
+ARTIST_LIMIT = 50
+COVER_WIDTHS = (640, 300, 64)
+MAX_COVER_UPLOAD = 256 * 1024
+JPEG_MAGIC = b'\xff\xd8\xff'
+
+
+def _spotify_id(prefix, index):
+    return f'{prefix}{index:0{22 - len(prefix)}d}'
+
+
+def _index(spotify_id):
+    return int(spotify_id[1:]) if spotify_id[1:].isdigit() else 0
+
+
+def _artist(artist_id):
+    index = _index(artist_id)
+    return {'uri': f'spotify:artist:{artist_id}', 'id': artist_id, 'name': f'Artist {index}',
+            'genres': [f'genre {index % 13}'], 'popularity': index % 100, 'followers': {'href': None, 'total': index}}
+
+
+def _release_date(index, i):
+    year = 2000 + (index + i) % 25
+    if i % 3 == 2:
+        return {'release_date': f'{year}', 'release_date_precision': 'year'}
+    return {'release_date': f'{year}-0{1 + i % 3}-01', 'release_date_precision': 'day'}
+
+
+def _releases(artist_id, count):
+    index = _index(artist_id)
+    return [dict({'uri': 'spotify:album:' + _spotify_id('r', index * count + i), 'name': f'Release {index}.{i}',
+                  'album_type': 'single' if i else 'album'}, **_release_date(index, i))
+            for i in range(count)]
+
+
+def _track(track_id):
+    index = _index(track_id)
+    return {
+        'uri': f'spotify:track:{track_id}', 'id': track_id, 'name': f'Track {track_id}',
+        'artists': [{'name': f'Artist {index % 97}', 'uri': 'spotify:artist:' + _spotify_id('a', index % 97)}],
+        'duration_ms': 120000 + index % 240000,
+        'album': {'name': f'Album {index % 211}', 'release_date': f'{1970 + index % 50}-01-01'},
+    }
+
+
+def _timestamp(offset):
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(1600000000 + offset * 60))
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    server: 'MockSpotifyApi'
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        self._handle('GET')
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        self._handle('POST')
+
+    def do_PUT(self):  # pylint: disable=invalid-name
+        self._handle('PUT')
+
+    def do_DELETE(self):  # pylint: disable=invalid-name
+        self._handle('DELETE')
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+    def _handle(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        parsed = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        injected = self.server.inject_error()
+        if injected is not None:
+            self._send(injected, {'error': {'status': injected, 'message': 'injected'}},
+                       {'Retry-After': str(self.server.retry_after)} if injected == 429 else None)
+            return
+
+        status, payload = self.server.route(method, parsed.path, query, body)
+        self._send(status, payload)
+
+    def _send(self, status, payload, headers=None):
+        if isinstance(payload, bytes):
+            body, content_type = payload, 'image/jpeg'
+        else:
+            body, content_type = json.dumps(payload).encode('UTF-8') if payload is not None else b'', 'application/json'
+        etag = None
+        if status == 200 and self.command == 'GET':
+            etag = '"' + hashlib.md5(body).hexdigest() + '"'
+            if self.headers.get('If-None-Match') == etag:
+                status, body = 304, b''
+        self.server.record(status)
+        self.send_response(status)
+        if etag is not None:
+            self.send_header('ETag', etag)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MockSpotifyApi(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, playlists=10, tracks_per_playlist=250, followed_artists=200,
+                 saved_tracks=300, releases_per_artist=3, latency=0.0, error_rate=0.0, rate_limit_rate=0.0,
+                 retry_after=0, seed=0):
+        super().__init__((host, port), _MockHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.followed_artists = followed_artists
+        self.saved_tracks = saved_tracks
+        self.releases_per_artist = releases_per_artist
+        self.statuses = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._playlists = {}
+        for p in range(playlists):
+            self._playlists[_spotify_id('p', p)] = [
+                'spotify:track:' + _spotify_id('t', p * tracks_per_playlist + t) for t in range(tracks_per_playlist)]
+        self._snapshots = Counter()
+        self.image_downloads = Counter()
+        self.covers = {}
+
+    @property
+    def base_url(self):
+        return f'http://{self.server_address[0]}:{self.server_address[1]}'
+
+    @property
+    def api_url(self):
+        return f'{self.base_url}/v1'
+
+    @property
+    def accounts_url(self):
+        return self.base_url
+
+    @property
+    def playlist_ids(self):
+        return list(self._playlists)
+
+    def playlist(self, playlist_id):
+        with self._lock:
+            return list(self._playlists[playlist_id])
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def inject_error(self):
+        with self._lock:
+            roll = self._random.random()
+        if roll < self.rate_limit_rate:
+            return 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 503
+        return None
+
+    def record(self, status):
+        with self._lock:
+            self.statuses[status] += 1
+
+    def route(self, method, path, query, body):
+        parts = path.strip('/').split('/')
+        if path == '/api/token' and method == 'POST':
+            return 200, {'access_token': 'mock-token', 'token_type': 'Bearer', 'expires_in': 3600}
+        if method == 'GET' and parts[0] == 'images' and len(parts) == 2:
+            with self._lock:
+                self.image_downloads[parts[1]] += 1
+            width = int(parts[1].rsplit('.', 1)[0].rsplit('-', 1)[-1])
+            return 200, JPEG_MAGIC + bytes(width * width // 2)
+        if parts[0] != 'v1':
+            return 404, {'error': {'status': 404, 'message': 'not found'}}
+        parts = parts[1:]
+
+        if method == 'GET' and parts == ['tracks']:
+            ids = query.get('ids', '').split(',')[:TRACK_LIMIT]
+            return 200, {'tracks': [_track(i) for i in ids]}
+        if method == 'GET' and parts == ['audio-features']:
+            ids = query.get('ids', '').split(',')[:AUDIO_FEATURES_LIMIT]
+            return 200, {'audio_features': [{'uri': f'spotify:track:{i}', 'tempo': 60 + sum(map(ord, i)) % 120 + 0.4}
+                                            for i in ids]}
+        if method == 'GET' and parts == ['artists']:
+            ids = query.get('ids', '').split(',')
+            if len(ids) > ARTIST_LIMIT:
+                return 400, {'error': {'status': 400, 'message': 'Too many ids requested'}}
+            return 200, {'artists': [_artist(i) for i in ids]}
+        if method == 'GET' and len(parts) == 3 and parts[0] == 'artists':
+            if 'market' not in query:
+                return 400, {'error': {'status': 400, 'message': 'Missing market'}}
+            if parts[2] == 'albums':
+                return 200, self._page(path, query, _releases(parts[1], self.releases_per_artist), PAGE_LIMIT)
+            if parts[2] == 'top-tracks':
+                return 200, {'tracks': [_track(_spotify_id('t', _index(parts[1]) * 10 + i)) for i in range(10)]}
+        if method == 'GET' and len(parts) == 2 and parts[0] == 'albums':
+            return 200, {'images': [{'url': f'{self.base_url}/images/{parts[1]}-{w}.jpg', 'width': w, 'height': w}
+                                    for w in COVER_WIDTHS]}
+        if method == 'GET' and parts == ['me', 'playlists']:
+            with self._lock:
+                playlists = [{'uri': f'spotify:playlist:{p}', 'name': f'Playlist {p}',
+                              'snapshot_id': self._snapshot_id(p)} for p in self._playlists]
+            return 200, self._page(path, query, playlists, PAGE_LIMIT)
+        if method == 'GET' and parts == ['me', 'tracks']:
+            saved = [{'added_at': _timestamp(-i), 'track': _track(_spotify_id('s', i))}
+                     for i in range(self.saved_tracks)]
+            return 200, self._page(path, query, saved, PAGE_LIMIT)
+        if method == 'GET' and parts == ['me', 'following']:
+            return 200, {'artists': self._cursor_page(path, query)}
+        if len(parts) >= 2 and parts[0] == 'playlists':
+            if parts[1] not in self._playlists:
+                return 404, {'error': {'status': 404, 'message': 'Invalid playlist Id'}}
+            return self._playlist_route(method, path, parts[1], parts[2:], query, body)
+        return 404, {'error': {'status': 404, 'message': 'not found'}}
+
+    def _playlist_route(self, method, path, playlist_id, rest, query, body):
+        with self._lock:
+            tracks = self._playlists[playlist_id]
+            if method == 'GET' and not rest:
+                return 200, {'id': playlist_id, 'name': f'Playlist {playlist_id}',
+                             'snapshot_id': self._snapshot_id(playlist_id), 'tracks': {'total': len(tracks)},
+                             'images': [{'url': f'{self.base_url}/images/{playlist_id}-300.jpg', 'width': None}]}
+            if method == 'GET' and rest == ['tracks']:
+                return 200, self._page(path, query, [{'added_at': _timestamp(i), 'track': _track(u.rsplit(':', 1)[-1])}
+                                                     for i, u in enumerate(tracks)], PLAYLIST_TRACKS_LIMIT)
+            if method == 'POST' and rest == ['tracks']:
+                request = json.loads(body)
+                position = request.get('position', len(tracks))
+                if position > len(tracks):
+                    return 400, {'error': {'status': 400, 'message': 'Index out of bounds'}}
+                tracks[position:position] = request['uris']
+            elif method == 'PUT' and rest == ['tracks']:
+                request = json.loads(body)
+                start, length, before = request['range_start'], request.get('range_length', 1), request['insert_before']
+                if start + length > len(tracks) or before > len(tracks):
+                    return 400, {'error': {'status': 400, 'message': 'Index out of bounds'}}
+                moved = tracks[start:start + length]
+                del tracks[start:start + length]
+                before -= length if before > start else 0
+                tracks[before:before] = moved
+            elif method == 'DELETE' and rest == ['tracks']:
+                removed = {t['uri'] for t in json.loads(body)['tracks']}
+                tracks[:] = [u for u in tracks if u not in removed]
+            elif method == 'PUT' and rest == ['images']:
+                if len(body) > MAX_COVER_UPLOAD:
+                    return 413, {'error': {'status': 413, 'message': 'Payload too large'}}
+                self.covers[playlist_id] = body
+                return 202, None
+            else:
+                return 404, {'error': {'status': 404, 'message': 'not found'}}
+            self._snapshots[playlist_id] += 1
+            return 201 if method == 'POST' else 200, {'snapshot_id': self._snapshot_id(playlist_id)}
+
+    def _snapshot_id(self, playlist_id):
+        return f'{playlist_id}-{self._snapshots[playlist_id]}'
+
+    def _page(self, path, query, items, max_limit):
+        limit = min(int(query.get('limit', max_limit)), max_limit)
+        offset = int(query.get('offset', 0))
+        next_url = None
+        if offset + limit < len(items):
+            next_query = urlencode(dict(query, limit=limit, offset=offset + limit))
+            next_url = f'{self.base_url}{path}?{next_query}'
+        return {'items': items[offset:offset + limit], 'total': len(items), 'limit': limit, 'offset': offset,
+                'next': next_url}
+
+    def _cursor_page(self, path, query):
+        limit = min(int(query.get('limit', PAGE_LIMIT)), PAGE_LIMIT)
+        after = int(query.get('after', -1))
+        indexes = range(after + 1, min(after + 1 + limit, self.followed_artists))
+        items = [{'uri': 'spotify:artist:' + _spotify_id('a', i), 'name': f'Artist {i}'} for i in indexes]
+        next_url = None
+        if indexes and indexes[-1] + 1 < self.followed_artists:
+            next_url = f'{self.base_url}{path}?type=artist&limit={limit}&after={indexes[-1]}'
+        return {'items': items, 'total': self.followed_artists, 'limit': limit, 'next': next_url,
+                'cursors': {'after': str(indexes[-1]) if indexes else None}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a local mock of the Spotify Web API')
+    parser.add_argument('--port', '-p', type=int, default=0, help='Port to listen on, defaults to a free port')
+    parser.add_argument('--playlists', type=int, default=10, help='Number of playlists to serve')
+    parser.add_argument('--tracks', type=int, default=250, help='Number of tracks per playlist')
+    parser.add_argument('--artists', type=int, default=200, help='Number of followed artists')
+    parser.add_argument('--saved-tracks', type=int, default=300, help='Number of saved tracks')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds to wait before every response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with a 503')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0,
+                        help='Fraction of requests answered with a 429')
+    parser.add_argument('--retry-after', type=int, default=0, help='Retry-After seconds sent with a 429')
+    args = parser.parse_args()
+
+    server = MockSpotifyApi(port=args.port, playlists=args.playlists, tracks_per_playlist=args.tracks,
+                            followed_artists=args.artists, saved_tracks=args.saved_tracks, latency=args.latency,
+                            error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+                            retry_after=args.retry_after)
+    print(f'SPOTIFY_API_URL={server.api_url}')
+    print(f'SPOTIFY_ACCOUNTS_URL={server.accounts_url}')
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
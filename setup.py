@@ -15,6 +15,18 @@ selenium_requires = [
     "selenium == 3.141.0"
 ]
 
+async_requires = [
+    "aiohttp == 3.7.4"
+]
+
+json_requires = [
+    "orjson == 3.5.2"
+]
+
+image_requires = [
+    "Pillow == 8.2.0"
+]
+
 test_requires = [
     "pytest == 5.3.5",
     "pytest-mock == 3.6.1",
@@ -31,25 +43,34 @@ packages = [
     "spoterm.authorization.login",
     "spoterm.config",
     "spoterm.dao",
+    "spoterm.util",
 ]
 
 setup(
     packages=packages,
     version=0.1,
     name="spoterm",
+    python_requires=">=3.7",
     install_requires=install_requires,
     extras_require={
         "qt": qt_requires,
         "test": test_requires,
-        "selenium": selenium_requires
+        "selenium": selenium_requires,
+        "async": async_requires,
+        "json": json_requires,
+        "image": image_requires
     },
     entry_points={
         'console_scripts': [
-            'edit_playlist = spoterm.edit_playlist:main',
-            'get_my_followed_artists = spoterm.get_my_followed_artists:main',
-            'get_my_playlists = spoterm.get_my_playlists:main',
-            'get_playlist_tracks = spoterm.get_playlist_tracks:main',
-            'track_info = spoterm.track_info:main',
+            'spoterm = spoterm.cli:main',
+            'spoterm_daemon = spoterm.daemon:main',
+            'edit_playlist = spoterm.cli:edit_playlist',
+            'export_library = spoterm.cli:export_library',
+            'get_my_followed_artists = spoterm.cli:get_my_followed_artists',
+            'get_my_playlists = spoterm.cli:get_my_playlists',
+            'get_playlist_tracks = spoterm.cli:get_playlist_tracks',
+            'search_library = spoterm.cli:search_library',
+            'track_info = spoterm.cli:track_info',
         ],
     }
 )
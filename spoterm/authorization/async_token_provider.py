@@ -0,0 +1,26 @@
+import asyncio
+from typing import Optional
+from datetime import datetime
+from spoterm.authorization.spotify_token_provider import SpotifyTokenProvider
+
+
+class AsyncTokenProvider:
+
+    def __init__(self, token_provider: SpotifyTokenProvider) -> None:
+        self.token_provider = token_provider
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def get_token(self) -> str:
+        if self._is_valid():
+            return self.token_provider.token
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._is_valid():
+                return self.token_provider.token
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(None, self.token_provider.get_token)
+
+    def _is_valid(self) -> bool:
+        return (bool(self.token_provider.token)
+                and self.token_provider.token_expires - self.token_provider.refresh_margin >= datetime.now())
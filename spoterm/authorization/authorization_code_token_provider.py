@@ -4,22 +4,24 @@ from datetime import datetime
 from datetime import timedelta
 import uuid
 import requests
+from spoterm.config.env import ACCOUNTS_URL
 from spoterm.authorization.spotify_token_provider import SpotifyTokenProvider
 from spoterm.authorization.login.login_handler import LoginHandler
 
 
 class AuthorizationCodeTokenProvider(SpotifyTokenProvider):
 
-    AUTHORIZE_URL = 'https://accounts.spotify.com/authorize'
+    AUTHORIZE_URL = f'{ACCOUNTS_URL}/authorize'
 
     def __init__(self, client_id: str, client_secret: str, scopes: List[str],
                  redirect_uri: str, login_handler: LoginHandler,
-                 token_cache: Optional[str] = None) -> None:
+                 token_cache: Optional[str] = None, session: Optional[requests.Session] = None,
+                 refresh_margin: float = 0) -> None:
         self.scopes = scopes
         self.redirect_uri = redirect_uri
         self.login_handler = login_handler
         self.state = str(uuid.uuid4())
-        super().__init__(client_id, client_secret, token_cache)
+        super().__init__(client_id, client_secret, token_cache, session, refresh_margin)
 
     def _renew_token(self) -> None:
         if self.refresh_token is not None:
@@ -31,13 +33,16 @@ class AuthorizationCodeTokenProvider(SpotifyTokenProvider):
         headers = {'Authorization': 'Basic {}'.format(self._encode_client_credentials())}
 
         now = datetime.now()
-        response = requests.post(self.TOKEN_URL, data=params, headers=headers)
+        response = self.session.post(self.TOKEN_URL, data=params, headers=headers)
         response.raise_for_status()
         result = response.json()
         self.token = result['access_token']
         self.refresh_token = result.get('refresh_token', self.refresh_token)
         self.token_expires = now + timedelta(seconds=result['expires_in'])
 
+    def _can_refresh_in_background(self) -> bool:
+        return self.refresh_token is not None
+
     def _get_new_authorization_code(self):
         params = {'client_id': self.client_id, 'response_type': 'code', 'redirect_uri': self.redirect_uri,
                   'scope': ' '.join(self.scopes), 'state': self.state}
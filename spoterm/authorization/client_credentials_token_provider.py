@@ -1,6 +1,5 @@
 from datetime import datetime
 from datetime import timedelta
-import requests
 from spoterm.authorization.spotify_token_provider import SpotifyTokenProvider
 
 
@@ -10,7 +9,7 @@ class ClientCredentialsTokenProvider(SpotifyTokenProvider):
         params = {'grant_type': 'client_credentials'}
         headers = {'Authorization': 'Basic {}'.format(self._encode_client_credentials())}
         now = datetime.now()
-        response = requests.post(self.TOKEN_URL, data=params, headers=headers)
+        response = self.session.post(self.TOKEN_URL, data=params, headers=headers)
         response.raise_for_status()
         result = response.json()
         self.token = result['access_token']
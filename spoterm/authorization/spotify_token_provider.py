@@ -1,50 +1,141 @@
 import os
 import json
-from typing import Optional
+import time
+import threading
+from contextlib import nullcontext
+from typing import ContextManager, Dict, Optional
 from abc import ABC, abstractmethod
 import base64
-from datetime import datetime
+from datetime import datetime, timedelta
+import requests
+from spoterm.config.env import ACCOUNTS_URL
+from spoterm.dao.http_session import create_session
+from spoterm.util.file_utils import file_lock, write_atomic
+
+
+class TokenRefreshMetrics:
+
+    def __init__(self) -> None:
+        self.refreshes = 0
+        self.failed_refreshes = 0
+        self.coalesced_callers = 0
+        self.refresh_seconds = 0.0
+        self.max_refresh_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record_refresh(self, seconds: float, failed: bool = False) -> None:
+        with self._lock:
+            self.refreshes += 1
+            self.failed_refreshes += int(failed)
+            self.refresh_seconds += seconds
+            self.max_refresh_seconds = max(self.max_refresh_seconds, seconds)
+
+    def record_coalesced(self) -> None:
+        with self._lock:
+            self.coalesced_callers += 1
+
+    def as_dict(self) -> Dict[str, float]:
+        with self._lock:
+            return {'refreshes': self.refreshes, 'failed_refreshes': self.failed_refreshes,
+                    'coalesced_callers': self.coalesced_callers, 'refresh_seconds': self.refresh_seconds,
+                    'max_refresh_seconds': self.max_refresh_seconds}
 
 
 class SpotifyTokenProvider(ABC):
 
-    TOKEN_URL = 'https://accounts.spotify.com/api/token'
+    TOKEN_URL = f'{ACCOUNTS_URL}/api/token'
 
     def __init__(self, client_id: str, client_secret: str,
-                 token_cache: Optional[str] = None) -> None:
+                 token_cache: Optional[str] = None, session: Optional[requests.Session] = None,
+                 refresh_margin: float = 0) -> None:
         self.client_id = client_id
         self.client_secret = client_secret
         self.token_cache = token_cache
+        self.session = session if session is not None else create_session()
+        self.refresh_margin = timedelta(seconds=refresh_margin)
+        self.metrics = TokenRefreshMetrics()
+        self._refresh_lock = threading.Lock()
+        self._background_refresh: Optional[threading.Thread] = None
         self._init_token()
 
     def get_token(self) -> str:
-        if not self.token or self.token_expires < datetime.now():
-            self._renew_token()
-            self._save_token_to_cache()
+        if self._needs_refresh(timedelta(0)):
+            self._refresh(timedelta(0))
+        elif self.refresh_margin and self._needs_refresh(self.refresh_margin) and self._can_refresh_in_background():
+            self._start_background_refresh()
         return self.token
 
+    def _needs_refresh(self, margin: timedelta) -> bool:
+        return not self.token or self.token_expires - margin < datetime.now()
+
+    def _refresh(self, margin: timedelta) -> None:
+        with self._refresh_lock, self._lock_token_cache():
+            self._load_token_from_cache()
+            if not self._needs_refresh(margin):
+                self.metrics.record_coalesced()
+                return
+            start = time.perf_counter()
+            try:
+                self._renew_token()
+            except Exception:
+                self.metrics.record_refresh(time.perf_counter() - start, failed=True)
+                raise
+            self.metrics.record_refresh(time.perf_counter() - start)
+            self._save_token_to_cache()
+
+    def _start_background_refresh(self) -> None:
+        if not self._refresh_lock.acquire(blocking=False):  # pylint: disable=consider-using-with
+            return
+        try:
+            if self._background_refresh is not None and self._background_refresh.is_alive():
+                return
+            self._background_refresh = threading.Thread(target=self._refresh_quietly, daemon=True)
+            self._background_refresh.start()
+        finally:
+            self._refresh_lock.release()
+
+    def _refresh_quietly(self) -> None:
+        try:
+            self._refresh(self.refresh_margin)
+        except Exception:  # pylint: disable=broad-except
+            pass  # get_token renews in the foreground once the token has actually expired
+
+    def _can_refresh_in_background(self) -> bool:
+        return True
+
     def _init_token(self) -> None:
-        if self.token_cache is not None and os.path.exists(self.token_cache):
+        self.token = ''
+        self.token_expires = datetime.now()
+        self.refresh_token = None
+        self._load_token_from_cache()
+
+    def _load_token_from_cache(self) -> None:
+        if self.token_cache is None or not os.path.exists(self.token_cache):
+            return
+        try:
             with open(self.token_cache, 'r') as tc:
                 token_data = json.loads(tc.read())
-                self.token = token_data['token']
-                self.token_expires = datetime.fromtimestamp(token_data['token_expires'])
-                self.refresh_token = token_data.get('refresh_token')
-        else:
-            self.token = ''
-            self.token_expires = datetime.now()
-            self.refresh_token = None
+            token, token_expires = token_data['token'], datetime.fromtimestamp(token_data['token_expires'])
+            refresh_token = token_data.get('refresh_token', self.refresh_token)
+        except (ValueError, KeyError, TypeError):
+            return
+        if not self.token or token_expires > self.token_expires:
+            self.token = token
+            self.token_expires = token_expires
+            self.refresh_token = refresh_token
+
+    def _lock_token_cache(self) -> ContextManager:
+        return file_lock(f'{self.token_cache}.lock') if self.token_cache is not None else nullcontext()
 
     def _save_token_to_cache(self) -> None:
         if self.token_cache is not None:
-            with open(self.token_cache, 'w') as tc:
-                token_data = {
-                    'token': self.token,
-                    'token_expires': datetime.timestamp(self.token_expires)
-                }
-                if self.refresh_token is not None:
-                    token_data['refresh_token'] = self.refresh_token
-                tc.write(json.dumps(token_data))
+            token_data = {
+                'token': self.token,
+                'token_expires': datetime.timestamp(self.token_expires)
+            }
+            if self.refresh_token is not None:
+                token_data['refresh_token'] = self.refresh_token
+            write_atomic(self.token_cache, json.dumps(token_data))
 
     @abstractmethod
     def _renew_token(self) -> None:  # pragma: no cover
@@ -0,0 +1,65 @@
+import os
+import sys
+import importlib
+from typing import Callable, List, Optional
+
+
+SUBCOMMANDS = {
+    'daemon': 'spoterm.daemon',
+    'edit-playlist': 'spoterm.edit_playlist',
+    'export': 'spoterm.export_library',
+    'followed-artists': 'spoterm.get_my_followed_artists',
+    'my-playlists': 'spoterm.get_my_playlists',
+    'playlist-tracks': 'spoterm.get_playlist_tracks',
+    'search': 'spoterm.search_library',
+    'track-info': 'spoterm.track_info',
+}
+
+
+def _usage() -> str:
+    return 'usage: spoterm <subcommand> [args...]\n\nsubcommands:\n' + \
+           '\n'.join(f'  {name}' for name in sorted(SUBCOMMANDS))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ('-h', '--help'):
+        print(_usage())
+        return
+    if argv[0] not in SUBCOMMANDS:
+        print(f'spoterm: unknown subcommand {argv[0]!r}\n\n{_usage()}', file=sys.stderr)
+        sys.exit(2)
+
+    if argv[0] != 'daemon':
+        _forward(argv[0], argv[1:])
+
+    sys.argv = [f'spoterm {argv[0]}'] + argv[1:]
+    importlib.import_module(SUBCOMMANDS[argv[0]]).main()
+
+
+def _forward(subcommand: str, argv: List[str]) -> None:
+    from spoterm.config.env import DAEMON_SOCKET  # pylint: disable=import-outside-toplevel
+    if os.path.exists(DAEMON_SOCKET):
+        from spoterm.daemon import forward  # pylint: disable=import-outside-toplevel
+        code = forward(subcommand, argv, DAEMON_SOCKET)
+        if code is not None:
+            sys.exit(code)
+
+
+def _entry_point(subcommand: str) -> Callable[[], None]:
+    def run() -> None:
+        main([subcommand] + sys.argv[1:])
+    return run
+
+
+edit_playlist = _entry_point('edit-playlist')
+export_library = _entry_point('export')
+get_my_followed_artists = _entry_point('followed-artists')
+get_my_playlists = _entry_point('my-playlists')
+get_playlist_tracks = _entry_point('playlist-tracks')
+search_library = _entry_point('search')
+track_info = _entry_point('track-info')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,15 @@
+import os
+
+API_URL = os.environ.get('SPOTIFY_API_URL', 'https://api.spotify.com/v1')
+ACCOUNTS_URL = os.environ.get('SPOTIFY_ACCOUNTS_URL', 'https://accounts.spotify.com')
+
 REDIRECT_URI = 'http://localhost/'
 
+TOKEN_REFRESH_MARGIN = 60
+
+DAEMON_SOCKET = os.environ.get('SPOTERM_SOCKET') or os.path.join(
+    os.environ.get('XDG_RUNTIME_DIR') or '/tmp', f'spoterm-{os.getuid() if hasattr(os, "getuid") else 0}.sock')
+
 SPOTIFY_AUTH_SCOPES = {'follow': ['user-follow-read', 'user-follow-modify'],
                        'listening_history': ['user-read-recently-played', 'user-top-read'],
                        'users': ['user-read-birthdate', 'user-read-email', 'user-read-private'],
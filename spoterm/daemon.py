@@ -0,0 +1,269 @@
+import io
+import os
+import sys
+import json
+import signal
+import socket
+import struct
+import argparse
+import importlib
+import threading
+import traceback
+from typing import BinaryIO, Dict, List, Mapping, Optional, Tuple
+from spoterm.config.env import DAEMON_SOCKET
+
+
+FORWARDED_ENV_PREFIXES = ('SPOTIFY_', 'CHROME_DRIVER_PATH')
+OUTPUT_BUFFER = 8192
+STDIN_CHUNK = 64 * 1024
+ACCEPTED, FALLBACK, STDOUT, STDERR, EXIT = b'a', b'f', b'o', b'e', b'x'
+
+_FRAME_HEADER = struct.Struct('>cI')
+_run_lock = threading.Lock()
+
+
+def _send_frame(sock: socket.socket, kind: bytes, data: bytes = b'') -> None:
+    sock.sendall(_FRAME_HEADER.pack(kind, len(data)) + data)
+
+
+def _read_exactly(rfile: BinaryIO, size: int) -> Optional[bytes]:
+    data = rfile.read(size)
+    return data if len(data) == size else None
+
+
+def _read_frame(rfile: BinaryIO) -> Optional[Tuple[bytes, bytes]]:
+    header = _read_exactly(rfile, _FRAME_HEADER.size)
+    if header is None:
+        return None
+    kind, size = _FRAME_HEADER.unpack(header)
+    data = _read_exactly(rfile, size)
+    return (kind, data) if data is not None else None
+
+
+def forwarded_env(environ: Mapping[str, str]) -> Dict[str, str]:
+    return {k: v for k, v in environ.items() if k.startswith(FORWARDED_ENV_PREFIXES)}
+
+
+def _subcommands() -> Dict[str, str]:
+    from spoterm.cli import SUBCOMMANDS  # pylint: disable=import-outside-toplevel
+    return {name: module for name, module in SUBCOMMANDS.items() if module != __name__}
+
+
+class _FrameWriter(io.TextIOBase):
+
+    def __init__(self, sock: socket.socket, kind: bytes, lock: threading.Lock, buffer_size: int) -> None:
+        super().__init__()
+        self._sock = sock
+        self._kind = kind
+        self._lock = lock
+        self._buffer_size = buffer_size
+        self._buffer: List[str] = []
+        self._size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        self._buffer.append(text)
+        self._size += len(text)
+        if self._size >= self._buffer_size:
+            self.flush()
+        return len(text)
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        data = ''.join(self._buffer).encode('UTF-8')
+        self._buffer, self._size = [], 0
+        with self._lock:
+            _send_frame(self._sock, self._kind, data)
+
+
+def _exit_code(error: SystemExit, stderr: _FrameWriter) -> int:
+    if error.code is None or isinstance(error.code, int):
+        return error.code or 0
+    stderr.write(f'{error.code}\n')
+    return 1
+
+
+def _run(conn: socket.socket, rfile: BinaryIO, command: str, module: str, argv: List[str], cwd: str) -> int:
+    lock = threading.Lock()
+    stdout = _FrameWriter(conn, STDOUT, lock, OUTPUT_BUFFER)
+    stderr = _FrameWriter(conn, STDERR, lock, 0)
+    stdin = io.TextIOWrapper(rfile, encoding='UTF-8')
+    saved = sys.stdin, sys.stdout, sys.stderr, sys.argv, os.getcwd()
+    sys.stdin, sys.stdout, sys.stderr = stdin, stdout, stderr  # type: ignore
+    sys.argv = [f'spoterm {command}'] + argv
+    try:
+        os.chdir(cwd)
+        importlib.import_module(module).main(argv)
+        code = 0
+    except SystemExit as e:
+        code = _exit_code(e, stderr)
+    except Exception:  # pylint: disable=broad-except
+        traceback.print_exc(file=stderr)
+        code = 1
+    finally:
+        sys.stdin, sys.stdout, sys.stderr, sys.argv = saved[:4]
+        os.chdir(saved[4])
+    stdout.flush()
+    stderr.flush()
+    return code
+
+
+def _handle(conn: socket.socket, env: Dict[str, str], stop: threading.Event, server: socket.socket) -> None:
+    with conn:
+        rfile = conn.makefile('rb')
+        try:
+            request = json.loads(rfile.readline())
+            if request.get('stop'):
+                stop.set()
+                server.shutdown(socket.SHUT_RDWR)
+                _send_frame(conn, EXIT, b'0')
+                return
+            subcommands = _subcommands()
+            if request.get('command') not in subcommands or request.get('env') != env or \
+                    not os.path.isdir(request.get('cwd') or ''):
+                _send_frame(conn, FALLBACK, b'unknown command, or environment or directory not usable by the daemon')
+                return
+            if not _run_lock.acquire(blocking=False):  # pylint: disable=consider-using-with
+                _send_frame(conn, FALLBACK, b'the daemon is running another command')
+                return
+            try:
+                _send_frame(conn, ACCEPTED)
+                code = _run(conn, rfile, request['command'], subcommands[request['command']],
+                            request.get('argv', []), request['cwd'])
+            finally:
+                _run_lock.release()
+            _send_frame(conn, EXIT, str(code).encode('ascii'))
+        except (OSError, ValueError):
+            pass
+
+
+def _connect(path: str) -> Optional[socket.socket]:
+    if not hasattr(socket, 'AF_UNIX') or not os.path.exists(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def _pump_stdin(sock: socket.socket) -> None:
+    try:
+        fd = sys.stdin.fileno()
+        for chunk in iter(lambda: os.read(fd, STDIN_CHUNK), b''):
+            sock.sendall(chunk)
+    except (AttributeError, OSError, ValueError):
+        pass
+    try:
+        sock.shutdown(socket.SHUT_WR)
+    except OSError:
+        pass
+
+
+def forward(command: str, argv: List[str], path: str = DAEMON_SOCKET) -> Optional[int]:
+    if os.environ.get('SPOTERM_NO_DAEMON'):
+        return None
+    sock = _connect(path)
+    if sock is None:
+        return None
+    request = {'command': command, 'argv': argv, 'cwd': os.getcwd(), 'env': forwarded_env(os.environ)}
+    with sock:
+        rfile = sock.makefile('rb')
+        try:
+            sock.sendall(json.dumps(request).encode('UTF-8') + b'\n')
+            frame = _read_frame(rfile)
+        except OSError:
+            return None
+        if frame is None or frame[0] != ACCEPTED:
+            return None
+        threading.Thread(target=_pump_stdin, args=(sock,), daemon=True).start()
+        try:
+            for kind, data in iter(lambda: _read_frame(rfile), None):
+                if kind == EXIT:
+                    return int(data)
+                out = sys.stdout if kind == STDOUT else sys.stderr
+                out.buffer.write(data)
+                out.buffer.flush()
+        except BrokenPipeError:
+            return 1
+    print('spoterm: lost connection to the daemon', file=sys.stderr)
+    return 1
+
+
+def serve(path: str = DAEMON_SOCKET, ready: Optional[threading.Event] = None) -> None:
+    from spoterm.dao.dao_factory import keep_warm  # pylint: disable=import-outside-toplevel
+    keep_warm()
+    for module in _subcommands().values():
+        importlib.import_module(module)
+
+    sock = _connect(path)
+    if sock is not None:
+        sock.close()
+        raise SystemExit(f'spoterm daemon is already listening on {path}')
+    if os.path.exists(path):
+        os.unlink(path)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    umask = os.umask(0o177)
+    try:
+        server.bind(path)
+    finally:
+        os.umask(umask)
+    server.listen(64)
+    env = forwarded_env(os.environ)
+    print(f'spoterm daemon listening on {path}', file=sys.stderr)
+    if ready is not None:
+        ready.set()
+    stop = threading.Event()
+    try:
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                if stop.is_set():
+                    break
+                raise
+            threading.Thread(target=_handle, args=(conn, env, stop, server), daemon=True).start()
+    finally:
+        server.close()
+        os.unlink(path)
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Arguments')
+    parser.add_argument('--socket', '-S', type=str, default=DAEMON_SOCKET,
+                        help='Unix socket to listen on, spoterm commands forward to it while it runs')
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument('--stop', action='store_true', help='Stop the running daemon')
+    action.add_argument('--status', action='store_true', help='Exit with 0 if the daemon is running, 1 if not')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+
+    if args.stop or args.status:
+        sock = _connect(args.socket)
+        if sock is None:
+            print(f'spoterm daemon is not running on {args.socket}', file=sys.stderr)
+            sys.exit(1)
+        with sock:
+            if args.stop:
+                sock.sendall(json.dumps({'stop': True}).encode('UTF-8') + b'\n')
+                _read_frame(sock.makefile('rb'))
+        return
+
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        serve(args.socket)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
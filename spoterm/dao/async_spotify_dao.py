@@ -0,0 +1,101 @@
+import time
+import asyncio
+from typing import Callable, Dict, Any, List, Optional
+import aiohttp
+from spoterm.authorization.async_token_provider import AsyncTokenProvider
+from spoterm.dao.fields import apply_fields
+from spoterm.dao.http_session import DEFAULT_POOL_SIZE, DEFAULT_TIMEOUT
+from spoterm.dao.request_scheduler import RequestScheduler
+from spoterm.dao.request_stats import RequestEvent, endpoint_template
+from spoterm.util.json_utils import loads, project
+
+
+def create_async_session(pool_size: int = DEFAULT_POOL_SIZE) -> aiohttp.ClientSession:
+    connect_timeout, read_timeout = DEFAULT_TIMEOUT
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=pool_size),
+        timeout=aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout),
+        headers={'Accept-Encoding': 'gzip, deflate'}
+    )
+
+
+class AsyncSpotifyDao:
+
+    def __init__(self, token_provider: AsyncTokenProvider, session: Optional[aiohttp.ClientSession] = None,
+                 scheduler: Optional[RequestScheduler] = None, pool_size: int = DEFAULT_POOL_SIZE,
+                 hooks: Optional[List[Callable[[RequestEvent], None]]] = None) -> None:
+        self.token_provider = token_provider
+        self.session = session
+        self.scheduler = scheduler if scheduler is not None else RequestScheduler()
+        self.pool_size = pool_size
+        self.hooks = list(hooks) if hooks is not None else []
+
+    async def __aenter__(self) -> 'AsyncSpotifyDao':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _get_auth_headers(self):
+        return {'Authorization': f'Bearer {await self.token_provider.get_token()}'}
+
+    async def _request(self, method: str, url: str, content_type: Optional[str] = None, payload: Any = None):
+        if self.session is None:
+            self.session = create_async_session(self.pool_size)
+
+        attempt = 0
+        token_wait = 0.0
+        start = time.perf_counter()
+        while True:
+            await self._sleep(self.scheduler.acquire_delay())
+            token_start = time.perf_counter()
+            headers = await self._get_auth_headers()
+            token_wait += time.perf_counter() - token_start
+            if content_type is not None:
+                headers['Content-Type'] = content_type
+            async with self.session.request(method, url, headers=headers, data=payload) as resp:
+                delay = self.scheduler.retry_delay(resp.status, resp.headers, attempt,
+                                                   method in self.scheduler.IDEMPOTENT_METHODS)
+                if delay is None:
+                    body = await resp.read()
+                    self._notify(RequestEvent(method, endpoint_template(url), resp.status,
+                                              time.perf_counter() - start, len(body), attempt, token_wait))
+                    resp.raise_for_status()
+                    return resp.status, loads(body) if body else None
+            attempt += 1
+            await self._sleep(delay)
+
+    def _notify(self, event: RequestEvent) -> None:
+        for hook in self.hooks:
+            hook(event)
+
+    @staticmethod
+    async def _sleep(seconds: float) -> None:
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+
+    async def get(self, url: str, fields: Optional[str] = None) -> Dict[str, Any]:
+        url, spec = apply_fields(url, fields)
+        _, body = await self._request('GET', url)
+        return project(body, spec)
+
+    async def put(self, url: str, content_type: str, payload: Any) -> int:
+        status, _ = await self._request('PUT', url, content_type, payload)
+        return status
+
+    async def delete(self, url: str, content_type: str, payload: Any) -> int:
+        status, _ = await self._request('DELETE', url, content_type, payload)
+        return status
+
+    async def post(self, url: str, payload: Any) -> int:
+        status, _ = await self._request('POST', url, payload=payload)
+        return status
+
+    async def send(self, method: str, url: str, payload: Any, content_type: Optional[str] = None) -> Dict[str, Any]:
+        _, body = await self._request(method, url, content_type, payload)
+        return body or {}
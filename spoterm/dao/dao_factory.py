@@ -0,0 +1,93 @@
+import os
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+from spoterm.config.env import REDIRECT_URI, SPOTIFY_AUTH_SCOPES, TOKEN_REFRESH_MARGIN
+from spoterm.dao.spotify_dao import SpotifyDao
+from spoterm.dao.http_cache import HttpCache
+from spoterm.dao.http_session import create_session, DEFAULT_POOL_SIZE
+from spoterm.dao.request_scheduler import RequestScheduler
+from spoterm.dao.request_stats import RequestStats
+from spoterm.authorization.client_credentials_token_provider import ClientCredentialsTokenProvider
+from spoterm.authorization.authorization_code_token_provider import AuthorizationCodeTokenProvider
+from spoterm.authorization.login.chrome_driver_login_handler import ChromeDriverLoginHandler
+
+
+IMAGE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+_warm: Optional[Dict[Hashable, Any]] = None
+_warm_lock = threading.Lock()
+
+
+def keep_warm() -> None:
+    global _warm  # pylint: disable=global-statement
+    if _warm is None:
+        _warm = {}
+
+
+def _shared(key: Hashable, create: Callable[[], Any]) -> Any:
+    if _warm is None:
+        return create()
+    with _warm_lock:
+        if key not in _warm:
+            _warm[key] = create()
+        return _warm[key]
+
+
+def _cache_file(token_cache_loc: Optional[str], name: str) -> Optional[str]:
+    return None if token_cache_loc is None else os.path.join(token_cache_loc, name)
+
+
+def _http_cache(token_cache_loc: Optional[str], http_cache: bool) -> Optional[HttpCache]:
+    if not http_cache or token_cache_loc is None:
+        return None
+    path = os.path.join(token_cache_loc, '.http_cache.sqlite')
+    return _shared(('http_cache', path), lambda: HttpCache(path))
+
+
+def create_image_cache(token_cache_loc: Optional[str]) -> Optional[HttpCache]:
+    if token_cache_loc is None:
+        return None
+    return HttpCache(os.path.join(token_cache_loc, '.image_cache.sqlite'), max_bytes=IMAGE_CACHE_MAX_BYTES)
+
+
+def _hooks(stats: Optional[RequestStats]):
+    return [stats.record] if stats is not None else None
+
+
+def _create_dao(auth, session, rate_limit: Optional[float], cache: Optional[HttpCache],
+                stats: Optional[RequestStats]) -> SpotifyDao:
+    scheduler = _shared(('scheduler', rate_limit), lambda: RequestScheduler(rate=rate_limit))
+    if stats is not None:
+        stats.add_source('scheduler', scheduler.stats.as_dict)
+        stats.add_source('token', auth.metrics.as_dict)
+        if cache is not None:
+            stats.add_source('http_cache', cache.stats)
+    return SpotifyDao(auth, session, scheduler, cache, _hooks(stats))
+
+
+def create_client_credentials_dao(client_id: str, client_secret: str, token_cache_loc: Optional[str] = None,
+                                  rate_limit: Optional[float] = None, pool_size: int = DEFAULT_POOL_SIZE,
+                                  http_cache: bool = False, stats: Optional[RequestStats] = None) -> SpotifyDao:
+    session = _shared(('session', pool_size), lambda: create_session(pool_size=max(DEFAULT_POOL_SIZE, pool_size)))
+    auth = _shared(('client_credentials', client_id, client_secret, token_cache_loc),
+                   lambda: ClientCredentialsTokenProvider(client_id, client_secret,
+                                                          _cache_file(token_cache_loc, '.cc_token_cache.json'),
+                                                          session, TOKEN_REFRESH_MARGIN))
+    return _create_dao(auth, session, rate_limit, _http_cache(token_cache_loc, http_cache), stats)
+
+
+def create_authorization_code_dao(client_id: str, client_secret: str, token_cache_loc: Optional[str] = None,
+                                  rate_limit: Optional[float] = None, pool_size: int = DEFAULT_POOL_SIZE,
+                                  http_cache: bool = False, stats: Optional[RequestStats] = None) -> SpotifyDao:
+    scopes = [s for v in SPOTIFY_AUTH_SCOPES.values() for s in v]
+
+    session = _shared(('session', pool_size), lambda: create_session(pool_size=max(DEFAULT_POOL_SIZE, pool_size)))
+
+    def create_auth():
+        login_handler = ChromeDriverLoginHandler(os.environ.get('CHROME_DRIVER_PATH'))
+        return AuthorizationCodeTokenProvider(client_id, client_secret, scopes, REDIRECT_URI, login_handler,
+                                              _cache_file(token_cache_loc, '.ac_token_cache.json'), session,
+                                              TOKEN_REFRESH_MARGIN)
+
+    auth = _shared(('authorization_code', client_id, client_secret, token_cache_loc), create_auth)
+    return _create_dao(auth, session, rate_limit, _http_cache(token_cache_loc, http_cache), stats)
@@ -0,0 +1,89 @@
+import json
+import time
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional
+from spoterm.util.json_utils import loads
+
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+QUERY_CHUNK = 500
+
+
+class EntityStore:
+
+    def __init__(self, path: str, max_age: Optional[float] = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                 clock: Callable[[], float] = time.time) -> None:
+        self.path = path
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS entities (kind TEXT NOT NULL, id TEXT NOT NULL, '
+                           'body BLOB NOT NULL, size INTEGER NOT NULL, stored_at REAL NOT NULL, '
+                           'PRIMARY KEY (kind, id)) WITHOUT ROWID')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS entities_stored_at ON entities (stored_at)')
+        self._conn.commit()
+        self._total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM entities').fetchone()[0]
+
+    def get_many(self, kind: str, ids: Iterable[str]) -> Dict[str, Any]:
+        ids = list(dict.fromkeys(ids))
+        oldest = self.clock() - self.max_age if self.max_age is not None else float('-inf')
+        found: Dict[str, Any] = {}
+        with self._lock:
+            for start in range(0, len(ids), QUERY_CHUNK):
+                chunk = ids[start:start + QUERY_CHUNK]
+                rows = self._conn.execute(f'SELECT id, body FROM entities WHERE kind = ? AND stored_at >= ? AND id IN '
+                                          f'({",".join("?" * len(chunk))})', [kind, oldest] + chunk)
+                found.update((entity_id, loads(body)) for entity_id, body in rows)
+            self.hits += len(found)
+            self.misses += len(ids) - len(found)
+        return found
+
+    def put_many(self, kind: str, entities: Dict[str, Any]) -> None:
+        if not entities:
+            return
+        now = self.clock()
+        rows = []
+        for entity_id, entity in entities.items():
+            body = json.dumps(entity, separators=(',', ':')).encode('UTF-8')
+            rows.append((kind, entity_id, body, len(body), now))
+        with self._lock:
+            ids = list(entities)
+            for start in range(0, len(ids), QUERY_CHUNK):
+                chunk = ids[start:start + QUERY_CHUNK]
+                self._total -= self._conn.execute(f'SELECT COALESCE(SUM(size), 0) FROM entities WHERE kind = ? AND '
+                                                  f'id IN ({",".join("?" * len(chunk))})', [kind] + chunk).fetchone()[0]
+            self._conn.executemany('INSERT OR REPLACE INTO entities VALUES (?, ?, ?, ?, ?)', rows)
+            self._total += sum(row[3] for row in rows)
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        if self.max_age is not None:
+            oldest = now - self.max_age
+            self._total -= self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM entities WHERE stored_at < ?',
+                                              (oldest,)).fetchone()[0]
+            self._conn.execute('DELETE FROM entities WHERE stored_at < ?', (oldest,))
+        if self._total <= self.max_bytes:
+            return
+        expired = []
+        for kind, entity_id, size in self._conn.execute('SELECT kind, id, size FROM entities ORDER BY stored_at'):
+            if self._total <= self.max_bytes:
+                break
+            expired.append((kind, entity_id))
+            self._total -= size
+        self._conn.executemany('DELETE FROM entities WHERE kind = ? AND id = ?', expired)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries = self._conn.execute('SELECT COUNT(*) FROM entities').fetchone()[0]
+            return {'hits': self.hits, 'misses': self.misses, 'entries': entries, 'size_bytes': self._total}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
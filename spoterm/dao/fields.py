@@ -0,0 +1,18 @@
+import re
+from typing import Optional, Tuple
+from urllib.parse import quote, urlparse
+from spoterm.util.json_utils import FieldSpec, parse_fields
+
+
+_SERVER_FIELDS_PATH = re.compile(r'/playlists/[^/]+(/tracks)?$')
+
+
+def apply_fields(url: str, fields: Optional[str]) -> Tuple[str, Optional[FieldSpec]]:
+    if fields is None:
+        return url, None
+    parsed = urlparse(url)
+    if not _SERVER_FIELDS_PATH.search(parsed.path):
+        return url, parse_fields(fields)
+    if 'fields=' in parsed.query:
+        raise ValueError(f'{url} already selects fields, cannot also project {fields}')
+    return f'{url}{"&" if parsed.query else "?"}fields={quote(fields, safe=",.()")}', None
@@ -0,0 +1,78 @@
+import time
+import sqlite3
+import threading
+from typing import Callable, Dict, NamedTuple, Optional
+
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_AGE = 30 * 24 * 3600
+
+
+class CacheEntry(NamedTuple):
+    etag: str
+    body: bytes
+
+
+class HttpCache:
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES, max_age: float = DEFAULT_MAX_AGE,
+                 clock: Callable[[], float] = time.time) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('CREATE TABLE IF NOT EXISTS responses (url TEXT PRIMARY KEY, etag TEXT NOT NULL, '
+                           'body BLOB NOT NULL, size INTEGER NOT NULL, stored_at REAL NOT NULL, '
+                           'accessed_at REAL NOT NULL)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)')
+        self._conn.commit()
+
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._conn.execute('SELECT etag, body FROM responses WHERE url = ? AND stored_at >= ?',
+                                     (url, self.clock() - self.max_age)).fetchone()
+        return CacheEntry(row[0], row[1]) if row is not None else None
+
+    def record_hit(self, url: str) -> None:
+        with self._lock:
+            self.hits += 1
+            now = self.clock()
+            self._conn.execute('UPDATE responses SET stored_at = ?, accessed_at = ? WHERE url = ?', (now, now, url))
+            self._conn.commit()
+
+    def store(self, url: str, etag: Optional[str], body: bytes) -> None:
+        with self._lock:
+            self.misses += 1
+            if etag is None:
+                return
+            now = self.clock()
+            self._conn.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)',
+                               (url, etag, body, len(body), now, now))
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute('DELETE FROM responses WHERE stored_at < ?', (now - self.max_age,))
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        expired = []
+        for url, size in self._conn.execute('SELECT url, size FROM responses ORDER BY accessed_at').fetchall():
+            if total <= self.max_bytes:
+                break
+            expired.append((url,))
+            total -= size
+        self._conn.executemany('DELETE FROM responses WHERE url = ?', expired)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries, size = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+            return {'hits': self.hits, 'misses': self.misses, 'entries': entries, 'size_bytes': size}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
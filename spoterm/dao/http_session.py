@@ -0,0 +1,34 @@
+from typing import Tuple, Union
+import requests
+from requests.adapters import HTTPAdapter
+
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_TIMEOUT = (3.05, 30)
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+
+    def __init__(self, timeout: Timeout = DEFAULT_TIMEOUT, **kwargs) -> None:
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):  # pylint: disable=arguments-differ
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def create_session(pool_size: int = DEFAULT_POOL_SIZE, timeout: Timeout = DEFAULT_TIMEOUT,
+                   keep_alive: bool = True) -> requests.Session:
+    session = requests.Session()
+    adapter = TimeoutHTTPAdapter(timeout=timeout, pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({
+        'Accept-Encoding': 'gzip, deflate',
+        'Connection': 'keep-alive' if keep_alive else 'close'
+    })
+    return session
@@ -0,0 +1,122 @@
+import time
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from spoterm.dao.search_index import QUERY_CHUNK, SearchIndex
+
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS playlists (playlist_id TEXT PRIMARY KEY, name TEXT, snapshot_id TEXT NOT NULL, '
+    'track_count INTEGER NOT NULL, exported_at REAL NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS tracks (uri TEXT PRIMARY KEY)',
+    'CREATE TABLE IF NOT EXISTS playlist_tracks (playlist_id TEXT NOT NULL REFERENCES playlists ON DELETE CASCADE, '
+    'position INTEGER NOT NULL, uri TEXT NOT NULL REFERENCES tracks, added_at TEXT, '
+    'PRIMARY KEY (playlist_id, position))',
+    'CREATE INDEX IF NOT EXISTS playlist_tracks_uri ON playlist_tracks (uri)',
+    'CREATE TABLE IF NOT EXISTS followed_artists (uri TEXT PRIMARY KEY, name TEXT, first_seen REAL NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS saved_tracks (uri TEXT PRIMARY KEY REFERENCES tracks, added_at TEXT NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS saved_tracks_added_at ON saved_tracks (added_at)',
+)
+Document = Tuple[str, Optional[str], Optional[str]]
+
+
+class LibraryStore:
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('PRAGMA foreign_keys=ON')
+        with self._conn:
+            for statement in SCHEMA:
+                self._conn.execute(statement)
+            self.index = SearchIndex(self._conn)
+
+    def playlist_snapshots(self) -> Dict[str, str]:
+        return dict(self._conn.execute('SELECT playlist_id, snapshot_id FROM playlists'))
+
+    def replace_playlist(self, playlist_id: str, name: Optional[str], snapshot_id: str,
+                         tracks: Iterable[Tuple[str, Optional[str]]]) -> int:
+        tracks = list(tracks)
+        with self._conn:
+            self._conn.execute('DELETE FROM playlist_tracks WHERE playlist_id = ?', (playlist_id,))
+            self._conn.execute('INSERT OR REPLACE INTO playlists VALUES (?, ?, ?, ?, ?)',
+                               (playlist_id, name, snapshot_id, len(tracks), time.time()))
+            self._conn.executemany('INSERT OR IGNORE INTO tracks VALUES (?)', ((uri,) for uri, _ in tracks))
+            self._conn.executemany('INSERT INTO playlist_tracks VALUES (?, ?, ?, ?)',
+                                   ((playlist_id, i, uri, added_at) for i, (uri, added_at) in enumerate(tracks)))
+            self.index.add('playlist', [(f'spotify:playlist:{playlist_id}', name, None)])
+        return len(tracks)
+
+    def index_tracks(self, tracks: Iterable[Document]) -> None:
+        with self._conn:
+            self.index.add('track', tracks)
+
+    def remove_playlists_except(self, playlist_ids: Iterable[str]) -> int:
+        keep = set(playlist_ids)
+        removed = [(p,) for p in self.playlist_snapshots() if p not in keep]
+        with self._conn:
+            self._conn.executemany('DELETE FROM playlists WHERE playlist_id = ?', removed)
+            self.index.remove(f'spotify:playlist:{p}' for p, in removed)
+        return len(removed)
+
+    def remove_unreferenced_tracks(self) -> int:
+        unreferenced = [row[0] for row in self._conn.execute(
+            "SELECT ref FROM search_docs WHERE kind = 'track' AND ref NOT IN (SELECT uri FROM playlist_tracks) "
+            "AND ref NOT IN (SELECT uri FROM saved_tracks)")]
+        with self._conn:
+            self.index.remove(unreferenced)
+            self._conn.execute('DELETE FROM tracks WHERE uri NOT IN (SELECT uri FROM playlist_tracks) '
+                               'AND uri NOT IN (SELECT uri FROM saved_tracks)')
+        return len(unreferenced)
+
+    def followed_artists(self) -> Set[str]:
+        return {row[0] for row in self._conn.execute('SELECT uri FROM followed_artists')}
+
+    def sync_followed_artists(self, artists: Iterable[Tuple[str, Optional[str]]]) -> Tuple[int, int]:
+        by_uri = dict(artists)
+        known = self.followed_artists()
+        added = [(uri, name, time.time()) for uri, name in by_uri.items() if uri not in known]
+        removed = [(uri,) for uri in known if uri not in by_uri]
+        with self._conn:
+            self._conn.executemany('INSERT INTO followed_artists VALUES (?, ?, ?)', added)
+            self._conn.executemany('DELETE FROM followed_artists WHERE uri = ?', removed)
+            self.index.add('artist', ((uri, name, None) for uri, name, _ in added))
+            self.index.remove(uri for uri, in removed)
+        return len(added), len(removed)
+
+    def saved_track(self, uri: str) -> Optional[str]:
+        row = self._conn.execute('SELECT added_at FROM saved_tracks WHERE uri = ?', (uri,)).fetchone()
+        return row[0] if row is not None else None
+
+    def add_saved_tracks(self, tracks: Iterable[Tuple[str, str]], replace: bool = False) -> int:
+        tracks = list(tracks)
+        with self._conn:
+            if replace:
+                self._conn.execute('DELETE FROM saved_tracks')
+            self._conn.executemany('INSERT OR IGNORE INTO tracks VALUES (?)', ((uri,) for uri, _ in tracks))
+            self._conn.executemany('INSERT OR REPLACE INTO saved_tracks VALUES (?, ?)', tracks)
+        return len(tracks)
+
+    def playlists(self) -> List[Document]:
+        return [(f'spotify:playlist:{p}', name, None)
+                for p, name in self._conn.execute('SELECT playlist_id, name FROM playlists ORDER BY name, playlist_id')]
+
+    def search(self, kind: str, query: str, fuzzy: bool = False) -> List[Document]:
+        return self.index.search(kind, query, fuzzy)
+
+    def playlists_containing(self, query: str, fuzzy: bool = False) -> List[Document]:
+        if query.startswith('spotify:track:') or query.startswith('spotify:episode:'):
+            uris = [query]
+        else:
+            uris = [uri for uri, _, _ in self.index.search('track', query, fuzzy)]
+        playlist_ids: Set[str] = set()
+        for start in range(0, len(uris), QUERY_CHUNK):
+            chunk = uris[start:start + QUERY_CHUNK]
+            playlist_ids.update(row[0] for row in self._conn.execute(
+                f'SELECT DISTINCT playlist_id FROM playlist_tracks WHERE uri IN ({",".join("?" * len(chunk))})',
+                chunk))
+        return self.index.docs(f'spotify:playlist:{p}' for p in playlist_ids)
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,39 @@
+import time
+import sqlite3
+import threading
+from typing import Iterable, NamedTuple, Optional
+from spoterm.util.track_id_store import TrackIdStore
+
+
+class MirroredPlaylist(NamedTuple):
+    snapshot_id: str
+    tracks: TrackIdStore
+
+
+class PlaylistMirror:
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('CREATE TABLE IF NOT EXISTS playlists (playlist_id TEXT PRIMARY KEY, '
+                           'snapshot_id TEXT NOT NULL, tracks TEXT NOT NULL, synced_at REAL NOT NULL)')
+        self._conn.commit()
+
+    def get(self, playlist_id: str) -> Optional[MirroredPlaylist]:
+        with self._lock:
+            row = self._conn.execute('SELECT snapshot_id, tracks FROM playlists WHERE playlist_id = ?',
+                                     (playlist_id,)).fetchone()
+        if row is None:
+            return None
+        return MirroredPlaylist(row[0], TrackIdStore(row[1].split('\n') if row[1] else []))
+
+    def put(self, playlist_id: str, snapshot_id: str, tracks: Iterable[str]) -> None:
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO playlists VALUES (?, ?, ?, ?)',
+                               (playlist_id, snapshot_id, '\n'.join(tracks), time.time()))
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
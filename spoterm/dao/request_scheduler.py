@@ -0,0 +1,114 @@
+import time
+import random
+import threading
+from typing import Callable, Dict, Mapping, Optional
+from requests import Response
+
+
+class TokenBucket:
+
+    def __init__(self, rate: float, capacity: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class SchedulerStats:
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.server_errors = 0
+        self.throttled_seconds = 0.0
+        self.backoff_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, **counters: float) -> None:
+        with self._lock:
+            for name, value in counters.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def as_dict(self) -> Dict[str, float]:
+        with self._lock:
+            return {'requests': self.requests, 'retries': self.retries, 'rate_limited': self.rate_limited,
+                    'server_errors': self.server_errors, 'throttled_seconds': self.throttled_seconds,
+                    'backoff_seconds': self.backoff_seconds}
+
+
+class RequestScheduler:
+
+    RETRY_STATUSES = frozenset([500, 502, 503, 504])
+    IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'PUT', 'DELETE'])
+    DEFAULT_RETRY_AFTER = 1.0
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[float] = None, max_retries: int = 5,
+                 backoff_base: float = 0.5, backoff_max: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep) -> None:
+        self.bucket = TokenBucket(rate, burst, clock) if rate else None
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.clock = clock
+        self.sleep = sleep
+        self.stats = SchedulerStats()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire_delay(self) -> float:
+        with self._lock:
+            delay = max(0.0, self._paused_until - self.clock())
+        if self.bucket is not None:
+            delay = max(delay, self.bucket.reserve())
+        self.stats.add(requests=1, throttled_seconds=delay)
+        return delay
+
+    def retry_delay(self, status: int, headers: Mapping[str, str], attempt: int,
+                    retry_server_errors: bool = True) -> Optional[float]:
+        if attempt >= self.max_retries:
+            return None
+        if status == 429:
+            delay = self._parse_retry_after(headers.get('Retry-After'))
+            with self._lock:
+                self._paused_until = max(self._paused_until, self.clock() + delay)
+            self.stats.add(retries=1, rate_limited=1, throttled_seconds=delay)
+            return delay
+        if retry_server_errors and status in self.RETRY_STATUSES:
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+            self.stats.add(retries=1, server_errors=1, backoff_seconds=delay)
+            return delay
+        return None
+
+    def execute(self, send: Callable[[], Response], retry_server_errors: bool = True) -> Response:
+        attempt = 0
+        while True:
+            self._sleep(self.acquire_delay())
+            resp = send()
+            delay = self.retry_delay(resp.status_code, resp.headers, attempt, retry_server_errors)
+            if delay is None:
+                return resp
+            attempt += 1
+            self._sleep(delay)
+
+    def _sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            self.sleep(seconds)
+
+    def _parse_retry_after(self, retry_after: Optional[str]) -> float:
+        try:
+            return max(0.0, float(retry_after)) if retry_after is not None else self.DEFAULT_RETRY_AFTER
+        except ValueError:
+            return self.DEFAULT_RETRY_AFTER
@@ -0,0 +1,205 @@
+import re
+import sys
+import json
+import threading
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Mapping, NamedTuple, Optional, TextIO, Tuple
+from urllib.parse import urlparse
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+STATS_FORMATS = ('table', 'json', 'prometheus')
+GAUGES = frozenset(['entries', 'size_bytes', 'max_refresh_seconds'])
+
+_ID_SEGMENT = re.compile(r'^[0-9A-Za-z]{22}$')
+
+
+class RequestEvent(NamedTuple):
+    method: str
+    endpoint: str
+    status: int
+    latency: float
+    response_bytes: int
+    retries: int
+    token_wait: float
+
+
+def endpoint_template(url: str) -> str:
+    segments = urlparse(url).path.split('/')
+    return '/'.join('{id}' if _ID_SEGMENT.match(s) else s for s in segments)
+
+
+class Histogram:
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if cumulative + count >= rank and count:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = min(self.buckets[i], self.max)
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.max
+
+    def cumulative_counts(self) -> List[Tuple[float, int]]:
+        cumulative, result = 0, []
+        for bucket, count in zip(self.buckets, self.counts):
+            cumulative += count
+            result.append((bucket, cumulative))
+        return result
+
+
+class EndpointStats:
+
+    def __init__(self) -> None:
+        self.statuses: Counter = Counter()
+        self.retries = 0
+        self.response_bytes = 0
+        self.token_wait = 0.0
+        self.latency = Histogram()
+
+    def record(self, event: RequestEvent) -> None:
+        self.statuses[event.status] += 1
+        self.retries += event.retries
+        self.response_bytes += event.response_bytes
+        self.token_wait += event.token_wait
+        self.latency.observe(event.latency)
+
+    def as_dict(self) -> Dict:
+        return {
+            'requests': self.latency.count, 'statuses': {str(s): c for s, c in sorted(self.statuses.items())},
+            'retries': self.retries, 'response_bytes': self.response_bytes, 'token_wait_seconds': self.token_wait,
+            'latency_seconds': {'sum': self.latency.sum, 'max': self.latency.max, 'p50': self.latency.quantile(0.5),
+                                'p90': self.latency.quantile(0.9), 'p99': self.latency.quantile(0.99),
+                                'buckets': {str(b): c for b, c in self.latency.cumulative_counts()}},
+        }
+
+
+class RequestStats:
+
+    def __init__(self) -> None:
+        self.endpoints: Dict[Tuple[str, str], EndpointStats] = {}
+        self.sources: Dict[str, Tuple[Callable[[], Mapping[str, float]], Mapping[str, float]]] = {}
+        self._lock = threading.Lock()
+
+    def add_source(self, name: str, read: Callable[[], Mapping[str, float]]) -> None:
+        with self._lock:
+            if name not in self.sources:
+                self.sources[name] = (read, read())
+
+    def counters(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            sources = list(self.sources.items())
+        return {name: {k: v if k in GAUGES else v - baseline.get(k, 0) for k, v in read().items()}
+                for name, (read, baseline) in sorted(sources)}
+
+    def record(self, event: RequestEvent) -> None:
+        with self._lock:
+            key = (event.method, event.endpoint)
+            if key not in self.endpoints:
+                self.endpoints[key] = EndpointStats()
+            self.endpoints[key].record(event)
+
+    def as_dict(self) -> Dict:
+        with self._lock:
+            endpoints = [dict(method=method, endpoint=endpoint, **stats.as_dict())
+                         for (method, endpoint), stats in sorted(self.endpoints.items())]
+        return {'endpoints': endpoints, 'counters': self.counters()}
+
+    def to_json(self) -> str:
+        return json.dumps(self.as_dict(), indent=2)
+
+    def to_prometheus(self) -> str:
+        lines = [
+            '# HELP spoterm_requests_total Web API requests by final response status',
+            '# TYPE spoterm_requests_total counter',
+        ]
+        with self._lock:
+            endpoints = sorted(self.endpoints.items())
+        for (method, endpoint), stats in endpoints:
+            for status, count in sorted(stats.statuses.items()):
+                lines.append(f'spoterm_requests_total{{method="{method}",endpoint="{endpoint}",'
+                             f'status="{status}"}} {count}')
+        for name, help_text, attr in (
+                ('spoterm_request_retries_total', 'Retried attempts', 'retries'),
+                ('spoterm_response_bytes_total', 'Response body bytes received', 'response_bytes'),
+                ('spoterm_token_wait_seconds_total', 'Seconds spent waiting for an access token', 'token_wait')):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            lines += [f'{name}{{method="{method}",endpoint="{endpoint}"}} {getattr(stats, attr)}'
+                      for (method, endpoint), stats in endpoints]
+        lines += ['# HELP spoterm_request_duration_seconds Web API request latency including retries',
+                  '# TYPE spoterm_request_duration_seconds histogram']
+        for (method, endpoint), stats in endpoints:
+            labels = f'method="{method}",endpoint="{endpoint}"'
+            for bucket, count in stats.latency.cumulative_counts():
+                le = '+Inf' if bucket == float('inf') else repr(bucket)
+                lines.append(f'spoterm_request_duration_seconds_bucket{{{labels},le="{le}"}} {count}')
+            lines.append(f'spoterm_request_duration_seconds_sum{{{labels}}} {stats.latency.sum}')
+            lines.append(f'spoterm_request_duration_seconds_count{{{labels}}} {stats.latency.count}')
+        for name, counters in self.counters().items():
+            for key, value in counters.items():
+                metric = f'spoterm_{name}_{key}' if key in GAUGES else f'spoterm_{name}_{key}_total'
+                lines += [f'# TYPE {metric} {"gauge" if key in GAUGES else "counter"}', f'{metric} {value}']
+        return '\n'.join(lines) + '\n'
+
+    def to_table(self) -> str:
+        lines = [f'{"request":48} {"count":>6} {"statuses":>16} {"retries":>7} {"KiB":>9} {"token ms":>9} '
+                 f'{"p50 ms":>8} {"p90 ms":>8} {"p99 ms":>8} {"max ms":>8}']
+        with self._lock:
+            endpoints = sorted(self.endpoints.items())
+        for (method, endpoint), stats in endpoints:
+            statuses = ','.join(f'{s}:{c}' for s, c in sorted(stats.statuses.items()))
+            latency = stats.latency
+            lines.append(f'{method + " " + endpoint:48} {latency.count:6} {statuses:>16} {stats.retries:7} '
+                         f'{stats.response_bytes / 1024:9.1f} {stats.token_wait * 1000:9.1f} '
+                         f'{latency.quantile(0.5) * 1000:8.1f} {latency.quantile(0.9) * 1000:8.1f} '
+                         f'{latency.quantile(0.99) * 1000:8.1f} {latency.max * 1000:8.1f}')
+        sources = self.counters()
+        if sources:
+            lines.append('')
+        for name, counters in sources.items():
+            lines.append(f'{name:16} ' + ' '.join(f'{k}={v:.3f}' if isinstance(v, float) else f'{k}={v}'
+                                                  for k, v in counters.items()))
+        return '\n'.join(lines) + '\n'
+
+    def write(self, output_format: str, out: TextIO) -> None:
+        if output_format == 'json':
+            out.write(self.to_json() + '\n')
+        elif output_format == 'prometheus':
+            out.write(self.to_prometheus())
+        else:
+            out.write(self.to_table())
+
+
+@contextmanager
+def report_stats(output_format: Optional[str], path: Optional[str] = None) -> Iterator[Optional[RequestStats]]:
+    if output_format is None:
+        yield None
+        return
+    stats = RequestStats()
+    try:
+        yield stats
+    finally:
+        if path is None:
+            stats.write(output_format, sys.stderr)
+        else:
+            with open(path, 'w') as out:
+                stats.write(output_format, out)
@@ -0,0 +1,94 @@
+import re
+import sqlite3
+import difflib
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS search_docs (ref TEXT PRIMARY KEY, kind TEXT NOT NULL, name TEXT, artists TEXT)',
+    'CREATE TABLE IF NOT EXISTS search_terms (term TEXT NOT NULL, kind TEXT NOT NULL, ref TEXT NOT NULL, '
+    'PRIMARY KEY (kind, term, ref)) WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS search_terms_ref ON search_terms (ref)',
+)
+KINDS = ('playlist', 'track', 'artist')
+FUZZY_CUTOFF = 0.75
+FUZZY_MATCHES = 5
+QUERY_CHUNK = 500
+
+_TOKEN = re.compile(r'\w+')
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    normalized = unicodedata.normalize('NFKD', text)
+    return _TOKEN.findall(''.join(c for c in normalized if not unicodedata.combining(c)).lower())
+
+
+def matches(query: str, text: Optional[str]) -> bool:
+    tokens, terms = tokenize(query), tokenize(text)
+    return bool(tokens) and all(any(term.startswith(token) for term in terms) for token in tokens)
+
+
+class SearchIndex:
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self._conn = conn
+        self._vocabulary: Dict[str, List[str]] = {}
+        for statement in SCHEMA:
+            self._conn.execute(statement)
+
+    def add(self, kind: str, docs: Iterable[Tuple[str, Optional[str], Optional[str]]]) -> None:
+        docs = list(docs)
+        self._conn.executemany('DELETE FROM search_terms WHERE ref = ?', ((ref,) for ref, _, _ in docs))
+        self._conn.executemany('INSERT OR REPLACE INTO search_docs VALUES (?, ?, ?, ?)',
+                               ((ref, kind, name, artists) for ref, name, artists in docs))
+        self._conn.executemany('INSERT OR IGNORE INTO search_terms VALUES (?, ?, ?)',
+                               ((term, kind, ref) for ref, name, artists in docs
+                                for term in set(tokenize(name) + tokenize(artists))))
+        self._vocabulary.pop(kind, None)
+
+    def remove(self, refs: Iterable[str]) -> None:
+        rows = [(ref,) for ref in refs]
+        self._conn.executemany('DELETE FROM search_terms WHERE ref = ?', rows)
+        self._conn.executemany('DELETE FROM search_docs WHERE ref = ?', rows)
+        self._vocabulary.clear()
+
+    def _terms(self, kind: str, token: str, fuzzy: bool) -> List[str]:
+        terms = [row[0] for row in self._conn.execute(
+            'SELECT DISTINCT term FROM search_terms WHERE kind = ? AND term >= ? AND term < ?',
+            (kind, token, token + '\uffff'))]
+        if fuzzy and not terms:
+            if kind not in self._vocabulary:
+                self._vocabulary[kind] = [row[0] for row in self._conn.execute(
+                    'SELECT DISTINCT term FROM search_terms WHERE kind = ?', (kind,))]
+            terms = difflib.get_close_matches(token, self._vocabulary[kind], FUZZY_MATCHES, FUZZY_CUTOFF)
+        return terms
+
+    def _refs(self, kind: str, token: str, fuzzy: bool) -> Set[str]:
+        refs: Set[str] = set()
+        for term in self._terms(kind, token, fuzzy):
+            refs.update(row[0] for row in self._conn.execute(
+                'SELECT ref FROM search_terms WHERE kind = ? AND term = ?', (kind, term)))
+        return refs
+
+    def search(self, kind: str, query: str, fuzzy: bool = False) -> List[Tuple[str, Optional[str], Optional[str]]]:
+        refs: Optional[Set[str]] = None
+        for token in tokenize(query):
+            found = self._refs(kind, token, fuzzy)
+            refs = found if refs is None else refs & found
+            if not refs:
+                return []
+        if refs is None:
+            return []
+        return self.docs(refs)
+
+    def docs(self, refs: Iterable[str]) -> List[Tuple[str, Optional[str], Optional[str]]]:
+        ref_list = list(refs)
+        docs: List[Tuple[str, Optional[str], Optional[str]]] = []
+        for start in range(0, len(ref_list), QUERY_CHUNK):
+            chunk = ref_list[start:start + QUERY_CHUNK]
+            docs.extend(self._conn.execute(
+                f'SELECT ref, name, artists FROM search_docs WHERE ref IN ({",".join("?" * len(chunk))})', chunk))
+        return sorted(docs, key=lambda d: ((d[1] or '').lower(), d[0]))
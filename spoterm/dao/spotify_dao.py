@@ -1,40 +1,85 @@
-from typing import Dict, Any
+import time
+from typing import Callable, Dict, Any, List, Optional
 import requests
 from spoterm.authorization.spotify_token_provider import SpotifyTokenProvider
+from spoterm.dao.fields import apply_fields
+from spoterm.dao.http_cache import HttpCache
+from spoterm.dao.http_session import create_session
+from spoterm.dao.request_scheduler import RequestScheduler
+from spoterm.dao.request_stats import RequestEvent, endpoint_template
+from spoterm.util.json_utils import loads, project
 
 
 class SpotifyDao:
 
-    def __init__(self, token_provider: SpotifyTokenProvider) -> None:
+    def __init__(self, token_provider: SpotifyTokenProvider, session: Optional[requests.Session] = None,
+                 scheduler: Optional[RequestScheduler] = None, cache: Optional[HttpCache] = None,
+                 hooks: Optional[List[Callable[[RequestEvent], None]]] = None) -> None:
         self.token_provider = token_provider
+        self.session = session if session is not None else create_session()
+        self.scheduler = scheduler if scheduler is not None else RequestScheduler()
+        self.cache = cache
+        self.hooks = list(hooks) if hooks is not None else []
 
     def _get_auth_headers(self):
         return {'Authorization': f'Bearer {self.token_provider.get_token()}'}
 
-    def get(self, url: str) -> Dict[str, Any]:
-        headers = self._get_auth_headers()
-        resp = requests.get(url, headers=headers)
-        return resp.json()
+    def _request(self, method: str, url: str, content_type: Optional[str] = None,
+                 payload: Any = None, extra_headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        attempts = 0
+        token_wait = 0.0
 
-    def put(self, url: str, content_type: str, payload: Any) -> int:
-        headers = self._get_auth_headers()
-        headers['Content-Type'] = content_type
-        resp = requests.put(url, headers=headers, data=payload)
+        def send():
+            nonlocal attempts, token_wait
+            attempts += 1
+            token_start = time.perf_counter()
+            headers = self._get_auth_headers()
+            token_wait += time.perf_counter() - token_start
+            if extra_headers is not None:
+                headers.update(extra_headers)
+            if content_type is not None:
+                headers['Content-Type'] = content_type
+            return self.session.request(method, url, headers=headers, data=payload)
+
+        start = time.perf_counter()
+        resp = self.scheduler.execute(send, method in self.scheduler.IDEMPOTENT_METHODS)
+        if self.hooks:
+            event = RequestEvent(method, endpoint_template(url), resp.status_code, time.perf_counter() - start,
+                                 len(resp.content), attempts - 1, token_wait)
+            for hook in self.hooks:
+                hook(event)
         resp.raise_for_status()
-        print(f"PUT: {resp.status_code}")
+        return resp
+
+    def get(self, url: str, fields: Optional[str] = None) -> Dict[str, Any]:
+        url, spec = apply_fields(url, fields)
+        return project(loads(self._get_content(url)), spec)
+
+    def _get_content(self, url: str) -> bytes:
+        if self.cache is None:
+            return self._request('GET', url).content
+
+        cached = self.cache.lookup(url)
+        extra_headers = {'If-None-Match': cached.etag} if cached is not None else None
+        resp = self._request('GET', url, extra_headers=extra_headers)
+        if cached is not None and resp.status_code == 304:
+            self.cache.record_hit(url)
+            return cached.body
+        self.cache.store(url, resp.headers.get('ETag'), resp.content)
+        return resp.content
+
+    def put(self, url: str, content_type: str, payload: Any) -> int:
+        resp = self._request('PUT', url, content_type, payload)
         return resp.status_code
 
     def delete(self, url: str, content_type: str, payload: Any) -> int:
-        headers = self._get_auth_headers()
-        headers['Content-Type'] = content_type
-        resp = requests.delete(url, headers=headers, data=payload)
-        resp.raise_for_status()
-        print(f"DELETE: {resp.status_code}")
+        resp = self._request('DELETE', url, content_type, payload)
         return resp.status_code
 
     def post(self, url: str, payload: Any) -> int:
-        headers = self._get_auth_headers()
-        resp = requests.post(url, headers=headers, data=payload)
-        resp.raise_for_status()
-        print(f"POST: {resp.status_code}")
+        resp = self._request('POST', url, payload=payload)
         return resp.status_code
+
+    def send(self, method: str, url: str, payload: Any, content_type: Optional[str] = None) -> Dict[str, Any]:
+        resp = self._request(method, url, content_type, payload)
+        return loads(resp.content) if resp.content else {}
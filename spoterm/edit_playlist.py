@@ -1,127 +1,356 @@
 import os
 import sys
 import json
-import base64
 import argparse
-import requests
-from spoterm.config.env import REDIRECT_URI, SPOTIFY_AUTH_SCOPES
-from spoterm.dao.spotify_dao import SpotifyDao
-from spoterm.authorization.authorization_code_token_provider import AuthorizationCodeTokenProvider
-from spoterm.authorization.login.chrome_driver_login_handler import ChromeDriverLoginHandler
+import threading
+import contextlib
+from functools import partial
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterable, List, NamedTuple, Optional
+from spoterm.config.env import API_URL
+from spoterm.dao.request_stats import STATS_FORMATS, report_stats
+from spoterm.util.cover_image import choose_renditions, encode_cover, fetch_cover, read_image_file
+from spoterm.util.uri_reader import iter_uris, iter_uri_batches
+from spoterm.get_playlist_tracks import get_playlist_tracks
 
 
-def _parse_args():
+WRITE_BATCH_SIZE = 100
+REORDER_PASSES = 2
+DEFAULT_CONCURRENCY = 4
+DEFAULT_PLAYLIST_CONCURRENCY = 4
+MANIFEST_OPS = ('add', 'delete', 'sync', 'image')
+IMAGE_FIELDS = 'images(url,width)'
+
+
+def _parse_args(argv=None):
     parser = argparse.ArgumentParser(description='Arguments')
     parser.add_argument('uris', type=str, nargs='*', help='track uris to print info for')
-    parser.add_argument('--playlist', '-p', type=str, help='URI of playlist to edit', required=True)
+    parser.add_argument('--playlist', '-p', type=str, help='URI of playlist to edit')
+    parser.add_argument('--manifest', '-m', type=str,
+                        help='JSON or JSONL file of add, delete, sync and image operations, - for stdin')
+    parser.add_argument('--playlist-concurrency', '-P', type=int, default=DEFAULT_PLAYLIST_CONCURRENCY,
+                        help='Number of manifest playlists to edit in parallel')
     parser.add_argument('--image', '-i', type=str,
-                        help='Image to set for playlist, either path to file or an album uri')
+                        help='Image to set for playlist: a file path, image url, or an album or playlist uri')
     parser.add_argument('--client-id', '-c', type=str, help='Client id required to use webapi',
-                        default=os.environ['SPOTIFY_CLIENT_ID'])
+                        default=os.environ.get('SPOTIFY_CLIENT_ID'), required='SPOTIFY_CLIENT_ID' not in os.environ)
     parser.add_argument('--client-secret', '-s', type=str, help='Client secret required to use webapi',
-                        default=os.environ['SPOTIFY_CLIENT_SECRET'])
+                        default=os.environ.get('SPOTIFY_CLIENT_SECRET'),
+                        required='SPOTIFY_CLIENT_SECRET' not in os.environ)
     parser.add_argument('--token-cache-loc', '-t', type=str, help='Location of token cache to use',
                         default=os.environ.get('SPOTIFY_TOKEN_CACHE_LOC'))
-    parser.add_argument('--delete', '-d', action='store_true', help='Delete specified tracks from playlist')
-    return parser.parse_args()
+    parser.add_argument('--rate-limit', '-l', type=float, help='Maximum number of requests per second to send',
+                        default=os.environ.get('SPOTIFY_RATE_LIMIT'))
+    parser.add_argument('--stats', type=str, nargs='?', const='table', choices=STATS_FORMATS,
+                        help='Report request statistics per endpoint on stderr when done')
+    parser.add_argument('--stats-file', type=str, help='Write the --stats report to this file instead of stderr')
+    parser.add_argument('--concurrency', '-j', type=int, default=DEFAULT_CONCURRENCY,
+                        help='Number of 100 track chunks to write concurrently, added chunks are put back in order')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--delete', '-d', action='store_true', help='Delete specified tracks from playlist')
+    mode.add_argument('--sync', action='store_true',
+                      help='Make the playlist contain exactly the specified tracks with minimal adds and deletes')
+    args = parser.parse_args(argv)
+    if (args.playlist is None) == (args.manifest is None):
+        parser.error('exactly one of --playlist and --manifest is required')
+    if args.manifest is not None and (args.delete or args.sync or args.image or args.uris):
+        parser.error('--manifest takes its operations from the manifest, not from uris, --delete, --sync or --image')
+    return args
 
 
-def _set_image_from_url(dao, playlist_id, image_url):
-    image_data = base64.b64encode(requests.get(image_url).content)
-    print(dao.put(
-        f"https://api.spotify.com/v1/playlists/{playlist_id}/images",
-        "image/jpeg",
-        image_data
-    ))
-
-
-def update_playlist_image(dao, playlist_id, image_uri):
+def _cover_image(dao, image_uri, image_cache=None):
     if image_uri.startswith('spotify:album:'):
         image_album_id = image_uri.replace("spotify:album:", "")
-        album_info = dao.get(f"https://api.spotify.com/v1/albums/{image_album_id}")
-        image_url = album_info['images'][0]['url']
-        _set_image_from_url(dao, playlist_id, image_url)
-    elif image_uri.startswith('spotify:playlist:'):
+        album_info = dao.get(f"{API_URL}/albums/{image_album_id}", fields=IMAGE_FIELDS)
+        return fetch_cover(dao.session, choose_renditions(album_info.get('images') or []), image_cache)
+    if image_uri.startswith('spotify:playlist:'):
         image_playlist_id = image_uri.replace("spotify:playlist:", "")
-        playlist_info = dao.get(f"https://api.spotify.com/v1/playlists/{image_playlist_id}")
-        image_url = playlist_info['images'][0]['url']
-        _set_image_from_url(dao, playlist_id, image_url)
+        playlist_info = dao.get(f"{API_URL}/playlists/{image_playlist_id}", fields=IMAGE_FIELDS)
+        return fetch_cover(dao.session, choose_renditions(playlist_info.get('images') or []), image_cache)
+    if image_uri.startswith('https://') or image_uri.startswith('http://'):
+        return fetch_cover(dao.session, [image_uri], image_cache)
+    return encode_cover(read_image_file(image_uri))
+
+
+def update_playlist_image(dao, playlist_id, image_uri, image_cache=None):
+    dao.put(
+        f"{API_URL}/playlists/{playlist_id}/images",
+        "image/jpeg",
+        _cover_image(dao, image_uri, image_cache)
+    )
+
+
+class WriteResult(NamedTuple):
+    snapshot_id: Optional[str]
+    chunks: int
+
+
+class PartialWriteError(Exception):
+
+    def __init__(self, message: str, written: int, snapshot_id: Optional[str]) -> None:
+        super().__init__(message)
+        self.written = written
+        self.snapshot_id = snapshot_id
 
 
-def delete_tracks_from_playlist(dao, playlist_id, track_uris):
-    url = f"https://api.spotify.com/v1/playlists/{playlist_id}/tracks"
+def _get_snapshot_id(dao, playlist_id):
+    return dao.get(f"{API_URL}/playlists/{playlist_id}?fields=snapshot_id")['snapshot_id']
 
-    if len(track_uris) > 100:
-        uris_to_delete = track_uris[:100]
-        uris_left = track_uris[100:]
-    else:
-        uris_to_delete = track_uris
-        uris_left = []
 
-    while True:
-        tracks_to_delete = [{'uri': u} for u in uris_to_delete]
+def _write_chunks(chunks, write, concurrency, progress, order=None):
+    snapshot_ids = [None] * len(chunks)
+    written = [False] * len(chunks)
+    failed = threading.Event()
+
+    def write_chunk(index):
+        if failed.is_set():
+            return
+        try:
+            snapshot_ids[index] = write(index, chunks[index]).get('snapshot_id')
+        except Exception:
+            failed.set()
+            raise
+        written[index] = True
+        if progress is not None:
+            progress(index, len(chunks), {'snapshot_id': snapshot_ids[index]})
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(write_chunk, index) for index in (order or range(len(chunks)))]
+    errors = [f.exception() for f in futures if f.exception() is not None]
+    snapshot_id = next((s for s in reversed(snapshot_ids) if s is not None), None)
+    if errors:
+        raise PartialWriteError(f'{sum(written)} of {len(chunks)} chunks written before failing: {errors[0]}',
+                                sum(written), snapshot_id) from errors[0]
+    return WriteResult(snapshot_id, len(chunks))
+
+
+def delete_tracks_from_playlist(dao, playlist_id, track_uris, concurrency=1, positions=None, snapshot_id=None,
+                                progress=None):
+    url = f"{API_URL}/playlists/{playlist_id}/tracks"
+    chunks = [track_uris[i:i + WRITE_BATCH_SIZE] for i in range(0, len(track_uris), WRITE_BATCH_SIZE)]
+
+    def write(_, uris_to_delete):
+        tracks_to_delete = [{'uri': u} if positions is None else {'uri': u, 'positions': positions[u]}
+                            for u in uris_to_delete]
         body = {'tracks': tracks_to_delete}
-        dao.delete(url, 'application/json', json.dumps(body))
+        if snapshot_id is not None:
+            body['snapshot_id'] = snapshot_id
+        return dao.send('DELETE', url, json.dumps(body), 'application/json')
 
-        if not uris_left:
-            break
-        
-        if len(uris_left) > 100:
-            uris_to_delete = uris_left[:100]
-            uris_left = uris_left[100:]
-        else:
-            uris_to_delete = uris_left
-            uris_left = []
+    if positions is not None:
+        concurrency = 1
+    result = _write_chunks(chunks, write, concurrency, progress)
+    if concurrency > 1 and len(chunks) > 1:
+        return WriteResult(_get_snapshot_id(dao, playlist_id), len(chunks))
+    return result
+
+
+def _get_playlist_length(dao, playlist_id):
+    return dao.get(f"{API_URL}/playlists/{playlist_id}?fields=tracks.total")['tracks']['total']
 
 
-def add_tracks_to_playlist(dao, playlist_id, track_uris):
-    if len(track_uris) > 100:
-        uris_to_add = track_uris[:100]
-        uris_left = track_uris[100:]
-    else:
-        uris_to_add = track_uris
-        uris_left = []
+def _read_range(dao, playlist_id, start, length):
+    uris = []
+    for offset in range(start, start + length, WRITE_BATCH_SIZE):
+        page = dao.get(f"{API_URL}/playlists/{playlist_id}/tracks?fields=items.track.uri"
+                       f"&limit={min(WRITE_BATCH_SIZE, start + length - offset)}&offset={offset}")
+        uris += [(item.get('track') or {}).get('uri') for item in page['items']]
+    return uris
 
-    while True:
-        tracks_to_add = {"uris": uris_to_add}
-        dao.post(f"https://api.spotify.com/v1/playlists/{playlist_id}/tracks", json.dumps(tracks_to_add))
 
-        if not uris_left:
+def _chunk_order(chunks, uris):
+    order, offset = [], 0
+    unplaced = list(range(len(chunks)))
+    while unplaced:
+        index = next((i for i in unplaced if uris[offset:offset + len(chunks[i])] == chunks[i]), None)
+        if index is None:
+            return None
+        order.append(index)
+        unplaced.remove(index)
+        offset += len(chunks[index])
+    return order
+
+
+def _reorder_chunks(dao, playlist_id, start, chunks):
+    url = f"{API_URL}/playlists/{playlist_id}/tracks"
+    length = sum(len(c) for c in chunks)
+    snapshot_id = None
+    for attempt in range(REORDER_PASSES + 1):
+        order = _chunk_order(chunks, _read_range(dao, playlist_id, start, length))
+        if order is None or attempt == REORDER_PASSES and order != list(range(len(chunks))):
             break
-        
-        if len(uris_left) > 100:
-            uris_to_add = uris_left[:100]
-            uris_left = uris_left[100:]
-        else:
-            uris_to_add = uris_left
-            uris_left = []
+        if order == list(range(len(chunks))):
+            return snapshot_id or _get_snapshot_id(dao, playlist_id)
+        for index, chunk in enumerate(chunks):
+            current = order.index(index)
+            if current == index:
+                continue
+            body = {'range_start': start + sum(len(chunks[i]) for i in order[:current]),
+                    'insert_before': start + sum(len(chunks[i]) for i in order[:index]),
+                    'range_length': len(chunk)}
+            snapshot_id = dao.send('PUT', url, json.dumps(body), 'application/json').get('snapshot_id')
+            order.insert(index, order.pop(current))
+    raise PartialWriteError(f'all {len(chunks)} chunks written but the tracks at {start} to {start + length} '
+                            f'are not in the requested order', len(chunks), snapshot_id)
 
 
-def main():
-    args = _parse_args()
+def add_tracks_to_playlist(dao, playlist_id, track_uris, concurrency=1, position=None, progress=None):
+    url = f"{API_URL}/playlists/{playlist_id}/tracks"
+    chunks = [track_uris[i:i + WRITE_BATCH_SIZE] for i in range(0, len(track_uris), WRITE_BATCH_SIZE)]
 
-    if not args.uris:
-        uris = [u.strip() for ln in sys.stdin.readlines() for u in ln.split(' ')]
-    else:
-        uris = args.uris
+    if concurrency == 1 or len(chunks) < 2:
+        def write(index, uris_to_add):
+            tracks_to_add = {"uris": uris_to_add}
+            if position is not None:
+                tracks_to_add["position"] = position + index * WRITE_BATCH_SIZE
+            return dao.send('POST', url, json.dumps(tracks_to_add))
 
-    token_cache = None if args.token_cache_loc is None else os.path.join(args.token_cache_loc, '.ac_token_cache.json')
-    scopes = [s for v in SPOTIFY_AUTH_SCOPES.values() for s in v]
-    login_handler = ChromeDriverLoginHandler(os.environ.get('CHROME_DRIVER_PATH'))
+        return _write_chunks(chunks, write, 1, progress)
 
-    auth = AuthorizationCodeTokenProvider(args.client_id, args.client_secret, scopes, REDIRECT_URI,
-                                          login_handler, token_cache)
-    dao = SpotifyDao(auth)
-    playlist_id = args.playlist.replace("spotify:playlist:", "")
+    start = position if position is not None else _get_playlist_length(dao, playlist_id)
 
-    if args.image:
-        update_playlist_image(dao, playlist_id, args.image)
+    def insert(_, uris_to_add):
+        return dao.send('POST', url, json.dumps({"uris": uris_to_add, "position": start}))
 
-    if uris:
-        if args.delete:
-            delete_tracks_from_playlist(dao, playlist_id, uris)
+    _write_chunks(chunks, insert, concurrency, progress, order=range(len(chunks) - 1, -1, -1))
+    return WriteResult(_reorder_chunks(dao, playlist_id, start, chunks), len(chunks))
+
+
+def sync_playlist(dao, playlist_id, track_uris, concurrency=1):
+    current = list(get_playlist_tracks(dao, [playlist_id])[playlist_id])
+    current_set, desired_set = set(current), set(track_uris)
+    to_delete = list(dict.fromkeys(u for u in current if u not in desired_set))
+    to_add = [u for u in track_uris if u not in current_set]
+
+    if to_delete:
+        delete_tracks_from_playlist(dao, playlist_id, to_delete, concurrency)
+    if to_add:
+        add_tracks_to_playlist(dao, playlist_id, to_add, concurrency)
+    return to_add, to_delete
+
+
+class ManifestOperation(NamedTuple):
+    playlist: str
+    op: str
+    uris: List[str]
+    image: Optional[str]
+
+
+class PlaylistResult(NamedTuple):
+    playlist: str
+    operations: int
+    snapshot_id: Optional[str]
+    error: Optional[str]
+
+
+def _parse_operation(entry, where):
+    if not isinstance(entry, dict) or not isinstance(entry.get('playlist'), str) or entry.get('op') not in MANIFEST_OPS:
+        raise ValueError(f'{where}: expected an object with a playlist and an op in {", ".join(MANIFEST_OPS)}')
+    if entry['op'] == 'image' and not entry.get('image'):
+        raise ValueError(f'{where}: image operations need an image')
+    uris = entry.get('uris', [])
+    if not isinstance(uris, list) or not all(isinstance(uri, str) for uri in uris):
+        raise ValueError(f'{where}: uris must be a list of track uris')
+    return ManifestOperation(entry['playlist'].replace('spotify:playlist:', ''), entry['op'],
+                             list(iter_uris(uris)), entry.get('image'))
+
+
+def load_manifest(lines: Iterable[str]) -> List[ManifestOperation]:
+    lines = list(lines)
+    text = ''.join(lines).lstrip()
+    if text.startswith('['):
+        return [_parse_operation(e, f'entry {i + 1}') for i, e in enumerate(json.loads(text))]
+    return [_parse_operation(json.loads(line), f'line {i + 1}') for i, line in enumerate(lines) if line.strip()]
+
+
+def _run_playlist_operations(dao, playlist_id, operations, concurrency, image_cache=None):
+    snapshot_id = None
+    for operation in operations:
+        if operation.op == 'add':
+            snapshot_id = add_tracks_to_playlist(dao, playlist_id, operation.uris, concurrency).snapshot_id
+        elif operation.op == 'delete':
+            snapshot_id = delete_tracks_from_playlist(dao, playlist_id, operation.uris, concurrency).snapshot_id
+        elif operation.op == 'sync':
+            sync_playlist(dao, playlist_id, operation.uris, concurrency)
+            snapshot_id = _get_snapshot_id(dao, playlist_id)
         else:
-            add_tracks_to_playlist(dao, playlist_id, uris)
+            update_playlist_image(dao, playlist_id, operation.image, image_cache)
+            snapshot_id = _get_snapshot_id(dao, playlist_id)
+    return snapshot_id
+
+
+def iter_manifest_results(dao, operations, concurrency=1, playlist_concurrency=DEFAULT_PLAYLIST_CONCURRENCY,
+                          image_cache=None):
+    by_playlist = OrderedDict()
+    for operation in operations:
+        by_playlist.setdefault(operation.playlist, []).append(operation)
+
+    with ThreadPoolExecutor(max_workers=playlist_concurrency) as executor:
+        futures = {executor.submit(_run_playlist_operations, dao, playlist_id, ops, concurrency, image_cache):
+                   (playlist_id, ops) for playlist_id, ops in by_playlist.items()}
+        for future in as_completed(futures):
+            playlist_id, ops = futures[future]
+            try:
+                yield PlaylistResult(playlist_id, len(ops), future.result(), None)
+            except Exception as e:  # pylint: disable=broad-except
+                yield PlaylistResult(playlist_id, len(ops), None, str(e))
+
+
+def _print_progress(done, index, chunks, _):
+    print(f'Chunk {done + index + 1} written ({index + 1}/{chunks} of this batch)', file=sys.stderr)
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+
+    from spoterm.dao.dao_factory import create_authorization_code_dao  # pylint: disable=import-outside-toplevel
+    from spoterm.dao.dao_factory import create_image_cache  # pylint: disable=import-outside-toplevel
+    image_cache = create_image_cache(args.token_cache_loc)
+    with report_stats(args.stats, args.stats_file) as stats:
+        if stats is not None and image_cache is not None:
+            stats.add_source('image_cache', image_cache.stats)
+        if args.manifest:
+            with open(args.manifest) if args.manifest != '-' else contextlib.nullcontext(sys.stdin) as manifest:
+                operations = load_manifest(manifest)
+            dao = create_authorization_code_dao(args.client_id, args.client_secret, args.token_cache_loc,
+                                                args.rate_limit, pool_size=args.concurrency * args.playlist_concurrency,
+                                                stats=stats)
+            failed = 0
+            for result in iter_manifest_results(dao, operations, args.concurrency, args.playlist_concurrency,
+                                                image_cache):
+                if result.error is not None:
+                    failed += 1
+                    print(f'spotify:playlist:{result.playlist} failed: {result.error}', file=sys.stderr)
+                else:
+                    print(f'spotify:playlist:{result.playlist}\t{result.snapshot_id or ""}')
+                sys.stdout.flush()
+            if failed:
+                sys.exit(1)
+            return
+
+        dao = create_authorization_code_dao(args.client_id, args.client_secret, args.token_cache_loc, args.rate_limit,
+                                            pool_size=args.concurrency, stats=stats)
+        playlist_id = args.playlist.replace("spotify:playlist:", "")
+
+        if args.image:
+            update_playlist_image(dao, playlist_id, args.image, image_cache)
+
+        if args.sync:
+            sync_playlist(dao, playlist_id, list(iter_uris(args.uris or sys.stdin)), args.concurrency)
+            return
+
+        result = None
+        done = 0
+        for uris in iter_uri_batches(args.uris or sys.stdin, WRITE_BATCH_SIZE * args.concurrency):
+            progress = partial(_print_progress, done)
+            if args.delete:
+                result = delete_tracks_from_playlist(dao, playlist_id, uris, args.concurrency, progress=progress)
+            else:
+                result = add_tracks_to_playlist(dao, playlist_id, uris, args.concurrency, progress=progress)
+            done += result.chunks
+        if result is not None:
+            print(result.snapshot_id)
 
 
 if __name__ == '__main__':
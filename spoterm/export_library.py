@@ -0,0 +1,112 @@
+import os
+import sys
+import argparse
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from spoterm.config.env import API_URL
+from spoterm.dao.request_stats import STATS_FORMATS, report_stats
+from spoterm.get_my_followed_artists import get_my_followed_artists
+from spoterm.get_my_playlists import get_my_playlists
+from spoterm.get_playlist_tracks import iter_playlist_tracks
+
+
+DEFAULT_CONCURRENCY = 8
+SAVED_TRACKS_FIELDS = 'items(added_at,track(uri,name,artists(name))),next'
+PLAYLIST_TRACK_FIELDS = ('added_at', 'track.name', 'track.artists')
+
+
+class ExportSummary(NamedTuple):
+    playlists_refreshed: int
+    playlists_unchanged: int
+    playlists_removed: int
+    playlist_tracks: int
+    artists_added: int
+    artists_removed: int
+    saved_tracks: int
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Arguments')
+    parser.add_argument('database', type=str, help='SQLite database to create or refresh')
+    parser.add_argument('--client-id', '-c', type=str, help='Client id required to use webapi',
+                        default=os.environ.get('SPOTIFY_CLIENT_ID'), required='SPOTIFY_CLIENT_ID' not in os.environ)
+    parser.add_argument('--client-secret', '-s', type=str, help='Client secret required to use webapi',
+                        default=os.environ.get('SPOTIFY_CLIENT_SECRET'),
+                        required='SPOTIFY_CLIENT_SECRET' not in os.environ)
+    parser.add_argument('--token-cache-loc', '-t', type=str, help='Location of token cache to use',
+                        default=os.environ.get('SPOTIFY_TOKEN_CACHE_LOC'))
+    parser.add_argument('--rate-limit', '-l', type=float, help='Maximum number of requests per second to send',
+                        default=os.environ.get('SPOTIFY_RATE_LIMIT'))
+    parser.add_argument('--stats', type=str, nargs='?', const='table', choices=STATS_FORMATS,
+                        help='Report request statistics per endpoint on stderr when done')
+    parser.add_argument('--stats-file', type=str, help='Write the --stats report to this file instead of stderr')
+    parser.add_argument('--concurrency', '-j', type=int, help='Number of playlist pages to fetch concurrently',
+                        default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--full', action='store_true',
+                        help='Refetch every playlist and all saved tracks instead of only what changed')
+    return parser.parse_args(argv)
+
+
+def _artist_names(artists: Optional[List[Dict[str, Any]]]) -> Optional[str]:
+    return ', '.join(a['name'] for a in artists if a.get('name')) if artists else None
+
+
+def iter_my_saved_tracks(dao) -> Iterator[Tuple[str, str, Optional[str], Optional[str]]]:
+    url: Optional[str] = f'{API_URL}/me/tracks?limit=50'
+    while url:
+        res = dao.get(url, fields=SAVED_TRACKS_FIELDS)
+        for item in res['items']:
+            track = item.get('track')
+            if track is not None:
+                yield track['uri'], item['added_at'], track.get('name'), _artist_names(track.get('artists'))
+        url = res['next']
+
+
+def export_library(dao, store, concurrency=1, full=False) -> ExportSummary:
+    playlists = {p['uri'].replace('spotify:playlist:', ''): p for p in get_my_playlists(dao)}
+    snapshots = {} if full else store.playlist_snapshots()
+    changed = [p for p, info in playlists.items() if snapshots.get(p) != info.get('snapshot_id')]
+
+    playlist_tracks = 0
+    for playlist_id, tracks in iter_playlist_tracks(dao, changed, concurrency, fields=PLAYLIST_TRACK_FIELDS):
+        info = playlists[playlist_id]
+        records = list(tracks.records())
+        playlist_tracks += store.replace_playlist(playlist_id, info.get('name'), info.get('snapshot_id', ''),
+                                                  ((r.uri, r.added_at) for r in records))
+        store.index_tracks((r.uri, r.track_name, _artist_names(r.track_artists)) for r in records)
+    playlists_removed = store.remove_playlists_except(playlists)
+
+    artists_added, artists_removed = store.sync_followed_artists(
+        (a['uri'], a.get('name')) for a in get_my_followed_artists(dao))
+
+    saved_tracks = []
+    for uri, added_at, name, artists in iter_my_saved_tracks(dao):
+        if not full and store.saved_track(uri) == added_at:
+            break
+        saved_tracks.append((uri, added_at, name, artists))
+    store.add_saved_tracks(((uri, added_at) for uri, added_at, _, _ in saved_tracks), replace=full)
+    store.index_tracks((uri, name, artists) for uri, _, name, artists in saved_tracks)
+    store.remove_unreferenced_tracks()
+
+    return ExportSummary(len(changed), len(playlists) - len(changed), playlists_removed, playlist_tracks,
+                         artists_added, artists_removed, len(saved_tracks))
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+
+    from spoterm.dao.dao_factory import create_authorization_code_dao  # pylint: disable=import-outside-toplevel
+    from spoterm.dao.library_store import LibraryStore  # pylint: disable=import-outside-toplevel
+    with report_stats(args.stats, args.stats_file) as stats:
+        dao = create_authorization_code_dao(args.client_id, args.client_secret, args.token_cache_loc, args.rate_limit,
+                                            pool_size=args.concurrency, stats=stats)
+        store = LibraryStore(args.database)
+        try:
+            summary = export_library(dao, store, args.concurrency, args.full)
+        finally:
+            store.close()
+        for name, value in summary._asdict().items():
+            print(f'{name.replace("_", " ")}: {value}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,28 +1,74 @@
 import os
+import sys
+import json
 import argparse
-from spoterm.config.env import REDIRECT_URI, SPOTIFY_AUTH_SCOPES
-from spoterm.dao.spotify_dao import SpotifyDao
-from spoterm.authorization.authorization_code_token_provider import AuthorizationCodeTokenProvider
-from spoterm.authorization.login.chrome_driver_login_handler import ChromeDriverLoginHandler
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from spoterm.config.env import API_URL
+from spoterm.dao.request_stats import STATS_FORMATS, report_stats
 
 
-def _parse_args():
+ARTIST_FIELDS = 'artists(items(uri,name),next)'
+ARTIST_DETAIL_FIELDS = 'artists(uri,genres,popularity,followers.total)'
+RELEASE_FIELDS = 'items(uri,name,album_type,release_date,release_date_precision),next'
+TOP_TRACK_FIELDS = 'tracks(uri,name,popularity)'
+ARTIST_BATCH_SIZE = 50
+RELEASE_LIMIT = 50
+DEFAULT_CONCURRENCY = 8
+DEFAULT_MARKET = 'from_token'
+RELEASE_DATE_LENGTHS = {'year': 4, 'month': 7, 'day': 10}
+
+
+def _parse_args(argv=None):
     parser = argparse.ArgumentParser(description='Arguments')
     parser.add_argument('--client-id', '-c', type=str, help='Client id required to use webapi',
-                        default=os.environ['SPOTIFY_CLIENT_ID'])
+                        default=os.environ.get('SPOTIFY_CLIENT_ID'), required='SPOTIFY_CLIENT_ID' not in os.environ)
     parser.add_argument('--client-secret', '-s', type=str, help='Client secret required to use webapi',
-                        default=os.environ['SPOTIFY_CLIENT_SECRET'])
+                        default=os.environ.get('SPOTIFY_CLIENT_SECRET'),
+                        required='SPOTIFY_CLIENT_SECRET' not in os.environ)
     parser.add_argument('--token-cache-loc', '-t', type=str, help='Location of token cache to use',
                         default=os.environ.get('SPOTIFY_TOKEN_CACHE_LOC'))
+    parser.add_argument('--rate-limit', '-l', type=float, help='Maximum number of requests per second to send',
+                        default=os.environ.get('SPOTIFY_RATE_LIMIT'))
+    parser.add_argument('--stats', type=str, nargs='?', const='table', choices=STATS_FORMATS,
+                        help='Report request statistics per endpoint on stderr when done')
+    parser.add_argument('--stats-file', type=str, help='Write the --stats report to this file instead of stderr')
+    parser.add_argument('--http-cache', action='store_true',
+                        help='Cache responses in the token cache location and revalidate them with ETags')
     parser.add_argument('--name', '-n', action='store_true', help='Also returns artist name')
-    return parser.parse_args()
+    parser.add_argument('--with-releases', '-r', action='store_true',
+                        help='Print each artist as JSON with its albums and singles')
+    parser.add_argument('--with-top-tracks', '-T', action='store_true',
+                        help='Print each artist as JSON with its top tracks')
+    parser.add_argument('--since', type=str, help='Only include releases on or after this YYYY-MM-DD date')
+    parser.add_argument('--market', '-M', type=str, default=DEFAULT_MARKET,
+                        help='Market for releases and top tracks, defaults to the market of the user')
+    parser.add_argument('--concurrency', '-j', type=int, help='Number of artist requests to send concurrently',
+                        default=DEFAULT_CONCURRENCY)
+    args = parser.parse_args(argv)
+    if args.http_cache and args.token_cache_loc is None:
+        parser.error('--http-cache requires --token-cache-loc')
+    return args
 
 
 def get_my_followed_artists(dao):
     retrieved = []
-    url = 'https://api.spotify.com/v1/me/following?limit=50&type=artist&fields=artists.items.uri,artists.next'
+    url = f'{API_URL}/me/following?limit=50&type=artist'
+    while True:
+        res = dao.get(url, fields=ARTIST_FIELDS)
+        retrieved.extend(res['artists']['items'])
+        if res['artists']['next']:
+            url = res['artists']['next']
+        else:
+            break
+    return retrieved
+
+
+async def get_my_followed_artists_async(dao):
+    retrieved = []
+    url = f'{API_URL}/me/following?limit=50&type=artist'
     while True:
-        res = dao.get(url)
+        res = await dao.get(url, fields=ARTIST_FIELDS)
         retrieved.extend(res['artists']['items'])
         if res['artists']['next']:
             url = res['artists']['next']
@@ -31,22 +77,89 @@ def get_my_followed_artists(dao):
     return retrieved
 
 
-def main():
-    args = _parse_args()
+def _artist_id(artist):
+    return artist['uri'].replace('spotify:artist:', '')
 
-    token_cache = None if args.token_cache_loc is None else os.path.join(args.token_cache_loc, '.ac_token_cache.json')
-    scopes = [s for v in SPOTIFY_AUTH_SCOPES.values() for s in v]
-    login_handler = ChromeDriverLoginHandler(os.environ.get('CHROME_DRIVER_PATH'))
 
-    auth = AuthorizationCodeTokenProvider(args.client_id, args.client_secret, scopes, REDIRECT_URI,
-                                          login_handler, token_cache)
-    dao = SpotifyDao(auth)
-    retrieved = get_my_followed_artists(dao)
-    for r in retrieved:
-        if args.name:
-            print(r['uri'], r['name'])
-        else:
-            print(r['uri'])
+def _get_artist_details(dao, artist_ids):
+    return dao.get(f'{API_URL}/artists?ids={",".join(artist_ids)}', fields=ARTIST_DETAIL_FIELDS)['artists']
+
+
+def _released_since(release, since):
+    release_date = release.get('release_date')
+    if not release_date:
+        return False
+    length = RELEASE_DATE_LENGTHS.get(release.get('release_date_precision'), len(release_date))
+    return release_date[:length] >= since[:length]
+
+
+def _get_releases(dao, artist_id, market, since=None):
+    releases = []
+    url = (f'{API_URL}/artists/{artist_id}/albums?include_groups=album,single&market={market}'
+           f'&limit={RELEASE_LIMIT}')
+    while url:
+        res = dao.get(url, fields=RELEASE_FIELDS)
+        releases.extend(res['items'])
+        url = res['next']
+    return [r for r in releases if since is None or _released_since(r, since)]
+
+
+def _get_top_tracks(dao, artist_id, market):
+    return dao.get(f'{API_URL}/artists/{artist_id}/top-tracks?market={market}', fields=TOP_TRACK_FIELDS)['tracks']
+
+
+def _submit_batch(executor, dao, batch, with_releases, with_top_tracks, market, since):
+    artist_ids = [_artist_id(a) for a in batch]
+    details = executor.submit(_get_artist_details, dao, artist_ids)
+    releases = [executor.submit(_get_releases, dao, a, market, since) for a in artist_ids] if with_releases else None
+    top_tracks = [executor.submit(_get_top_tracks, dao, a, market) for a in artist_ids] if with_top_tracks else None
+    return batch, details, releases, top_tracks
+
+
+def _resolve_batch(batch, details, releases, top_tracks):
+    for i, (artist, detail) in enumerate(zip(batch, details.result())):
+        merged = dict(artist, **(detail or {}))
+        if releases is not None:
+            merged['releases'] = releases[i].result()
+        if top_tracks is not None:
+            merged['top_tracks'] = top_tracks[i].result()
+        yield merged
+
+
+def iter_artist_details(dao, artists, with_releases=False, with_top_tracks=False, concurrency=1,
+                        market=DEFAULT_MARKET, since=None):
+    artists = list(artists)
+    batches = deque()
+    window = max(1, concurrency // (1 + ARTIST_BATCH_SIZE * (with_releases + with_top_tracks)))
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for start in range(0, len(artists), ARTIST_BATCH_SIZE):
+            batches.append(_submit_batch(executor, dao, artists[start:start + ARTIST_BATCH_SIZE], with_releases,
+                                         with_top_tracks, market, since))
+            if len(batches) > window:
+                yield from _resolve_batch(*batches.popleft())
+        while batches:
+            yield from _resolve_batch(*batches.popleft())
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+
+    from spoterm.dao.dao_factory import create_authorization_code_dao  # pylint: disable=import-outside-toplevel
+    with report_stats(args.stats, args.stats_file) as stats:
+        dao = create_authorization_code_dao(args.client_id, args.client_secret, args.token_cache_loc, args.rate_limit,
+                                            pool_size=args.concurrency, http_cache=args.http_cache, stats=stats)
+        retrieved = get_my_followed_artists(dao)
+        if args.with_releases or args.with_top_tracks:
+            for artist in iter_artist_details(dao, retrieved, args.with_releases, args.with_top_tracks,
+                                              args.concurrency, args.market, args.since):
+                print(json.dumps(artist))
+                sys.stdout.flush()
+            return
+        for r in retrieved:
+            if args.name:
+                print(r['uri'], r['name'])
+            else:
+                print(r['uri'])
 
 
 if __name__ == '__main__':
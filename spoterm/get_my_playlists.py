@@ -1,28 +1,46 @@
 import os
 import argparse
-from spoterm.config.env import REDIRECT_URI, SPOTIFY_AUTH_SCOPES
-from spoterm.dao.spotify_dao import SpotifyDao
-from spoterm.authorization.authorization_code_token_provider import AuthorizationCodeTokenProvider
-from spoterm.authorization.login.chrome_driver_login_handler import ChromeDriverLoginHandler
+from spoterm.config.env import API_URL
+from spoterm.dao.request_stats import STATS_FORMATS, report_stats
+from spoterm.dao.search_index import matches
 
 
-def _parse_args():
+PLAYLIST_FIELDS = 'items(uri,name,snapshot_id),next'
+
+
+def _parse_args(argv=None):
     parser = argparse.ArgumentParser(description='Arguments')
     parser.add_argument('--filter-name', '-f', type=str, help='Optional filter text to filter playlists by name')
+    parser.add_argument('--search', '-q', type=str,
+                        help='Only list playlists with a word starting with each word of this text, ignoring case')
+    parser.add_argument('--library', type=str,
+                        help='Answer from a database written by export_library instead of calling the webapi')
     parser.add_argument('--client-id', '-c', type=str, help='Client id required to use webapi',
-                        default=os.environ['SPOTIFY_CLIENT_ID'])
+                        default=os.environ.get('SPOTIFY_CLIENT_ID'))
     parser.add_argument('--client-secret', '-s', type=str, help='Client secret required to use webapi',
-                        default=os.environ['SPOTIFY_CLIENT_SECRET'])
+                        default=os.environ.get('SPOTIFY_CLIENT_SECRET'))
     parser.add_argument('--token-cache-loc', '-t', type=str, help='Location of token cache to use',
                         default=os.environ.get('SPOTIFY_TOKEN_CACHE_LOC'))
-    return parser.parse_args()
+    parser.add_argument('--rate-limit', '-l', type=float, help='Maximum number of requests per second to send',
+                        default=os.environ.get('SPOTIFY_RATE_LIMIT'))
+    parser.add_argument('--stats', type=str, nargs='?', const='table', choices=STATS_FORMATS,
+                        help='Report request statistics per endpoint on stderr when done')
+    parser.add_argument('--stats-file', type=str, help='Write the --stats report to this file instead of stderr')
+    parser.add_argument('--http-cache', action='store_true',
+                        help='Cache responses in the token cache location and revalidate them with ETags')
+    args = parser.parse_args(argv)
+    if args.library is None and (args.client_id is None or args.client_secret is None):
+        parser.error('--client-id and --client-secret are required unless --library is given')
+    if args.http_cache and args.token_cache_loc is None:
+        parser.error('--http-cache requires --token-cache-loc')
+    return args
 
 
 def get_my_playlists(dao):
     retrieved = []
-    url = 'https://api.spotify.com/v1/me/playlists?limit=50&fields=items.uri,items.name,next'
+    url = f'{API_URL}/me/playlists?limit=50'
     while True:
-        res = dao.get(url)
+        res = dao.get(url, fields=PLAYLIST_FIELDS)
         retrieved.extend(res['items'])
         if res['next']:
             url = res['next']
@@ -32,19 +50,45 @@ def get_my_playlists(dao):
     return retrieved
 
 
-def main():
-    args = _parse_args()
+async def get_my_playlists_async(dao):
+    retrieved = []
+    url = f'{API_URL}/me/playlists?limit=50'
+    while True:
+        res = await dao.get(url, fields=PLAYLIST_FIELDS)
+        retrieved.extend(res['items'])
+        if res['next']:
+            url = res['next']
+        else:
+            break
+
+    return retrieved
+
+
+def filter_playlists(playlists, filter_name=None, search=None):
+    return [p for p in playlists if (not filter_name or filter_name in (p.get('name') or '')) and
+            (search is None or matches(search, p.get('name')))]
+
+
+def main(argv=None):
+    args = _parse_args(argv)
 
-    token_cache = None if args.token_cache_loc is None else os.path.join(args.token_cache_loc, '.ac_token_cache.json')
-    scopes = [s for v in SPOTIFY_AUTH_SCOPES.values() for s in v]
-    login_handler = ChromeDriverLoginHandler(os.environ.get('CHROME_DRIVER_PATH'))
+    if args.library is not None:
+        from spoterm.dao.library_store import LibraryStore  # pylint: disable=import-outside-toplevel
+        store = LibraryStore(args.library)
+        try:
+            found = store.search('playlist', args.search) if args.search is not None else store.playlists()
+        finally:
+            store.close()
+        for uri, name, _ in found:
+            if not args.filter_name or args.filter_name in (name or ''):
+                print(uri)
+        return
 
-    auth = AuthorizationCodeTokenProvider(args.client_id, args.client_secret, scopes, REDIRECT_URI,
-                                          login_handler, token_cache)
-    dao = SpotifyDao(auth)
-    retrieved = get_my_playlists(dao)
-    for r in retrieved:
-        if not args.filter_name or args.filter_name in r['name']:
+    from spoterm.dao.dao_factory import create_authorization_code_dao  # pylint: disable=import-outside-toplevel
+    with report_stats(args.stats, args.stats_file) as stats:
+        dao = create_authorization_code_dao(args.client_id, args.client_secret, args.token_cache_loc, args.rate_limit,
+                                            http_cache=args.http_cache, stats=stats)
+        for r in filter_playlists(get_my_playlists(dao), args.filter_name, args.search):
             print(r['uri'])
 
 
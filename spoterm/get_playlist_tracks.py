@@ -1,54 +1,189 @@
 import os
+import asyncio
 import sys
 import argparse
-from collections import defaultdict
-from spoterm.dao.spotify_dao import SpotifyDao
-from spoterm.authorization.client_credentials_token_provider import ClientCredentialsTokenProvider
+from functools import partial
+from itertools import islice
+from typing import Deque, Dict, List, NamedTuple, Sequence, Tuple
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from spoterm.config.env import API_URL
+from spoterm.dao.request_stats import STATS_FORMATS, report_stats
+from spoterm.util.track_id_store import TrackIdStore
+from spoterm.util.uri_reader import iter_uris
 
 
-def _parse_args():
+PAGE_LIMIT = 100
+DEFAULT_CONCURRENCY = 8
+SYNC_BATCH_SIZE = 50
+
+
+def _parse_args(argv=None):
     parser = argparse.ArgumentParser(description='Arguments')
     parser.add_argument('playlists', type=str, nargs='*', help='playlists to get tracks for')
     parser.add_argument('--client-id', '-c', type=str, help='Client id required to use webapi',
-                        default=os.environ['SPOTIFY_CLIENT_ID'])
+                        default=os.environ.get('SPOTIFY_CLIENT_ID'), required='SPOTIFY_CLIENT_ID' not in os.environ)
     parser.add_argument('--client-secret', '-s', type=str, help='Client secret required to use webapi',
-                        default=os.environ['SPOTIFY_CLIENT_SECRET'])
+                        default=os.environ.get('SPOTIFY_CLIENT_SECRET'),
+                        required='SPOTIFY_CLIENT_SECRET' not in os.environ)
     parser.add_argument('--token-cache-loc', '-t', type=str, help='Location of token cache to use',
                         default=os.environ.get('SPOTIFY_TOKEN_CACHE_LOC'))
-    return parser.parse_args()
-
-
-def get_playlist_tracks(dao, playlists):
-    playlist_tracks = defaultdict(list)
-    for playlist in playlists:
-        playlist_id = playlist.replace('spotify:playlist:', '')
-
-        url = f'https://api.spotify.com/v1/playlists/{playlist_id}/tracks?fields=items.track.uri,next'
-        while True:
-            res = dao.get(url)
-            playlist_tracks[playlist].extend(res['items'])
-            if res['next']:
-                url = res['next']
-            else:
-                break
+    parser.add_argument('--rate-limit', '-l', type=float, help='Maximum number of requests per second to send',
+                        default=os.environ.get('SPOTIFY_RATE_LIMIT'))
+    parser.add_argument('--stats', type=str, nargs='?', const='table', choices=STATS_FORMATS,
+                        help='Report request statistics per endpoint on stderr when done')
+    parser.add_argument('--stats-file', type=str, help='Write the --stats report to this file instead of stderr')
+    parser.add_argument('--http-cache', action='store_true',
+                        help='Cache responses in the token cache location and revalidate them with ETags')
+    parser.add_argument('--concurrency', '-j', type=int, help='Number of pages to fetch concurrently',
+                        default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--mirror', '-m', action='store_true',
+                        help='Keep a local mirror in the token cache location and only refetch changed playlists')
+    parser.add_argument('--changes', action='store_true',
+                        help='Print tracks added (+) and removed (-) since the last mirrored sync')
+    args = parser.parse_args(argv)
+    args.mirror = args.mirror or args.changes
+    if (args.http_cache or args.mirror) and args.token_cache_loc is None:
+        parser.error('--http-cache and --mirror require --token-cache-loc')
+    return args
+
+
+class PlaylistSync(NamedTuple):
+    playlist: str
+    tracks: TrackIdStore
+    added: List[str]
+    removed: List[str]
+
+
+def _playlist_id(playlist):
+    return playlist.replace('spotify:playlist:', '')
+
+
+def _tracks_url(playlist, offset, fields=()):
+    item_fields = ','.join(f'items.{f}' for f in ('track.uri',) + tuple(fields))
+    return (f'{API_URL}/playlists/{_playlist_id(playlist)}/tracks'
+            f'?fields={item_fields},total&limit={PAGE_LIMIT}&offset={offset}')
+
+
+def _get_page(dao, url, fields):
+    res = dao.get(url)
+    return res['total'], TrackIdStore.from_items(res['items'], fields)
+
+
+def _resolve_playlist(executor, dao, playlist, first_page, fields):
+    total, tracks = first_page.result()
+    pages = [executor.submit(_get_page, dao, _tracks_url(playlist, offset, fields), fields)
+             for offset in range(PAGE_LIMIT, total, PAGE_LIMIT)]
+    for page in pages:
+        tracks.extend(page.result()[1])
+    return playlist, tracks
+
+
+def iter_playlist_tracks(dao, playlists, concurrency=1, fields: Sequence[str] = ()):
+    first_pages: Deque[Tuple[str, Future]] = deque()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for playlist in playlists:
+            first_pages.append((playlist, executor.submit(_get_page, dao, _tracks_url(playlist, 0, fields), fields)))
+            if len(first_pages) >= concurrency:
+                yield _resolve_playlist(executor, dao, *first_pages.popleft(), fields)
+        while first_pages:
+            yield _resolve_playlist(executor, dao, *first_pages.popleft(), fields)
+
+
+def get_playlist_tracks(dao, playlists, concurrency=1, fields: Sequence[str] = ()) -> Dict[str, TrackIdStore]:
+    playlist_tracks: Dict[str, TrackIdStore] = {}
+    for playlist, tracks in iter_playlist_tracks(dao, playlists, concurrency, fields):
+        playlist_tracks.setdefault(playlist, TrackIdStore(fields=fields)).extend(tracks)
     return playlist_tracks
 
 
-def main():
-    args = _parse_args()
-    if not args.playlists:
-        playlists = [u.strip() for ln in sys.stdin.readlines() for u in ln.split(' ')]
-    else:
-        playlists = args.playlists
+def _get_snapshot_id(dao, playlist):
+    return dao.get(f'{API_URL}/playlists/{_playlist_id(playlist)}?fields=snapshot_id')['snapshot_id']
+
+
+def _diff(old_tracks, new_tracks):
+    old_set, new_set = set(old_tracks), set(new_tracks)
+    return [t for t in new_tracks if t not in old_set], [t for t in old_tracks if t not in new_set]
+
+
+def _sync_batch(executor, dao, mirror, playlists, concurrency):
+    snapshot_ids = list(executor.map(partial(_get_snapshot_id, dao), playlists))
+    mirrored = [mirror.get(_playlist_id(p)) for p in playlists]
+
+    changed = [p for p, snapshot_id, m in zip(playlists, snapshot_ids, mirrored)
+               if m is None or m.snapshot_id != snapshot_id]
+    fetched = iter_playlist_tracks(dao, changed, concurrency)
+    for playlist, snapshot_id, m in zip(playlists, snapshot_ids, mirrored):
+        if m is not None and m.snapshot_id == snapshot_id:
+            yield PlaylistSync(playlist, m.tracks, [], [])
+            continue
+        resolved = next(fetched, None)
+        if resolved is None:
+            raise RuntimeError(f'No tracks were fetched for changed playlist {playlist}')
+        _, tracks = resolved
+        added, removed = _diff(m.tracks if m is not None else [], tracks)
+        mirror.put(_playlist_id(playlist), snapshot_id, tracks)
+        yield PlaylistSync(playlist, tracks, added, removed)
+
+
+def sync_playlist_tracks(dao, mirror, playlists, concurrency=1):
+    playlists = iter(playlists)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        batch = list(islice(playlists, SYNC_BATCH_SIZE))
+        while batch:
+            yield from _sync_batch(executor, dao, mirror, batch, concurrency)
+            batch = list(islice(playlists, SYNC_BATCH_SIZE))
+
+
+async def _get_playlist_tracks_async(dao, playlist):
+    res = await dao.get(_tracks_url(playlist, 0))
+    pages = await asyncio.gather(*[dao.get(_tracks_url(playlist, offset))
+                                   for offset in range(PAGE_LIMIT, res['total'], PAGE_LIMIT)])
+    tracks = TrackIdStore.from_items(res['items'])
+    for page in pages:
+        tracks.extend(TrackIdStore.from_items(page['items']))
+    return tracks
+
+
+async def get_playlist_tracks_async(dao, playlists):
+    playlist_tracks: Dict[str, TrackIdStore] = {}
+    results = await asyncio.gather(*[_get_playlist_tracks_async(dao, p) for p in playlists])
+    for playlist, tracks in zip(playlists, results):
+        playlist_tracks.setdefault(playlist, TrackIdStore()).extend(tracks)
+    return playlist_tracks
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    playlists = iter_uris(args.playlists or sys.stdin)
+
+    from spoterm.dao.dao_factory import create_client_credentials_dao  # pylint: disable=import-outside-toplevel
+    with report_stats(args.stats, args.stats_file) as stats:
+        dao = create_client_credentials_dao(args.client_id, args.client_secret, args.token_cache_loc, args.rate_limit,
+                                            pool_size=args.concurrency, http_cache=args.http_cache, stats=stats)
 
-    token_cache = None if args.token_cache_loc is None else os.path.join(args.token_cache_loc, '.cc_token_cache.json')
+        if args.mirror:
+            from spoterm.dao.playlist_mirror import PlaylistMirror  # pylint: disable=import-outside-toplevel
+            mirror = PlaylistMirror(os.path.join(args.token_cache_loc, '.playlist_mirror.sqlite'))
+            try:
+                for sync in sync_playlist_tracks(dao, mirror, playlists, args.concurrency):
+                    if args.changes:
+                        for track in sync.added:
+                            print(f'+{track}')
+                        for track in sync.removed:
+                            print(f'-{track}')
+                    else:
+                        for track in sync.tracks:
+                            print(track)
+                    sys.stdout.flush()
+            finally:
+                mirror.close()
+            return
 
-    auth = ClientCredentialsTokenProvider(args.client_id, args.client_secret, token_cache)
-    dao = SpotifyDao(auth)
-    playlists = get_playlist_tracks(dao, playlists)
-    for playlist in playlists.values():
-        for track in playlist:
-            print(track['track']['uri'])
+        for _, tracks in iter_playlist_tracks(dao, playlists, args.concurrency):
+            for track in tracks:
+                print(track)
+            sys.stdout.flush()
 
 
 if __name__ == '__main__':
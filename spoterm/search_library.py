@@ -0,0 +1,37 @@
+import argparse
+from spoterm.dao.search_index import KINDS
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Arguments')
+    parser.add_argument('database', type=str, help='SQLite database written by export_library')
+    parser.add_argument('query', type=str, nargs='+', help='Words to look up, each matching as a prefix')
+    parser.add_argument('--type', '-T', type=str, choices=KINDS, default='track', help='What to search for')
+    parser.add_argument('--containing', '-C', action='store_true',
+                        help='List playlists containing a track uri or the tracks matching the query')
+    parser.add_argument('--fuzzy', '-z', action='store_true',
+                        help='Fall back to close spellings for words without a prefix match')
+    return parser.parse_args(argv)
+
+
+def search_library(store, query, kind='track', containing=False, fuzzy=False):
+    if containing:
+        return store.playlists_containing(query, fuzzy)
+    return store.search(kind, query, fuzzy)
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+
+    from spoterm.dao.library_store import LibraryStore  # pylint: disable=import-outside-toplevel
+    store = LibraryStore(args.database)
+    try:
+        results = search_library(store, ' '.join(args.query), args.type, args.containing, args.fuzzy)
+    finally:
+        store.close()
+    for uri, name, artists in results:
+        print('\t'.join(v for v in (uri, name, artists) if v is not None))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,25 +1,60 @@
 import os
 import sys
+import csv
+import json
+import itertools
 import argparse
-from tabulate import tabulate
-from spoterm.dao.spotify_dao import SpotifyDao
-from spoterm.authorization.client_credentials_token_provider import ClientCredentialsTokenProvider
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from spoterm.config.env import API_URL
+from spoterm.dao.request_stats import STATS_FORMATS, report_stats
+from spoterm.util.uri_reader import iter_uri_batches
 
 
-def _parse_args():
+BATCH_SIZE = 50
+DEFAULT_CONCURRENCY = 4
+DEFAULT_ENTITY_STORE_MB = 256
+OUTPUT_FORMATS = ['orgtbl', 'ndjson', 'csv', 'tsv']
+TRACK_FIELDS = 'tracks(uri,name,artists(name),duration_ms,album(name,release_date))'
+AUDIO_FEATURES_FIELDS = 'audio_features(uri,tempo)'
+STORED_TRACK_FIELDS = ('tracks(uri,name,artists(uri,name),duration_ms,explicit,popularity,disc_number,track_number,'
+                       'external_ids,album(uri,name,album_type,release_date,release_date_precision,total_tracks))')
+STORED_AUDIO_FEATURES_FIELDS = ('audio_features(uri,tempo,time_signature,key,mode,loudness,energy,danceability,'
+                                'valence,acousticness,instrumentalness,liveness,speechiness)')
+
+
+def _parse_args(argv=None):
     parser = argparse.ArgumentParser(description='Arguments')
     parser.add_argument('uris', type=str, nargs='*', help='track uris to print info for')
     parser.add_argument('--client-id', '-c', type=str, help='Client id required to use webapi',
-                        default=os.environ['SPOTIFY_CLIENT_ID'])
+                        default=os.environ.get('SPOTIFY_CLIENT_ID'), required='SPOTIFY_CLIENT_ID' not in os.environ)
     parser.add_argument('--client-secret', '-s', type=str, help='Client secret required to use webapi',
-                        default=os.environ['SPOTIFY_CLIENT_SECRET'])
+                        default=os.environ.get('SPOTIFY_CLIENT_SECRET'),
+                        required='SPOTIFY_CLIENT_SECRET' not in os.environ)
     parser.add_argument('--token-cache-loc', '-t', type=str, help='Location of token cache to use',
                         default=os.environ.get('SPOTIFY_TOKEN_CACHE_LOC'))
+    parser.add_argument('--rate-limit', '-l', type=float, help='Maximum number of requests per second to send',
+                        default=os.environ.get('SPOTIFY_RATE_LIMIT'))
+    parser.add_argument('--stats', type=str, nargs='?', const='table', choices=STATS_FORMATS,
+                        help='Report request statistics per endpoint on stderr when done')
+    parser.add_argument('--stats-file', type=str, help='Write the --stats report to this file instead of stderr')
+    parser.add_argument('--concurrency', '-j', type=int, help='Number of batches to fetch concurrently',
+                        default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--format', '-f', type=str, choices=OUTPUT_FORMATS, default='orgtbl',
+                        help='Output format, all formats except orgtbl are written as each batch is resolved')
+    parser.add_argument('--entity-store', '-e', action='store_true',
+                        help='Keep tracks and audio features in the token cache location and only fetch missing ones')
+    parser.add_argument('--entity-ttl', type=float, help='Refetch stored entities older than this many days')
+    parser.add_argument('--entity-max-mb', type=float, help='Size cap of the entity store in MiB, oldest dropped first',
+                        default=DEFAULT_ENTITY_STORE_MB)
     parser.add_argument('--uri', '-u', action='store_true')
     parser.add_argument('--bpm', '-b', action='store_true')
     parser.add_argument('--album', '-a', action='store_true')
     parser.add_argument('--release', '-r', action='store_true')
-    return parser.parse_args()
+    args = parser.parse_args(argv)
+    if args.entity_store and args.token_cache_loc is None:
+        parser.error('--entity-store requires --token-cache-loc')
+    return args
 
 
 def _format_duration(millis):
@@ -30,6 +65,11 @@ def _format_duration(millis):
     return f'{mins:02}:{secs:02}' if not hours else f'{hours:02}:{mins:02}:{secs:02}'
 
 
+def track_fields(add_uri, add_album, add_bpm, add_release):
+    return ((['uri'] if add_uri else []) + ['name', 'artists', 'duration'] + (['album'] if add_album else []) +
+            (['BPM'] if add_bpm else []) + (['release'] if add_release else []))
+
+
 def _format_track_result(track_result, add_uri, add_album, add_release, bpms):
     res = dict()
     if add_uri:
@@ -39,61 +79,182 @@ def _format_track_result(track_result, add_uri, add_album, add_release, bpms):
     res['duration'] = _format_duration(track_result['duration_ms'])
     if add_album:
         res['album'] = track_result['album']['name']
-    if bpms:
-        res['BPM'] = bpms[track_result['uri']]
+    if bpms is not None:
+        res['BPM'] = bpms.get(track_result['uri'])
     if add_release:
         res['release'] = track_result['album']['release_date']
     return res
 
 
-def get_track_data(dao, track_uris, get_bpm, get_uri, get_album, get_release):
-    track_data = []
+def _track_id(uri):
+    return uri.replace('spotify:track:', '')
 
-    while True:
-        ids_to_get = '%2C'.join([u.replace('spotify:track:', '') for u in track_uris[:50]])
-        url = f'https://api.spotify.com/v1/tracks?ids={ids_to_get}'
-        results = dao.get(url)
-        if get_bpm:
-            af_url = f'https://api.spotify.com/v1/audio-features?ids={ids_to_get}'
-            af_results = dao.get(af_url)
-            res_bpms = {r['uri']: round(r['tempo']) for r in af_results['audio_features']}
-        else:
-            res_bpms = dict()
 
-        track_data.extend(
-            [_format_track_result(t, get_uri, get_album, get_release, res_bpms) for t in results['tracks'] if t is not None]
-        )
-        if len(track_uris) > 50:
-            track_uris = track_uris[50:]
+def _get_ids(track_uris):
+    return '%2C'.join([_track_id(u) for u in track_uris])
+
+
+def _get_bpms(af_results):
+    return {r['uri']: round(r['tempo']) for r in af_results['audio_features'] if r}
+
+
+def _format_batch(results, res_bpms, get_uri, get_album, get_release):
+    return [_format_track_result(t, get_uri, get_album, get_release, res_bpms)
+            for t in results['tracks'] if t is not None]
+
+
+def _get_tracks(dao, ids_to_get, fields=TRACK_FIELDS):
+    return dao.get(f'{API_URL}/tracks?ids={ids_to_get}', fields=fields)
+
+
+def _get_audio_features(dao, ids_to_get, fields=AUDIO_FEATURES_FIELDS):
+    return dao.get(f'{API_URL}/audio-features?ids={ids_to_get}', fields=fields)
+
+
+def _submit_misses(executor, store, kind, get, dao, batch, fields, stored_fields):
+    if store is None:
+        return {}, batch, executor.submit(get, dao, _get_ids(batch), fields)
+    stored = store.get_many(kind, [_track_id(u) for u in batch])
+    missing = list(dict.fromkeys(u for u in batch if _track_id(u) not in stored))
+    return stored, missing, executor.submit(get, dao, _get_ids(missing), stored_fields) if missing else None
+
+
+def _entity_id(entity):
+    return entity['uri'].rsplit(':', 1)[-1]
+
+
+def _store_related(store, tracks):
+    store.put_many('album', {_entity_id(t['album']): t['album'] for t in tracks if t.get('album', {}).get('uri')})
+    store.put_many('artist', {_entity_id(a): a for t in tracks for a in t.get('artists', []) if a.get('uri')})
+
+
+def _merge_fetched(store, kind, pending, key):
+    stored, missing, future = pending
+    fetched = {_track_id(e['uri']): e for e in future.result()[key] if e is not None} if future is not None else {}
+    if store is not None:
+        if kind == 'audio_features':
+            fetched.update((_track_id(u), {}) for u in missing if _track_id(u) not in fetched)
         else:
-            break
-    return track_data
+            _store_related(store, fetched.values())
+        store.put_many(kind, fetched)
+    return dict(stored, **fetched)
+
+
+def iter_track_data(dao, batches, get_bpm, get_uri, get_album, get_release, concurrency=1, store=None):
+    in_flight = deque()
+    with ThreadPoolExecutor(max_workers=concurrency * 2 if get_bpm else concurrency) as executor:
+        for batch in batches:
+            in_flight.append((batch, _submit_misses(executor, store, 'track', _get_tracks, dao, batch, TRACK_FIELDS,
+                                                    STORED_TRACK_FIELDS),
+                              _submit_misses(executor, store, 'audio_features', _get_audio_features, dao, batch,
+                                             AUDIO_FEATURES_FIELDS, STORED_AUDIO_FEATURES_FIELDS) if get_bpm else None))
+            if len(in_flight) >= concurrency:
+                yield _resolve_batch(in_flight.popleft(), get_uri, get_album, get_release, store)
+        while in_flight:
+            yield _resolve_batch(in_flight.popleft(), get_uri, get_album, get_release, store)
+
+
+def _resolve_batch(pending, get_uri, get_album, get_release, store=None):
+    batch, tracks_pending, features_pending = pending
+    res_bpms = None
+    if features_pending is not None:
+        af_by_id = _merge_fetched(store, 'audio_features', features_pending, 'audio_features')
+        res_bpms = _get_bpms({'audio_features': list(af_by_id.values())})
+    tracks = _merge_fetched(store, 'track', tracks_pending, 'tracks')
+    return _format_batch({'tracks': [tracks.get(_track_id(u)) for u in batch]}, res_bpms, get_uri, get_album,
+                         get_release)
+
+
+def get_track_data(dao, track_uris, get_bpm, get_uri, get_album, get_release, concurrency=1, store=None):
+    batches = _iter_batches(track_uris)
+    return [t for batch in iter_track_data(dao, batches, get_bpm, get_uri, get_album, get_release, concurrency, store)
+            for t in batch]
 
 
-def main():
-    args = _parse_args()
+async def get_track_data_async(dao, track_uris, get_bpm, get_uri, get_album, get_release):
+    import asyncio  # pylint: disable=import-outside-toplevel
+
+    async def get_batch(batch):
+        ids_to_get = _get_ids(batch)
+        calls = [_get_tracks(dao, ids_to_get)]
+        if get_bpm:
+            calls.append(_get_audio_features(dao, ids_to_get))
+        results = await asyncio.gather(*calls)
+        res_bpms = _get_bpms(results[1]) if get_bpm else None
+        return _format_batch(results[0], res_bpms, get_uri, get_album, get_release)
+
+    batches = await asyncio.gather(*[get_batch(track_uris[i:i + BATCH_SIZE])
+                                     for i in range(0, len(track_uris), BATCH_SIZE)])
+    return [t for batch in batches for t in batch]
+
+
+def _iter_batches(track_uris):
+    return (track_uris[i:i + BATCH_SIZE] for i in range(0, len(track_uris), BATCH_SIZE))
 
-    if not args.uris:
-        track_uris = [u.strip() for ln in sys.stdin.readlines() for u in ln.split(' ')]
-    else:
-        track_uris = args.uris
 
-    if not track_uris:
+def write_track_data(track_batches, output_format, out, fieldnames=None):
+    writer = None
+    written = 0
+    for batch in track_batches:
+        for track in batch:
+            if output_format == 'ndjson':
+                out.write(json.dumps(track) + '\n')
+            else:
+                if writer is None:
+                    writer = csv.DictWriter(out, fieldnames=fieldnames or list(track.keys()), restval='',
+                                            delimiter='\t' if output_format == 'tsv' else ',', lineterminator='\n')
+                    writer.writeheader()
+                writer.writerow(track)
+        written += len(batch)
+        out.flush()
+    return written
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+
+    batches = iter_uri_batches(args.uris or sys.stdin, BATCH_SIZE)
+    first_batch = next(batches, None)
+    if first_batch is None:
         print('No tracks found')
         sys.exit(0)
+    batches = itertools.chain([first_batch], batches)
+
+    from spoterm.dao.dao_factory import create_client_credentials_dao  # pylint: disable=import-outside-toplevel
+    store = None
+    try:
+        with report_stats(args.stats, args.stats_file) as stats:
+            dao = create_client_credentials_dao(args.client_id, args.client_secret, args.token_cache_loc,
+                                                args.rate_limit, pool_size=args.concurrency * 2, stats=stats)
+            if args.entity_store:
+                from spoterm.dao.entity_store import EntityStore  # pylint: disable=import-outside-toplevel
+                store = EntityStore(os.path.join(args.token_cache_loc, '.entity_store.sqlite'),
+                                    args.entity_ttl * 86400 if args.entity_ttl is not None else None,
+                                    int(args.entity_max_mb * 1024 * 1024))
+                if stats is not None:
+                    stats.add_source('entity_store', store.stats)
 
-    token_cache = None if args.token_cache_loc is None else os.path.join(args.token_cache_loc, '.cc_token_cache.json')
+            if args.format != 'orgtbl':
+                track_batches = iter_track_data(dao, batches, args.bpm, args.uri, args.album, args.release,
+                                                args.concurrency, store)
+                fieldnames = track_fields(args.uri, args.album, args.bpm, args.release)
+                if not write_track_data(track_batches, args.format, sys.stdout, fieldnames):
+                    print('No track data found for provided uri(s)', file=sys.stderr)
+                return
 
-    auth = ClientCredentialsTokenProvider(args.client_id, args.client_secret, token_cache)
-    dao = SpotifyDao(auth)
-    track_data = get_track_data(dao, track_uris, args.bpm, args.uri, args.album, args.release)
+            track_data = [t for batch in iter_track_data(dao, batches, args.bpm, args.uri, args.album, args.release,
+                                                         args.concurrency, store) for t in batch]
 
-    if not track_data:
-        print('No track data found for provided uri(s)')
-    else:
-        table_data = [list(t.values()) for t in track_data]
-        headers = list(track_data[0].keys())
-        print(tabulate(table_data, headers=headers, tablefmt='orgtbl'), '\n')
+            if not track_data:
+                print('No track data found for provided uri(s)')
+            else:
+                from tabulate import tabulate  # pylint: disable=import-outside-toplevel
+                table_data = [list(t.values()) for t in track_data]
+                headers = list(track_data[0].keys())
+                print(tabulate(table_data, headers=headers, tablefmt='orgtbl'), '\n')
+    finally:
+        if store is not None:
+            store.close()
 
 
 if __name__ == '__main__':
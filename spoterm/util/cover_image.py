@@ -0,0 +1,92 @@
+import io
+import base64
+from typing import Any, Dict, List, Optional
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover
+    Image = None  # type: ignore
+
+
+MAX_UPLOAD_BYTES = 256 * 1024
+MAX_JPEG_BYTES = MAX_UPLOAD_BYTES // 4 * 3
+MAX_DOWNLOAD_BYTES = 16 * 1024 * 1024
+MIN_COVER_SIDE = 300
+MIN_RESIZE_SIDE = 64
+DOWNLOAD_CHUNK = 64 * 1024
+JPEG_QUALITIES = (90, 80, 70, 60)
+JPEG_MAGIC = b'\xff\xd8\xff'
+
+
+def choose_renditions(images: List[Dict[str, Any]]) -> List[str]:
+    sized = sorted((i for i in images if i.get('width')), key=lambda i: i['width'])
+    large_enough = [i['url'] for i in sized if i['width'] >= MIN_COVER_SIDE]
+    smaller = [i['url'] for i in reversed(sized) if i['width'] < MIN_COVER_SIDE]
+    return large_enough + smaller + [i['url'] for i in images if not i.get('width')]
+
+
+def _check_size(size: int, source: str) -> None:
+    if size > MAX_DOWNLOAD_BYTES:
+        raise ValueError(f'{source} is larger than {MAX_DOWNLOAD_BYTES} bytes')
+
+
+def read_image_file(path: str) -> bytes:
+    with open(path, 'rb') as image_file:
+        data = image_file.read(MAX_DOWNLOAD_BYTES + 1)
+    _check_size(len(data), path)
+    return data
+
+
+def download_image(session, url: str, cache=None) -> bytes:
+    if cache is not None:
+        entry = cache.lookup(url)
+        if entry is not None:
+            cache.record_hit(url)
+            return entry.body
+    with session.get(url, stream=True) as resp:
+        resp.raise_for_status()
+        _check_size(int(resp.headers.get('Content-Length') or 0), url)
+        data = bytearray()
+        for chunk in resp.iter_content(DOWNLOAD_CHUNK):
+            data += chunk
+            _check_size(len(data), url)
+        etag = resp.headers.get('ETag') or url
+    if cache is not None:
+        cache.store(url, etag, bytes(data))
+    return bytes(data)
+
+
+def _encode_jpeg(image, quality: int) -> bytes:
+    out = io.BytesIO()
+    image.save(out, 'JPEG', quality=quality, optimize=True)
+    return out.getvalue()
+
+
+def fit_jpeg(data: bytes, max_bytes: int = MAX_JPEG_BYTES) -> bytes:
+    if data.startswith(JPEG_MAGIC) and len(data) <= max_bytes:
+        return data
+    if Image is None:
+        reason = 'is not a JPEG' if not data.startswith(JPEG_MAGIC) else f'is {len(data)} bytes, over {max_bytes}'
+        raise ValueError(f'Image {reason}; install Pillow to convert it')
+    image = Image.open(io.BytesIO(data)).convert('RGB')
+    while min(image.size) >= MIN_RESIZE_SIDE:
+        for quality in JPEG_QUALITIES:
+            encoded = _encode_jpeg(image, quality)
+            if len(encoded) <= max_bytes:
+                return encoded
+        image = image.resize((image.width * 3 // 4, image.height * 3 // 4), Image.LANCZOS)
+    raise ValueError(f'Image could not be reduced below {max_bytes} bytes')
+
+
+def encode_cover(data: bytes) -> bytes:
+    return base64.b64encode(fit_jpeg(data))
+
+
+def fetch_cover(session, urls: List[str], cache=None) -> bytes:
+    error: Optional[Exception] = None
+    for url in urls:
+        try:
+            return encode_cover(download_image(session, url, cache))
+        except (OSError, ValueError) as e:
+            error = e
+    raise error if error is not None else ValueError('No image to use as cover')
@@ -0,0 +1,76 @@
+import json
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+
+
+FieldSpec = Dict[str, Any]
+
+
+def loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _add(spec: dict, path: str, sub: Optional[dict]) -> None:
+    head, _, rest = path.partition('.')
+    if head in spec and spec[head] is None:
+        return
+    if not rest and sub is None:
+        spec[head] = None
+        return
+    child = spec.setdefault(head, {})
+    if rest:
+        _add(child, rest, sub)
+    elif sub is not None:
+        for name, nested in sub.items():
+            _add(child, name, nested)
+
+
+def _parse(fields: str, pos: int) -> Tuple[dict, int]:
+    spec: dict = {}
+    name = ''
+    while pos < len(fields):
+        char = fields[pos]
+        if char == '(':
+            sub, pos = _parse(fields, pos + 1)
+            if pos >= len(fields):
+                raise ValueError(f'Unclosed parenthesis in fields: {fields}')
+            _add(spec, name, sub)
+            name = ''
+        elif char == ')':
+            break
+        elif char == ',':
+            if name:
+                _add(spec, name, None)
+            name = ''
+        else:
+            name += char
+        pos += 1
+    if name:
+        _add(spec, name, None)
+    return spec, pos
+
+
+@lru_cache(maxsize=64)
+def parse_fields(fields: str) -> FieldSpec:
+    fields = fields.replace(' ', '')
+    spec, pos = _parse(fields, 0)
+    if pos < len(fields):
+        raise ValueError(f'Unbalanced parentheses in fields: {fields}')
+    return spec
+
+
+def project(data: Any, spec: Optional[FieldSpec]) -> Any:
+    if spec is None or data is None:
+        return data
+    if isinstance(data, list):
+        return [project(d, spec) for d in data]
+    if isinstance(data, dict):
+        return {k: project(data[k], sub) for k, sub in spec.items() if k in data}
+    return data
@@ -0,0 +1,126 @@
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple, Union
+
+
+ID_LENGTH = 22
+URI_PREFIXES = ('spotify:track:', 'spotify:episode:')
+_OTHER = 255
+
+
+@lru_cache(maxsize=None)
+def _record_type(fields: Tuple[str, ...]) -> type:
+    names = ('uri',) + tuple(f.replace('.', '_') for f in fields)
+
+    def __init__(self, *values):
+        for name, value in zip(names, values):
+            setattr(self, name, value)
+
+    def __repr__(self):
+        return f'TrackRecord({", ".join(f"{n}={getattr(self, n)!r}" for n in names)})'
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(getattr(self, n) == getattr(other, n) for n in names)
+
+    return type('TrackRecord', (), {'__slots__': names, '__init__': __init__, '__repr__': __repr__,
+                                    '__eq__': __eq__, '__hash__': None})
+
+
+def _encode(uri: str) -> Tuple[int, bytes]:
+    for kind, prefix in enumerate(URI_PREFIXES):
+        if uri.startswith(prefix) and len(uri) == len(prefix) + ID_LENGTH:
+            try:
+                return kind, uri[len(prefix):].encode('ascii')
+            except UnicodeEncodeError:
+                break
+    return _OTHER, bytes(ID_LENGTH)
+
+
+class TrackIdStore:
+    __slots__ = ('fields', 'record_type', '_ids', '_kinds', '_others', '_columns')
+
+    def __init__(self, uris: Iterable[str] = (), fields: Sequence[str] = ()) -> None:
+        self.fields = tuple(fields)
+        self.record_type = _record_type(self.fields) if self.fields else None
+        self._ids = bytearray()
+        self._kinds = bytearray()
+        self._others: Dict[int, str] = {}
+        self._columns: List[List[Any]] = [[] for _ in self.fields]
+        for uri in uris:
+            self.append(uri)
+
+    @classmethod
+    def from_items(cls, items: Iterable[Dict[str, Any]], fields: Sequence[str] = ()) -> 'TrackIdStore':
+        store = cls(fields=fields)
+        for item in items:
+            uri = _lookup(item, 'track.uri')
+            if uri is not None:
+                store.append(uri, *[_lookup(item, f) for f in store.fields])
+        return store
+
+    def append(self, uri: str, *values: Any) -> None:
+        kind, encoded = _encode(uri)
+        if kind == _OTHER:
+            self._others[len(self._kinds)] = uri
+        self._ids += encoded
+        self._kinds.append(kind)
+        for column, value in zip(self._columns, values):
+            column.append(value)
+
+    def extend(self, other: Union['TrackIdStore', Iterable[str]]) -> None:
+        if not isinstance(other, TrackIdStore) or other.fields != self.fields:
+            for uri in other:
+                self.append(uri)
+            return
+        offset = len(self._kinds)
+        self._ids += other._ids
+        self._kinds += other._kinds
+        self._others.update((offset + i, uri) for i, uri in other._others.items())
+        for column, other_column in zip(self._columns, other._columns):
+            column.extend(other_column)
+
+    def _uri(self, index: int) -> str:
+        kind = self._kinds[index]
+        if kind == _OTHER:
+            return self._others[index]
+        start = index * ID_LENGTH
+        return URI_PREFIXES[kind] + self._ids[start:start + ID_LENGTH].decode('ascii')
+
+    def __len__(self) -> int:
+        return len(self._kinds)
+
+    def __iter__(self) -> Iterator[str]:
+        return (self._uri(i) for i in range(len(self._kinds)))
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(index, slice):
+            return [self._uri(i) for i in range(*index.indices(len(self._kinds)))]
+        if index < 0:
+            index += len(self._kinds)
+        if not 0 <= index < len(self._kinds):
+            raise IndexError('TrackIdStore index out of range')
+        return self._uri(index)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, (TrackIdStore, list, tuple)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self) -> str:
+        return f'TrackIdStore({list(self)!r})'
+
+    def records(self) -> Iterator[Any]:
+        if self.record_type is None:
+            raise ValueError('TrackIdStore was created without extra fields')
+        for i, uri in enumerate(self):
+            yield self.record_type(uri, *[column[i] for column in self._columns])
+
+
+def _lookup(item: Dict[str, Any], path: str) -> Any:
+    value: Any = item
+    for key in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
@@ -0,0 +1,23 @@
+from typing import Iterable, Iterator, List
+
+
+def iter_uris(lines: Iterable[str], unique: bool = True) -> Iterator[str]:
+    seen = set()
+    for line in lines:
+        for uri in line.split():
+            if unique:
+                if uri in seen:
+                    continue
+                seen.add(uri)
+            yield uri
+
+
+def iter_uri_batches(lines: Iterable[str], batch_size: int, unique: bool = True) -> Iterator[List[str]]:
+    batch: List[str] = []
+    for uri in iter_uris(lines, unique):
+        batch.append(uri)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
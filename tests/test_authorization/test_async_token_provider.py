@@ -0,0 +1,50 @@
+import asyncio
+import unittest
+from unittest.mock import MagicMock
+from datetime import datetime, timedelta
+from freezegun import freeze_time
+from spoterm.authorization.async_token_provider import AsyncTokenProvider
+
+
+@freeze_time('2019-01-01 00:00:00')
+class TestAsyncTokenProvider(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_token_provider = MagicMock()
+        self.mock_token_provider.token = 'foo'
+        self.mock_token_provider.refresh_margin = timedelta(0)
+
+        def renew():
+            self.mock_token_provider.token = 'bar'
+            self.mock_token_provider.token_expires = datetime(2019, 1, 1, 1, 0, 0)
+            return 'bar'
+        self.mock_token_provider.get_token.side_effect = renew
+
+    def test_get_token_not_expired(self):
+        self.mock_token_provider.token_expires = datetime(2019, 1, 1, 0, 0, 1)
+        cred = AsyncTokenProvider(self.mock_token_provider)
+
+        self.assertEqual('foo', asyncio.run(cred.get_token()))
+        self.mock_token_provider.get_token.assert_not_called()
+
+    def test_get_token_within_refresh_margin(self):
+        self.mock_token_provider.token_expires = datetime(2019, 1, 1, 0, 0, 30)
+        self.mock_token_provider.refresh_margin = timedelta(seconds=60)
+        cred = AsyncTokenProvider(self.mock_token_provider)
+
+        self.assertEqual('bar', asyncio.run(cred.get_token()))
+        self.mock_token_provider.get_token.assert_called_once_with()
+
+    def test_get_token_expired_single_refresh(self):
+        self.mock_token_provider.token_expires = datetime(2018, 12, 31, 23, 59, 59)
+        cred = AsyncTokenProvider(self.mock_token_provider)
+
+        async def get_tokens():
+            return await asyncio.gather(*[cred.get_token() for _ in range(10)])
+
+        self.assertEqual(['bar'] * 10, asyncio.run(get_tokens()))
+        self.mock_token_provider.get_token.assert_called_once_with()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -22,29 +22,30 @@ class TestAuthorizationCodeTokenProvider(unittest.TestCase):
 
         self.mock_login_handler = MagicMock()
         self.mock_login_handler.login.return_value = 'localhost?code=code&state=st'
+        self.mock_session = MagicMock()
 
     def tearDown(self):
         patch.stopall()
 
-    @patch('spoterm.authorization.authorization_code_token_provider.requests')
-    def test_get_token_not_expired(self, mock_requests):
-        cred = AuthorizationCodeTokenProvider('id', 'secret', ['scope'], 'localhost', self.mock_login_handler)
+    def test_get_token_not_expired(self):
+        cred = AuthorizationCodeTokenProvider('id', 'secret', ['scope'], 'localhost', self.mock_login_handler,
+                                              session=self.mock_session)
         cred.token = 'foo'
         cred.token_expires = datetime(2019, 1, 1, 0, 0, 1)
 
         token = cred.get_token()
         self.assertEqual('foo', token)
-        mock_requests.post.assert_not_called()
+        self.mock_session.post.assert_not_called()
         self.mock_login_handler.login.assert_not_called()
 
-    @patch('spoterm.authorization.authorization_code_token_provider.requests')
-    def test_get_token_expired_with_refresh_token(self, mock_requests):
+    def test_get_token_expired_with_refresh_token(self):
         mock_response = Response()
         mock_response._content = b'{"access_token": "bar", "expires_in": 3600}'
         mock_response.status_code = 200
-        mock_requests.post.return_value = mock_response
+        self.mock_session.post.return_value = mock_response
 
-        cred = AuthorizationCodeTokenProvider('id', 'secret', ['scope'], 'localhost', self.mock_login_handler)
+        cred = AuthorizationCodeTokenProvider('id', 'secret', ['scope'], 'localhost', self.mock_login_handler,
+                                              session=self.mock_session)
         cred.token = 'foo'
         cred.refresh_token = 'refresh'
         cred.token_expires = datetime(2018, 12, 31, 23, 59, 59)
@@ -54,18 +55,18 @@ class TestAuthorizationCodeTokenProvider(unittest.TestCase):
         self.assertEqual('bar', cred.token)
         self.assertEqual('refresh', cred.refresh_token)
         self.assertEqual(datetime(2019, 1, 1, 1, 0, 0), cred.token_expires)
-        mock_requests.post.assert_called_with('https://accounts.spotify.com/api/token',
-                                              data={'grant_type': 'refresh_token', 'refresh_token': 'refresh'},
-                                              headers={'Authorization': 'Basic id:secret'})
+        self.mock_session.post.assert_called_with('https://accounts.spotify.com/api/token',
+                                                  data={'grant_type': 'refresh_token', 'refresh_token': 'refresh'},
+                                                  headers={'Authorization': 'Basic id:secret'})
         self.mock_login_handler.login.assert_not_called()
 
-    @patch('spoterm.authorization.authorization_code_token_provider.requests')
-    def test_get_token_expired_with_refresh_token_failed(self, mock_requests):
+    def test_get_token_expired_with_refresh_token_failed(self):
         mock_response = Response()
         mock_response.status_code = 404
-        mock_requests.post.return_value = mock_response
+        self.mock_session.post.return_value = mock_response
 
-        cred = AuthorizationCodeTokenProvider('id', 'secret', ['scope'], 'localhost', self.mock_login_handler)
+        cred = AuthorizationCodeTokenProvider('id', 'secret', ['scope'], 'localhost', self.mock_login_handler,
+                                              session=self.mock_session)
         cred.token = 'foo'
         cred.refresh_token = 'refresh'
         cred.token_expires = datetime(2018, 12, 31, 23, 59, 59)
@@ -77,19 +78,19 @@ class TestAuthorizationCodeTokenProvider(unittest.TestCase):
         self.assertEqual('foo', cred.token)
         self.assertEqual('refresh', cred.refresh_token)
         self.assertEqual(datetime(2018, 12, 31, 23, 59, 59), cred.token_expires)
-        mock_requests.post.assert_called_with('https://accounts.spotify.com/api/token',
-                                              data={'grant_type': 'refresh_token', 'refresh_token': 'refresh'},
-                                              headers={'Authorization': 'Basic id:secret'})
+        self.mock_session.post.assert_called_with('https://accounts.spotify.com/api/token',
+                                                  data={'grant_type': 'refresh_token', 'refresh_token': 'refresh'},
+                                                  headers={'Authorization': 'Basic id:secret'})
         self.mock_login_handler.login.assert_not_called()
 
-    @patch('spoterm.authorization.authorization_code_token_provider.requests')
-    def test_get_token_expired_with_new_authorization_code(self, mock_requests):
+    def test_get_token_expired_with_new_authorization_code(self):
         mock_response = Response()
         mock_response._content = b'{"access_token": "bar", "expires_in": 3600, "refresh_token": "new_refresh"}'
         mock_response.status_code = 200
-        mock_requests.post.return_value = mock_response
+        self.mock_session.post.return_value = mock_response
 
-        cred = AuthorizationCodeTokenProvider('id', 'secret', ['scope'], 'localhost', self.mock_login_handler)
+        cred = AuthorizationCodeTokenProvider('id', 'secret', ['scope'], 'localhost', self.mock_login_handler,
+                                              session=self.mock_session)
         cred.token = 'foo'
         cred.token_expires = datetime(2018, 12, 31, 23, 59, 59)
 
@@ -98,20 +99,20 @@ class TestAuthorizationCodeTokenProvider(unittest.TestCase):
         self.assertEqual('bar', cred.token)
         self.assertEqual('new_refresh', cred.refresh_token)
         self.assertEqual(datetime(2019, 1, 1, 1, 0, 0), cred.token_expires)
-        mock_requests.post.assert_called_with('https://accounts.spotify.com/api/token',
-                                              data={'grant_type': 'authorization_code', 'code': 'code',
-                                                    'redirect_uri': 'localhost'},
-                                              headers={'Authorization': 'Basic id:secret'})
+        self.mock_session.post.assert_called_with('https://accounts.spotify.com/api/token',
+                                                  data={'grant_type': 'authorization_code', 'code': 'code',
+                                                        'redirect_uri': 'localhost'},
+                                                  headers={'Authorization': 'Basic id:secret'})
         self.mock_login_handler.login.assert_called_with(
             'https://accounts.spotify.com/authorize?id_code_localhost_scope_st',
             'localhost'
         )
 
-    @patch('spoterm.authorization.authorization_code_token_provider.requests')
-    def test_get_token_expired_with_new_authorization_code_webdriver_timeout(self, mock_requests):
+    def test_get_token_expired_with_new_authorization_code_webdriver_timeout(self):
         self.mock_login_handler.login.side_effect = Exception('Browser did nothing.')
 
-        cred = AuthorizationCodeTokenProvider('id', 'secret', ['scope'], 'localhost', self.mock_login_handler)
+        cred = AuthorizationCodeTokenProvider('id', 'secret', ['scope'], 'localhost', self.mock_login_handler,
+                                              session=self.mock_session)
         cred.token = 'foo'
         cred.token_expires = datetime(2018, 12, 31, 23, 59, 59)
 
@@ -123,18 +124,18 @@ class TestAuthorizationCodeTokenProvider(unittest.TestCase):
         self.assertIsNone(cred.refresh_token)
         self.assertEqual(datetime(2018, 12, 31, 23, 59, 59), cred.token_expires)
 
-        mock_requests.post.assert_not_called()
+        self.mock_session.post.assert_not_called()
         self.mock_login_handler.login.assert_called_with(
             'https://accounts.spotify.com/authorize?id_code_localhost_scope_st',
             'localhost'
         )
 
 
-    @patch('spoterm.authorization.authorization_code_token_provider.requests')
-    def test_get_token_expired_with_new_authorization_code_invalid_state(self, mock_requests):
+    def test_get_token_expired_with_new_authorization_code_invalid_state(self):
         self.mock_uuid.return_value = 'ts'
 
-        cred = AuthorizationCodeTokenProvider('id', 'secret', ['scope'], 'localhost', self.mock_login_handler)
+        cred = AuthorizationCodeTokenProvider('id', 'secret', ['scope'], 'localhost', self.mock_login_handler,
+                                              session=self.mock_session)
         cred.token = 'foo'
         cred.token_expires = datetime(2018, 12, 31, 23, 59, 59)
 
@@ -146,17 +147,17 @@ class TestAuthorizationCodeTokenProvider(unittest.TestCase):
         self.assertIsNone(cred.refresh_token)
         self.assertEqual(datetime(2018, 12, 31, 23, 59, 59), cred.token_expires)
 
-        mock_requests.post.assert_not_called()
+        self.mock_session.post.assert_not_called()
         self.mock_login_handler.login.assert_called_with(
             'https://accounts.spotify.com/authorize?id_code_localhost_scope_ts',
             'localhost'
         )
 
-    @patch('spoterm.authorization.authorization_code_token_provider.requests')
-    def test_get_token_expired_with_new_authorization_code_failed(self, mock_requests):
+    def test_get_token_expired_with_new_authorization_code_failed(self):
         self.mock_login_handler.login.return_value = 'localhost?error=Error%20occurred%20while%20getting%20code&state=st'
         
-        cred = AuthorizationCodeTokenProvider('id', 'secret', ['scope'], 'localhost', self.mock_login_handler)
+        cred = AuthorizationCodeTokenProvider('id', 'secret', ['scope'], 'localhost', self.mock_login_handler,
+                                              session=self.mock_session)
         cred.token = 'foo'
         cred.token_expires = datetime(2018, 12, 31, 23, 59, 59)
 
@@ -168,7 +169,7 @@ class TestAuthorizationCodeTokenProvider(unittest.TestCase):
         self.assertIsNone(cred.refresh_token)
         self.assertEqual(datetime(2018, 12, 31, 23, 59, 59), cred.token_expires)
 
-        mock_requests.post.assert_not_called()
+        self.mock_session.post.assert_not_called()
         self.mock_login_handler.login.assert_called_with(
             'https://accounts.spotify.com/authorize?id_code_localhost_scope_st',
             'localhost'
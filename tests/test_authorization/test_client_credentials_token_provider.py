@@ -1,5 +1,9 @@
+import os
+import json
+import tempfile
+import threading
 import unittest
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
 from datetime import datetime
 from requests.models import Response
 from requests.exceptions import HTTPError
@@ -13,28 +17,27 @@ class TestClientCredentialsTokenProvider(unittest.TestCase):
     def setUp(self):
         mock_b64encode = patch('spoterm.authorization.spotify_token_provider.base64.b64encode').start()
         mock_b64encode.side_effect = lambda _: _
+        self.mock_session = MagicMock()
 
     def tearDown(self):
         patch.stopall()
     
-    @patch('spoterm.authorization.client_credentials_token_provider.requests')
-    def test_get_token_not_expired(self, mock_requests):
-        cred = ClientCredentialsTokenProvider('id', 'secret')
+    def test_get_token_not_expired(self):
+        cred = ClientCredentialsTokenProvider('id', 'secret', session=self.mock_session)
         cred.token = 'foo'
         cred.token_expires = datetime(2019, 1, 1, 0, 0, 1)
 
         token = cred.get_token()
         self.assertEqual('foo', token)
-        mock_requests.post.assert_not_called()
+        self.mock_session.post.assert_not_called()
 
-    @patch('spoterm.authorization.client_credentials_token_provider.requests')
-    def test_get_token_expired(self, mock_requests):
+    def test_get_token_expired(self):
         mock_response = Response()
         mock_response._content = b'{"access_token": "bar", "expires_in": 3600}'
         mock_response.status_code = 200
-        mock_requests.post.return_value = mock_response
+        self.mock_session.post.return_value = mock_response
 
-        cred = ClientCredentialsTokenProvider('id', 'secret')
+        cred = ClientCredentialsTokenProvider('id', 'secret', session=self.mock_session)
         cred.token = 'foo'
         cred.token_expires = datetime(2018, 12, 31, 23, 59, 59)
 
@@ -42,17 +45,16 @@ class TestClientCredentialsTokenProvider(unittest.TestCase):
         self.assertEqual('bar', token)
         self.assertEqual('bar', cred.token)
         self.assertEqual(datetime(2019, 1, 1, 1, 0, 0), cred.token_expires)
-        mock_requests.post.assert_called_with('https://accounts.spotify.com/api/token',
-                                              data={'grant_type': 'client_credentials'},
-                                              headers={'Authorization': 'Basic id:secret'})
+        self.mock_session.post.assert_called_with('https://accounts.spotify.com/api/token',
+                                                  data={'grant_type': 'client_credentials'},
+                                                  headers={'Authorization': 'Basic id:secret'})
 
-    @patch('spoterm.authorization.client_credentials_token_provider.requests')
-    def test_get_token_expired_new_request_failed(self, mock_requests):
+    def test_get_token_expired_new_request_failed(self):
         mock_response = Response()
         mock_response.status_code = 404
-        mock_requests.post.return_value = mock_response
+        self.mock_session.post.return_value = mock_response
 
-        cred = ClientCredentialsTokenProvider('id', 'secret')
+        cred = ClientCredentialsTokenProvider('id', 'secret', session=self.mock_session)
         cred.token = 'foo'
         cred.token_expires = datetime(2018, 12, 31, 23, 59, 59)
 
@@ -62,10 +64,128 @@ class TestClientCredentialsTokenProvider(unittest.TestCase):
         self.assertEqual('404 Client Error: None for url: None', str(context.exception))
         self.assertEqual('foo', cred.token)
         self.assertEqual(datetime(2018, 12, 31, 23, 59, 59), cred.token_expires)
-        mock_requests.post.assert_called_with('https://accounts.spotify.com/api/token',
-                                              data={'grant_type': 'client_credentials'},
-                                              headers={'Authorization': 'Basic id:secret'})
+        self.mock_session.post.assert_called_with('https://accounts.spotify.com/api/token',
+                                                  data={'grant_type': 'client_credentials'},
+                                                  headers={'Authorization': 'Basic id:secret'})
+
+    def test_get_token_expired_concurrent_callers_single_refresh(self):
+        callers = 5
+        arrived = []
+        all_waiting = threading.Event()
+
+        class ArrivalLock:
+
+            def __init__(self, lock):
+                self.lock = lock
+
+            def __enter__(self):
+                arrived.append(threading.current_thread())
+                if len(arrived) == callers:
+                    all_waiting.set()
+                return self.lock.__enter__()
+
+            def __exit__(self, *exc_info):
+                return self.lock.__exit__(*exc_info)
+
+        def post(*_, **__):
+            self.assertTrue(all_waiting.wait(5))
+            mock_response = Response()
+            mock_response._content = b'{"access_token": "bar", "expires_in": 3600}'
+            mock_response.status_code = 200
+            return mock_response
+        self.mock_session.post.side_effect = post
+
+        cred = ClientCredentialsTokenProvider('id', 'secret', session=self.mock_session)
+        cred._refresh_lock = ArrivalLock(cred._refresh_lock)
+        tokens = []
+        threads = [threading.Thread(target=lambda: tokens.append(cred.get_token())) for _ in range(callers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(['bar'] * 5, tokens)
+        self.assertEqual(1, self.mock_session.post.call_count)
+        self.assertEqual(1, cred.metrics.refreshes)
+        self.assertEqual(4, cred.metrics.coalesced_callers)
+
+    def test_get_token_within_refresh_margin(self):
+        mock_response = Response()
+        mock_response._content = b'{"access_token": "bar", "expires_in": 3600}'
+        mock_response.status_code = 200
+        self.mock_session.post.return_value = mock_response
+
+        cred = ClientCredentialsTokenProvider('id', 'secret', session=self.mock_session, refresh_margin=60)
+        cred.token = 'foo'
+        cred.token_expires = datetime(2019, 1, 1, 0, 0, 30)
+
+        token = cred.get_token()
+        cred._background_refresh.join()
+
+        self.assertEqual('foo', token)
+        self.assertEqual('bar', cred.token)
+        self.assertEqual(datetime(2019, 1, 1, 1, 0, 0), cred.token_expires)
+        self.assertEqual(1, self.mock_session.post.call_count)
+
+    def test_get_token_within_refresh_margin_does_not_wait_for_running_refresh(self):
+        cred = ClientCredentialsTokenProvider('id', 'secret', session=self.mock_session, refresh_margin=60)
+        cred.token = 'foo'
+        cred.token_expires = datetime(2019, 1, 1, 0, 0, 30)
+
+        with cred._refresh_lock:
+            token = cred.get_token()
+
+        self.assertEqual('foo', token)
+        self.assertIsNone(cred._background_refresh)
+        self.mock_session.post.assert_not_called()
+
+    def test_get_token_renewed_by_other_process(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            token_cache = os.path.join(cache_dir, '.cc_token_cache.json')
+            cred = ClientCredentialsTokenProvider('id', 'secret', token_cache, session=self.mock_session)
+            with open(token_cache, 'w') as tc:
+                tc.write(json.dumps({'token': 'bar', 'token_expires': datetime(2019, 1, 1, 1, 0, 0).timestamp()}))
+
+            token = cred.get_token()
+
+            self.assertEqual('bar', token)
+            self.assertEqual(datetime(2019, 1, 1, 1, 0, 0), cred.token_expires)
+            self.mock_session.post.assert_not_called()
+
+    def test_get_token_expired_saves_cache_atomically(self):
+        mock_response = Response()
+        mock_response._content = b'{"access_token": "bar", "expires_in": 3600}'
+        mock_response.status_code = 200
+        self.mock_session.post.return_value = mock_response
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            token_cache = os.path.join(cache_dir, '.cc_token_cache.json')
+            with open(token_cache, 'w') as tc:
+                tc.write('{"token": "fo')
+            cred = ClientCredentialsTokenProvider('id', 'secret', token_cache, session=self.mock_session)
+
+            self.assertEqual('bar', cred.get_token())
+            with open(token_cache) as tc:
+                self.assertEqual({'token': 'bar', 'token_expires': datetime(2019, 1, 1, 1, 0, 0).timestamp()},
+                                 json.loads(tc.read()))
+            self.assertEqual(['.cc_token_cache.json', '.cc_token_cache.json.lock'], sorted(os.listdir(cache_dir)))
+
+    def test_get_token_ignores_malformed_cache(self):
+        mock_response = Response()
+        mock_response._content = b'{"access_token": "bar", "expires_in": 3600}'
+        mock_response.status_code = 200
+        self.mock_session.post.return_value = mock_response
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            token_cache = os.path.join(cache_dir, '.cc_token_cache.json')
+            for content in ('{"token": "foo"}', '[]', '{"token": "foo", "token_expires": "soon"}'):
+                with open(token_cache, 'w') as tc:
+                    tc.write(content)
+
+                cred = ClientCredentialsTokenProvider('id', 'secret', token_cache, session=self.mock_session)
+
+                self.assertEqual('bar', cred.get_token())
 
 
 if __name__ == "__main__":
-    unittest.main()
\ No newline at end of file
+    unittest.main()
@@ -0,0 +1,36 @@
+import sys
+import subprocess
+import unittest
+from unittest.mock import patch, MagicMock
+from spoterm import cli
+
+
+class TestCli(unittest.TestCase):
+
+    @patch('spoterm.cli.importlib.import_module')
+    def test_dispatches_to_subcommand(self, import_module):
+        module = MagicMock()
+        import_module.return_value = module
+
+        with patch.object(sys, 'argv', ['spoterm']):
+            cli.main(['track-info', '-f', 'csv'])
+            self.assertEqual(sys.argv, ['spoterm track-info', '-f', 'csv'])
+
+        import_module.assert_called_once_with('spoterm.track_info')
+        module.main.assert_called_once_with()
+
+    @patch('spoterm.cli.importlib.import_module')
+    def test_unknown_subcommand(self, import_module):
+        with self.assertRaises(SystemExit) as ctx:
+            cli.main(['nope'])
+
+        self.assertEqual(ctx.exception.code, 2)
+        import_module.assert_not_called()
+
+    def test_does_not_import_heavy_modules(self):
+        code = 'import sys, spoterm.cli, spoterm.track_info; print(",".join(sorted(sys.modules)))'
+        loaded = subprocess.run([sys.executable, '-c', code], check=True, stdout=subprocess.PIPE,
+                                universal_newlines=True).stdout.strip().split(',')
+
+        for module in ('requests', 'tabulate', 'asyncio', 'spoterm.dao.spotify_dao'):
+            self.assertNotIn(module, loaded)
@@ -0,0 +1,126 @@
+import os
+import json
+import sys
+import socket
+import tempfile
+import subprocess
+import unittest
+from contextlib import contextmanager
+from spoterm.daemon import forwarded_env, _read_frame, _send_frame, STDOUT
+from benchmarks.mock_spotify_api import MockSpotifyApi
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestDaemon(unittest.TestCase):
+
+    def test_forwarded_env(self):
+        self.assertEqual({'SPOTIFY_CLIENT_ID': 'a', 'CHROME_DRIVER_PATH': 'b'},
+                         forwarded_env({'SPOTIFY_CLIENT_ID': 'a', 'CHROME_DRIVER_PATH': 'b', 'HOME': '/root'}))
+
+    def test_frames(self):
+        left, right = socket.socketpair()
+        with left, right:
+            _send_frame(left, STDOUT, b'data')
+            left.close()
+            rfile = right.makefile('rb')
+
+            self.assertEqual((STDOUT, b'data'), _read_frame(rfile))
+            self.assertIsNone(_read_frame(rfile))
+
+    def _env(self, server, tmp):
+        env = dict(os.environ, SPOTIFY_API_URL=server.api_url, SPOTIFY_ACCOUNTS_URL=server.accounts_url,
+                   SPOTIFY_CLIENT_ID='id', SPOTIFY_CLIENT_SECRET='secret', SPOTIFY_TOKEN_CACHE_LOC=tmp,
+                   SPOTERM_SOCKET=os.path.join(tmp, 'spoterm.sock'),
+                   PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')])))
+        env.pop('SPOTERM_NO_DAEMON', None)
+        return env
+
+    @contextmanager
+    def _daemon(self, env):
+        daemon = subprocess.Popen([sys.executable, '-m', 'spoterm.cli', 'daemon'], env=env,
+                                  stderr=subprocess.PIPE, universal_newlines=True)
+        try:
+            self.assertIn('listening', daemon.stderr.readline())
+            yield daemon
+        finally:
+            if daemon.poll() is None:
+                daemon.kill()
+            daemon.stderr.close()
+
+    def _start(self, env, args, cwd=None, stdin=subprocess.PIPE, **extra_env):
+        return subprocess.Popen([sys.executable, '-m', 'spoterm.cli'] + args, cwd=cwd, env=dict(env, **extra_env),
+                                stdin=stdin, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                universal_newlines=True)
+
+    def test_commands_are_served_by_daemon(self):
+        with MockSpotifyApi(playlists=2, tracks_per_playlist=60) as server, tempfile.TemporaryDirectory() as tmp:
+            env = self._env(server, tmp)
+            with self._daemon(env) as daemon:
+                def run(args, stdin='', **extra_env):
+                    client = self._start(env, args, **extra_env)
+                    stdout, stderr = client.communicate(stdin)
+                    return subprocess.CompletedProcess(args, client.returncode, stdout, stderr)
+
+                tracks = run(['playlist-tracks'], '\n'.join(server.playlist_ids))
+                info = run(['track-info', '-f', 'tsv', '-u'], tracks.stdout)
+                invalid = run(['track-info', '--bogus'])
+                fallback = run(['playlist-tracks', server.playlist_ids[0]], SPOTIFY_CLIENT_ID='other')
+
+                cwds = [os.path.join(tmp, name) for name in ('first', 'second')]
+                concurrent = []
+                for cwd, playlist_id in zip(cwds, server.playlist_ids):
+                    os.mkdir(cwd)
+                    client = self._start(env, ['track-info', '-f', 'tsv', '-u', '--stats', 'json',
+                                               '--stats-file=stats.json'], cwd)
+                    concurrent.append((cwd, playlist_id, client))
+                for _, playlist_id, client in concurrent:
+                    client.stdin.write('\n'.join(server.playlist(playlist_id)))
+                    client.stdin.close()
+                for cwd, playlist_id, client in concurrent:
+                    stdout = client.stdout.read()
+                    self.assertEqual(0, client.wait())
+                    client.stdout.close()
+                    client.stderr.close()
+                    self.assertEqual(server.playlist(playlist_id), [l.split('\t')[0] for l in stdout.splitlines()[1:]])
+                    with open(os.path.join(cwd, 'stats.json')) as stats:
+                        self.assertEqual(['scheduler', 'token'], sorted(json.load(stats)['counters']))
+                token_requests = server.statuses[200] - 2 - 3 - 1 - 4
+
+                self.assertEqual(0, run(['daemon', '--status']).returncode)
+                self.assertEqual(0, run(['daemon', '--stop']).returncode)
+                self.assertEqual(0, daemon.wait(5))
+
+            self.assertEqual(server.playlist(server.playlist_ids[0]) + server.playlist(server.playlist_ids[1]),
+                             tracks.stdout.split())
+            self.assertEqual(121, len(info.stdout.splitlines()))
+            self.assertEqual(2, invalid.returncode)
+            self.assertIn('spoterm track-info: error: unrecognized arguments: --bogus', invalid.stderr)
+            self.assertEqual(server.playlist(server.playlist_ids[0]), fallback.stdout.split())
+            self.assertEqual(1, token_requests)
+            self.assertFalse(os.path.exists(env['SPOTERM_SOCKET']))
+
+    def test_pipeline_through_daemon(self):
+        with MockSpotifyApi(playlists=4, tracks_per_playlist=5000) as server, tempfile.TemporaryDirectory() as tmp:
+            env = self._env(server, tmp)
+            with self._daemon(env):
+                upstream = self._start(env, ['playlist-tracks'] + server.playlist_ids, stdin=subprocess.DEVNULL)
+                downstream = self._start(env, ['track-info', '-f', 'tsv', '-u'], stdin=upstream.stdout)
+                upstream.stdout.close()
+                try:
+                    stdout, stderr = downstream.communicate(timeout=60)
+                    self.assertEqual(0, upstream.wait(10), upstream.stderr.read())
+                finally:
+                    for client in (upstream, downstream):
+                        if client.poll() is None:
+                            client.kill()
+                    upstream.stderr.close()
+
+            self.assertEqual(0, downstream.returncode, stderr)
+            self.assertEqual(20001, len(stdout.splitlines()))
+            self.assertEqual([u for p in server.playlist_ids for u in server.playlist(p)],
+                             [l.split('\t')[0] for l in stdout.splitlines()[1:]])
+
+if __name__ == "__main__":
+    unittest.main()
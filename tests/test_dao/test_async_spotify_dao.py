@@ -0,0 +1,102 @@
+import asyncio
+import unittest
+from unittest.mock import MagicMock, patch
+from spoterm.dao.request_scheduler import RequestScheduler
+from spoterm.dao.request_stats import RequestStats
+from spoterm.dao.spotify_dao import SpotifyDao
+from benchmarks.mock_spotify_api import MockSpotifyApi
+
+try:
+    import aiohttp
+    from spoterm.dao.async_spotify_dao import AsyncSpotifyDao
+except ImportError:
+    aiohttp = None
+
+
+class FakeAsyncTokenProvider:
+
+    async def get_token(self):
+        return 'token'
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class TestAsyncSpotifyDao(unittest.TestCase):
+
+    def _run(self, coroutine_function, **scheduler_args):
+        async def run():
+            async with AsyncSpotifyDao(FakeAsyncTokenProvider(), scheduler=self.scheduler,
+                                       hooks=[self.stats.record]) as dao:
+                return await coroutine_function(dao)
+
+        self.scheduler = RequestScheduler(backoff_base=0, **scheduler_args)
+        self.stats = RequestStats()
+        return asyncio.run(run())
+
+    def test_get_and_send(self):
+        with MockSpotifyApi(playlists=1, tracks_per_playlist=3) as server:
+            playlist_id = server.playlist_ids[0]
+            url = f'{server.api_url}/playlists/{playlist_id}'
+
+            async def edit(dao):
+                before = await dao.get(url, fields='snapshot_id')
+                added = await dao.send('POST', f'{url}/tracks', '{"uris": ["spotify:track:new"]}')
+                status = await dao.delete(f'{url}/tracks', 'application/json',
+                                          '{"tracks": [{"uri": "spotify:track:new"}]}')
+                return before, added, status
+
+            before, added, status = self._run(edit)
+
+            self.assertIn('snapshot_id', before)
+            self.assertNotEqual(before['snapshot_id'], added['snapshot_id'])
+            self.assertEqual(200, status)
+            self.assertEqual(3, len(server.playlist(playlist_id)))
+        self.assertEqual(3, sum(s.latency.count for s in self.stats.endpoints.values()))
+
+    def test_get_retries_server_errors(self):
+        with MockSpotifyApi(playlists=1, tracks_per_playlist=3, error_rate=1.0) as server:
+            with self.assertRaises(aiohttp.ClientResponseError):
+                self._run(lambda dao: dao.get(f'{server.api_url}/playlists/{server.playlist_ids[0]}'), max_retries=2)
+
+        self.assertEqual(3, server.statuses[503])
+        self.assertEqual(2, self.scheduler.stats.server_errors)
+
+    def test_post_does_not_retry_server_errors(self):
+        with MockSpotifyApi(playlists=1, tracks_per_playlist=3, error_rate=1.0) as server:
+            with self.assertRaises(aiohttp.ClientResponseError):
+                self._run(lambda dao: dao.post(f'{server.api_url}/playlists/{server.playlist_ids[0]}/tracks',
+                                               '{"uris": []}'))
+
+        self.assertEqual(1, server.statuses[503])
+
+    def test_async_commands_match_sync_commands(self):
+        from spoterm.get_my_followed_artists import get_my_followed_artists, get_my_followed_artists_async
+        from spoterm.get_my_playlists import get_my_playlists, get_my_playlists_async
+        from spoterm.get_playlist_tracks import get_playlist_tracks, get_playlist_tracks_async
+        from spoterm.track_info import get_track_data, get_track_data_async
+
+        token_provider = MagicMock()
+        token_provider.get_token.return_value = 'token'
+        sync_dao = SpotifyDao(token_provider, scheduler=RequestScheduler(backoff_base=0))
+        with MockSpotifyApi(playlists=3, tracks_per_playlist=130, followed_artists=70) as server, \
+                patch('spoterm.track_info.API_URL', server.api_url), \
+                patch('spoterm.get_playlist_tracks.API_URL', server.api_url), \
+                patch('spoterm.get_my_playlists.API_URL', server.api_url), \
+                patch('spoterm.get_my_followed_artists.API_URL', server.api_url):
+            track_uris = server.playlist(server.playlist_ids[0])[:75]
+
+            async def run_all(dao):
+                return (await get_my_playlists_async(dao), await get_my_followed_artists_async(dao),
+                        await get_playlist_tracks_async(dao, server.playlist_ids),
+                        await get_track_data_async(dao, track_uris, True, True, True, True))
+
+            playlists, artists, playlist_tracks, track_data = self._run(run_all)
+            self.assertEqual(get_my_playlists(sync_dao), playlists)
+            self.assertEqual(get_my_followed_artists(sync_dao), artists)
+            self.assertEqual({p: list(t) for p, t in get_playlist_tracks(sync_dao, server.playlist_ids).items()},
+                             {p: list(t) for p, t in playlist_tracks.items()})
+            self.assertEqual(get_track_data(sync_dao, track_uris, True, True, True, True), track_data)
+            self.assertEqual(75, len(track_data))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+from spoterm.dao.entity_store import EntityStore
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestEntityStore(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.store = EntityStore(':memory:', max_age=100, max_bytes=70, clock=self.clock)
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_get_many_returns_stored(self):
+        self.store.put_many('track', {'a': {'uri': 'spotify:track:a'}})
+
+        self.assertEqual({'a': {'uri': 'spotify:track:a'}}, self.store.get_many('track', ['a', 'b', 'a']))
+        self.assertEqual({}, self.store.get_many('audio_features', ['a']))
+        self.assertEqual({'hits': 1, 'misses': 2, 'entries': 1, 'size_bytes': 25}, self.store.stats())
+
+    def test_expired_entities_are_misses(self):
+        self.store.put_many('track', {'a': {}})
+        self.clock.now += 101
+
+        self.assertEqual({}, self.store.get_many('track', ['a']))
+
+    def test_evicts_oldest_over_size_cap(self):
+        self.store.put_many('track', {'a': {'name': 'aaaaaaaaaaaaaaaaaaaa'}})
+        self.clock.now += 1
+        self.store.put_many('track', {'b': {'name': 'bbbbbbbbbbbbbbbbbbbb'}})
+        self.clock.now += 1
+        self.store.put_many('track', {'c': {'name': 'cccccccccccccccccccc'}})
+
+        self.assertEqual(['b', 'c'], sorted(self.store.get_many('track', ['a', 'b', 'c'])))
+
+    def test_replacing_entities_keeps_size_total(self):
+        self.store.put_many('track', {'a': {'name': 'aaaaaaaaaaaaaaaaaaaa'}})
+        self.store.put_many('track', {'a': {'name': 'a'}})
+        self.clock.now += 1
+        self.store.put_many('track', {'b': {'name': 'bbbbbbbbbbbbbbbbbbbb'}})
+
+        self.assertEqual(['a', 'b'], sorted(self.store.get_many('track', ['a', 'b'])))
+        self.assertEqual(43, self.store.stats()['size_bytes'])
+
+    def test_size_total_survives_reopen(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'entities.sqlite')
+            store = EntityStore(path)
+            store.put_many('track', {'a': {'name': 'a'}, 'b': {'name': 'b'}})
+            store.close()
+            store = EntityStore(path)
+
+            self.assertEqual(24, store.stats()['size_bytes'])
+            store.close()
+
+    def test_without_ttl(self):
+        store = EntityStore(':memory:', clock=self.clock)
+        store.put_many('artist', {'x': {'name': 'x'}})
+        self.clock.now += 10 ** 9
+
+        self.assertEqual({'x': {'name': 'x'}}, store.get_many('artist', ['x']))
+        store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
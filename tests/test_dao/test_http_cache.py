@@ -0,0 +1,65 @@
+import unittest
+from spoterm.dao.http_cache import HttpCache, CacheEntry
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestHttpCache(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = HttpCache(':memory:', max_bytes=10, max_age=100, clock=self.clock)
+
+    def tearDown(self):
+        self.cache.close()
+
+    def test_lookup_stored(self):
+        self.cache.store('url', '"etag"', b'{}')
+
+        self.assertEqual(CacheEntry('"etag"', b'{}'), self.cache.lookup('url'))
+        self.assertIsNone(self.cache.lookup('other'))
+
+    def test_store_without_etag(self):
+        self.cache.store('url', None, b'{}')
+
+        self.assertIsNone(self.cache.lookup('url'))
+        self.assertEqual({'hits': 0, 'misses': 1, 'entries': 0, 'size_bytes': 0}, self.cache.stats())
+
+    def test_lookup_expired(self):
+        self.cache.store('url', '"etag"', b'{}')
+        self.clock.now += 101
+
+        self.assertIsNone(self.cache.lookup('url'))
+
+    def test_revalidated_entry_does_not_expire(self):
+        self.cache.store('url', '"etag"', b'{}')
+        self.clock.now += 60
+        self.cache.record_hit('url')
+        self.clock.now += 60
+
+        self.assertEqual(CacheEntry('"etag"', b'{}'), self.cache.lookup('url'))
+
+    def test_evict_least_recently_used(self):
+        self.cache.store('a', '"a"', b'1234')
+        self.clock.now += 1
+        self.cache.store('b', '"b"', b'1234')
+        self.clock.now += 1
+        self.cache.record_hit('a')
+        self.clock.now += 1
+        self.cache.store('c', '"c"', b'1234')
+
+        self.assertIsNotNone(self.cache.lookup('a'))
+        self.assertIsNone(self.cache.lookup('b'))
+        self.assertIsNotNone(self.cache.lookup('c'))
+        self.assertEqual({'hits': 1, 'misses': 3, 'entries': 2, 'size_bytes': 8}, self.cache.stats())
+
+
+if __name__ == "__main__":
+    unittest.main()
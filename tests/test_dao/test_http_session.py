@@ -0,0 +1,31 @@
+import unittest
+from unittest.mock import patch
+from requests.adapters import HTTPAdapter
+from spoterm.dao.http_session import create_session, TimeoutHTTPAdapter
+
+
+class TestHttpSession(unittest.TestCase):
+
+    def test_create_session(self):
+        session = create_session(pool_size=4, timeout=5, keep_alive=False)
+        adapter = session.get_adapter('https://api.spotify.com/v1/tracks')
+
+        self.assertIsInstance(adapter, TimeoutHTTPAdapter)
+        self.assertEqual(4, adapter._pool_maxsize)
+        self.assertEqual(5, adapter.timeout)
+        self.assertEqual('close', session.headers['Connection'])
+        self.assertEqual('gzip, deflate', session.headers['Accept-Encoding'])
+
+    @patch.object(HTTPAdapter, 'send')
+    def test_adapter_default_timeout(self, mock_send):
+        adapter = TimeoutHTTPAdapter(timeout=(1, 2))
+
+        adapter.send('request')
+        mock_send.assert_called_with('request', timeout=(1, 2))
+
+        adapter.send('request', timeout=10)
+        mock_send.assert_called_with('request', timeout=10)
+
+
+if __name__ == "__main__":
+    unittest.main()
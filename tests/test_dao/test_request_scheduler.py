@@ -0,0 +1,118 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from requests.models import Response
+from spoterm.dao.request_scheduler import RequestScheduler, TokenBucket
+
+
+def _response(status_code, headers=None):
+    response = Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    return response
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_reserve(self):
+        clock = FakeClock()
+        bucket = TokenBucket(2, 2, clock)
+
+        self.assertEqual(0, bucket.reserve())
+        self.assertEqual(0, bucket.reserve())
+        self.assertEqual(0.5, bucket.reserve())
+        self.assertEqual(1.0, bucket.reserve())
+
+        clock.now = 2.0
+        self.assertEqual(0, bucket.reserve())
+
+
+class TestRequestScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.send = MagicMock()
+
+    def _scheduler(self, **kwargs):
+        return RequestScheduler(clock=self.clock, sleep=self.clock.sleep, **kwargs)
+
+    def test_execute_success(self):
+        self.send.return_value = _response(200)
+        scheduler = self._scheduler()
+
+        self.assertEqual(200, scheduler.execute(self.send).status_code)
+        self.assertEqual(1, self.send.call_count)
+        self.assertEqual(0, self.clock.now)
+
+    def test_execute_retry_after(self):
+        self.send.side_effect = [_response(429, {'Retry-After': '3'}), _response(200)]
+        scheduler = self._scheduler()
+
+        self.assertEqual(200, scheduler.execute(self.send).status_code)
+        self.assertEqual(2, self.send.call_count)
+        self.assertEqual(3, self.clock.now)
+        self.assertEqual({'requests': 2, 'retries': 1, 'rate_limited': 1, 'server_errors': 0,
+                          'throttled_seconds': 3.0, 'backoff_seconds': 0.0}, scheduler.stats.as_dict())
+
+    def test_execute_retry_after_pauses_other_requests(self):
+        scheduler = self._scheduler()
+        scheduler.retry_delay(429, {'Retry-After': '5'}, 0)
+        self.clock.now = 2.0
+
+        self.assertEqual(3.0, scheduler.acquire_delay())
+
+    @patch('spoterm.dao.request_scheduler.random.uniform')
+    def test_execute_server_error_backoff(self, mock_uniform):
+        mock_uniform.side_effect = lambda low, high: high
+        self.send.side_effect = [_response(503), _response(502), _response(200)]
+        scheduler = self._scheduler(backoff_base=0.5)
+
+        self.assertEqual(200, scheduler.execute(self.send).status_code)
+        self.assertEqual(1.5, self.clock.now)
+        self.assertEqual(2, scheduler.stats.server_errors)
+
+    def test_execute_server_error_not_retried_when_disabled(self):
+        self.send.side_effect = [_response(502), _response(429), _response(201)]
+        scheduler = self._scheduler()
+
+        self.assertEqual(502, scheduler.execute(self.send, retry_server_errors=False).status_code)
+        self.assertEqual(201, scheduler.execute(self.send, retry_server_errors=False).status_code)
+        self.assertEqual(0, scheduler.stats.server_errors)
+        self.assertEqual(1, scheduler.stats.rate_limited)
+
+    def test_execute_retries_exhausted(self):
+        self.send.return_value = _response(429)
+        scheduler = self._scheduler(max_retries=2)
+
+        self.assertEqual(429, scheduler.execute(self.send).status_code)
+        self.assertEqual(3, self.send.call_count)
+
+    def test_execute_client_error_not_retried(self):
+        self.send.return_value = _response(404)
+        scheduler = self._scheduler()
+
+        self.assertEqual(404, scheduler.execute(self.send).status_code)
+        self.assertEqual(1, self.send.call_count)
+
+    def test_execute_rate_limited(self):
+        self.send.return_value = _response(200)
+        scheduler = self._scheduler(rate=10, burst=1)
+
+        for _ in range(5):
+            scheduler.execute(self.send)
+        self.assertAlmostEqual(0.4, self.clock.now)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import io
+import json
+import unittest
+from spoterm.dao.request_stats import Histogram, RequestEvent, RequestStats, endpoint_template
+
+
+class TestRequestStats(unittest.TestCase):
+
+    def setUp(self):
+        self.stats = RequestStats()
+        self.stats.record(RequestEvent('GET', '/v1/playlists/{id}/tracks', 200, 0.004, 100, 0, 0.001))
+        self.stats.record(RequestEvent('GET', '/v1/playlists/{id}/tracks', 200, 0.2, 300, 2, 0.0))
+        self.stats.record(RequestEvent('POST', '/v1/playlists/{id}/tracks', 201, 0.03, 50, 0, 0.0))
+
+    def test_endpoint_template(self):
+        self.assertEqual('/v1/playlists/{id}/tracks',
+                         endpoint_template('https://api.spotify.com/v1/playlists/37i9dQZF1DXcBWIGoYBM5M/tracks'
+                                           '?offset=100&limit=100'))
+        self.assertEqual('/v1/me/following', endpoint_template('https://api.spotify.com/v1/me/following?after=x'))
+
+    def test_histogram_quantile(self):
+        histogram = Histogram((0.1, 1.0, float('inf')))
+        for value in (0.05, 0.05, 0.5, 3.0):
+            histogram.observe(value)
+
+        self.assertEqual([(0.1, 2), (1.0, 3), (float('inf'), 4)], histogram.cumulative_counts())
+        self.assertAlmostEqual(0.1, histogram.quantile(0.5))
+        self.assertAlmostEqual(0.55, histogram.quantile(0.625))
+        self.assertAlmostEqual(3.0, histogram.quantile(1.0))
+
+    def test_as_dict(self):
+        endpoints = json.loads(self.stats.to_json())['endpoints']
+
+        self.assertEqual(['GET', 'POST'], [e['method'] for e in endpoints])
+        self.assertEqual(2, endpoints[0]['requests'])
+        self.assertEqual({'200': 2}, endpoints[0]['statuses'])
+        self.assertEqual(2, endpoints[0]['retries'])
+        self.assertEqual(400, endpoints[0]['response_bytes'])
+
+    def test_to_prometheus(self):
+        out = io.StringIO()
+        self.stats.write('prometheus', out)
+        lines = out.getvalue().splitlines()
+
+        self.assertIn('spoterm_requests_total{method="POST",endpoint="/v1/playlists/{id}/tracks",status="201"} 1',
+                      lines)
+        self.assertIn('spoterm_request_duration_seconds_bucket{method="GET",endpoint="/v1/playlists/{id}/tracks",'
+                      'le="0.005"} 1', lines)
+        self.assertIn('spoterm_request_duration_seconds_bucket{method="GET",endpoint="/v1/playlists/{id}/tracks",'
+                      'le="+Inf"} 2', lines)
+        self.assertIn('spoterm_request_duration_seconds_count{method="GET",endpoint="/v1/playlists/{id}/tracks"} 2',
+                      lines)
+
+
+    def test_sources(self):
+        counters = {'hits': 2, 'entries': 5, 'throttled_seconds': 0.5}
+        self.stats.add_source('cache', lambda: dict(counters))
+        self.stats.add_source('cache', lambda: {'hits': 100})
+        counters.update(hits=7, entries=6, throttled_seconds=2.0)
+
+        self.assertEqual({'cache': {'hits': 5, 'entries': 6, 'throttled_seconds': 1.5}},
+                         json.loads(self.stats.to_json())['counters'])
+        self.assertIn('cache            hits=5 entries=6 throttled_seconds=1.500', self.stats.to_table().splitlines())
+        prometheus = self.stats.to_prometheus().splitlines()
+        self.assertIn('spoterm_cache_hits_total 5', prometheus)
+        self.assertIn('# TYPE spoterm_cache_entries gauge', prometheus)
+
+
+if __name__ == "__main__":
+    unittest.main()
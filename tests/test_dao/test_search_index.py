@@ -0,0 +1,57 @@
+import sqlite3
+import unittest
+from spoterm.dao.search_index import SearchIndex, matches, tokenize
+
+
+class TestSearchIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.index = SearchIndex(self.conn)
+        self.index.add('track', [
+            ('spotify:track:1', 'Bohemian Rhapsody', 'Queen'),
+            ('spotify:track:2', 'Under Pressure', 'Queen, David Bowie'),
+            ('spotify:track:3', 'Heroes', 'David Bowie'),
+            ('spotify:track:4', 'Café del Mar', 'Energy 52'),
+        ])
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_tokenize(self):
+        self.assertEqual(['cafe', 'del', 'mar', '2019'], tokenize('Café del MAR (2019)'))
+        self.assertEqual([], tokenize(None))
+
+    def test_matches(self):
+        self.assertTrue(matches('chill VIB', 'Chill Vibes'))
+        self.assertFalse(matches('vibes', 'Chill Vibe'))
+        self.assertFalse(matches('', 'anything'))
+        self.assertFalse(matches('!?', 'anything'))
+
+    def test_prefix_search_intersects_tokens(self):
+        self.assertEqual(['spotify:track:3', 'spotify:track:2'],
+                         [uri for uri, _, _ in self.index.search('track', 'bow')])
+        self.assertEqual([('spotify:track:2', 'Under Pressure', 'Queen, David Bowie')],
+                         self.index.search('track', 'queen dav'))
+        self.assertEqual(['spotify:track:4'], [uri for uri, _, _ in self.index.search('track', 'cafe')])
+        self.assertEqual([], self.index.search('track', 'queen heroes'))
+        self.assertEqual([], self.index.search('playlist', 'queen'))
+
+    def test_fuzzy_search(self):
+        self.assertEqual([], self.index.search('track', 'rhapsodie'))
+        self.assertEqual(['spotify:track:1'], [uri for uri, _, _ in self.index.search('track', 'rhapsodie', True)])
+
+    def test_incremental_update_and_remove(self):
+        self.index.search('track', 'xyz', True)
+        self.index.add('track', [('spotify:track:3', 'Heroes (Remastered)', 'David Bowie')])
+
+        self.assertEqual([('spotify:track:3', 'Heroes (Remastered)', 'David Bowie')],
+                         self.index.search('track', 'remastred', True))
+
+        self.index.remove(['spotify:track:3'])
+
+        self.assertEqual(['spotify:track:2'], [uri for uri, _, _ in self.index.search('track', 'bowie')])
+
+
+if __name__ == "__main__":
+    unittest.main()
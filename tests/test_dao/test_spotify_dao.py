@@ -0,0 +1,106 @@
+import unittest
+from unittest.mock import MagicMock
+from requests.models import Response
+from requests.exceptions import HTTPError
+from spoterm.dao.spotify_dao import SpotifyDao
+from spoterm.dao.http_cache import HttpCache
+from spoterm.dao.request_scheduler import RequestScheduler
+
+
+def _response(status_code, content=b'', headers=None):
+    response = Response()
+    response.status_code = status_code
+    response._content = content
+    response.headers.update(headers or {})
+    return response
+
+
+class TestSpotifyDao(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_token_provider = MagicMock()
+        self.mock_token_provider.get_token.return_value = 'token'
+        self.mock_session = MagicMock()
+        self.scheduler = RequestScheduler(sleep=lambda _: None)
+        self.dao = SpotifyDao(self.mock_token_provider, self.mock_session, self.scheduler)
+
+    def test_get(self):
+        self.mock_session.request.return_value = _response(200, b'{"items": []}')
+
+        self.assertEqual({'items': []}, self.dao.get('url'))
+        self.mock_session.request.assert_called_with('GET', 'url', headers={'Authorization': 'Bearer token'},
+                                                     data=None)
+
+    def test_get_projects_fields(self):
+        self.mock_session.request.return_value = _response(200, b'{"tracks": [{"uri": "u", "popularity": 1}]}')
+
+        self.assertEqual({'tracks': [{'uri': 'u'}]}, self.dao.get('url', fields='tracks(uri)'))
+
+    def test_get_server_side_fields(self):
+        self.mock_session.request.return_value = _response(200, b'{"snapshot_id": "s"}')
+
+        self.assertEqual({'snapshot_id': 's'}, self.dao.get('https://api/v1/playlists/p', fields='snapshot_id'))
+        self.mock_session.request.assert_called_with('GET', 'https://api/v1/playlists/p?fields=snapshot_id',
+                                                     headers={'Authorization': 'Bearer token'}, data=None)
+
+    def test_get_retries_rate_limited(self):
+        self.mock_session.request.side_effect = [_response(429), _response(200, b'{"items": []}')]
+
+        self.assertEqual({'items': []}, self.dao.get('url'))
+        self.assertEqual(2, self.mock_session.request.call_count)
+        self.assertEqual(1, self.scheduler.stats.rate_limited)
+
+    def test_get_failed(self):
+        self.mock_session.request.return_value = _response(404, b'{"error": {"status": 404}}')
+
+        with self.assertRaises(HTTPError):
+            self.dao.get('url')
+
+    def test_get_cached(self):
+        self.dao.cache = HttpCache(':memory:')
+        self.mock_session.request.side_effect = [_response(200, b'{"items": [1]}', {'ETag': '"v1"'}),
+                                                 _response(304)]
+
+        self.assertEqual({'items': [1]}, self.dao.get('url'))
+        self.assertEqual({'items': [1]}, self.dao.get('url'))
+        self.mock_session.request.assert_called_with('GET', 'url', headers={'Authorization': 'Bearer token',
+                                                                            'If-None-Match': '"v1"'},
+                                                     data=None)
+        self.assertEqual(1, self.dao.cache.hits)
+        self.assertEqual(1, self.dao.cache.misses)
+
+    def test_put(self):
+        self.mock_session.request.return_value = _response(202)
+
+        self.assertEqual(202, self.dao.put('url', 'image/jpeg', b'data'))
+        self.mock_session.request.assert_called_with('PUT', 'url', headers={'Authorization': 'Bearer token',
+                                                                            'Content-Type': 'image/jpeg'},
+                                                     data=b'data')
+
+    def test_post_server_error_not_retried(self):
+        self.mock_session.request.side_effect = [_response(502), _response(201, b'{"snapshot_id": "s"}')]
+
+        with self.assertRaises(HTTPError):
+            self.dao.post('url', '{}')
+        self.assertEqual(1, self.mock_session.request.call_count)
+
+    def test_send(self):
+        self.mock_session.request.return_value = _response(201, b'{"snapshot_id": "s"}')
+
+        self.assertEqual({'snapshot_id': 's'}, self.dao.send('POST', 'url', '{}'))
+
+    def test_hooks(self):
+        events = []
+        self.dao.hooks.append(events.append)
+        self.mock_session.request.side_effect = [_response(503), _response(200, b'{"items": []}')]
+
+        self.dao.get('https://api.spotify.com/v1/playlists/37i9dQZF1DXcBWIGoYBM5M/tracks?offset=0')
+
+        self.assertEqual(1, len(events))
+        self.assertEqual(('GET', '/v1/playlists/{id}/tracks', 200, 13, 1),
+                         (events[0].method, events[0].endpoint, events[0].status, events[0].response_bytes,
+                          events[0].retries))
+
+
+if __name__ == "__main__":
+    unittest.main()
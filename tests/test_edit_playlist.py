@@ -0,0 +1,262 @@
+import json
+import base64
+import threading
+import unittest
+from unittest.mock import MagicMock, call, patch
+from requests.exceptions import HTTPError
+from spoterm.dao.http_cache import HttpCache
+from spoterm.dao.request_scheduler import RequestScheduler
+from spoterm.dao.spotify_dao import SpotifyDao
+from spoterm.edit_playlist import sync_playlist, add_tracks_to_playlist, delete_tracks_from_playlist, WriteResult, \
+    PartialWriteError, load_manifest, iter_manifest_results, update_playlist_image, ManifestOperation, PlaylistResult, \
+    main
+from benchmarks.mock_spotify_api import MockSpotifyApi, JPEG_MAGIC
+
+
+def _status(status_code):
+    response = MagicMock()
+    response.status_code = status_code
+    return response
+
+
+class TestEditPlaylist(unittest.TestCase):
+
+    def setUp(self):
+        self.dao = MagicMock()
+        self.dao.get.return_value = {'items': [{'track': {'uri': 'spotify:track:a'}},
+                                               {'track': {'uri': 'spotify:track:b'}},
+                                               {'track': None},
+                                               {'track': {'uri': 'spotify:track:b'}}], 'total': 4}
+
+    def test_sync_playlist(self):
+        added, removed = sync_playlist(self.dao, 'pl', ['spotify:track:c', 'spotify:track:a'])
+
+        self.assertEqual(['spotify:track:c'], added)
+        self.assertEqual(['spotify:track:b'], removed)
+        self.assertEqual([call('DELETE', 'https://api.spotify.com/v1/playlists/pl/tracks',
+                               json.dumps({'tracks': [{'uri': 'spotify:track:b'}]}), 'application/json'),
+                          call('POST', 'https://api.spotify.com/v1/playlists/pl/tracks',
+                               json.dumps({'uris': ['spotify:track:c']}))], self.dao.send.call_args_list)
+
+    def test_sync_playlist_unchanged(self):
+        added, removed = sync_playlist(self.dao, 'pl', ['spotify:track:b', 'spotify:track:a'])
+
+        self.assertEqual(([], []), (added, removed))
+        self.dao.send.assert_not_called()
+
+    def _fake_playlist(self, fail=None, server_error=False):
+        playlist = ['spotify:track:existing']
+
+        def send(method, _, payload, *__):
+            body = json.loads(payload)
+            body.setdefault('position', len(playlist))
+            self.assertEqual('POST', method)
+            if body['position'] > len(playlist):
+                raise HTTPError('400 Client Error: Index out of bounds', response=_status(400))
+            if fail is not None and fail(body):
+                raise HTTPError('400 Client Error: Invalid track uri', response=_status(400))
+            playlist[body['position']:body['position']] = body['uris']
+            if server_error and body['uris'][0] == 'spotify:track:200' and not applied:
+                applied.append(True)
+                raise HTTPError('502 Server Error: Bad Gateway', response=_status(502))
+            return {'snapshot_id': f'snapshot{len(playlist)}'}
+
+        def get(url):
+            if 'offset=' in url:
+                offset, limit = int(url.split('offset=')[1]), int(url.split('limit=')[1].split('&')[0])
+                return {'items': [{'track': {'uri': u}} for u in playlist[offset:offset + limit]]}
+            return {'snapshot_id': f'snapshot{len(playlist)}', 'tracks': {'total': len(playlist)}}
+
+        applied = []
+        self.dao.send.side_effect = send
+        self.dao.get.side_effect = get
+        return playlist
+
+    def test_add_tracks_to_playlist_in_order(self):
+        playlist = self._fake_playlist()
+        track_uris = [f'spotify:track:{i}' for i in range(450)]
+        progress = MagicMock()
+
+        result = add_tracks_to_playlist(self.dao, 'pl', track_uris, position=1, progress=progress)
+
+        self.assertEqual(['spotify:track:existing'] + track_uris, playlist)
+        self.assertEqual(WriteResult('snapshot451', 5), result)
+        self.assertEqual(5, progress.call_count)
+        self.assertEqual(5, self.dao.send.call_count)
+
+    def test_add_tracks_to_playlist_does_not_retry_server_errors(self):
+        playlist = self._fake_playlist(server_error=True)
+        track_uris = [f'spotify:track:{i}' for i in range(250)]
+
+        with self.assertRaises(PartialWriteError) as error:
+            add_tracks_to_playlist(self.dao, 'pl', track_uris)
+
+        self.assertEqual((2, 'snapshot201'), (error.exception.written, error.exception.snapshot_id))
+        self.assertEqual(['spotify:track:existing'] + track_uris, playlist)
+        self.assertEqual(3, self.dao.send.call_count)
+
+    def _racing_playlist(self, landing_order):
+        playlist = ['spotify:track:existing', 'spotify:track:last']
+        landed = []
+        turn = threading.Condition()
+
+        def send(method, _, payload, *__):
+            body = json.loads(payload)
+            if method == 'PUT':
+                start, length = body['range_start'], body['range_length']
+                moved = playlist[start:start + length]
+                del playlist[start:start + length]
+                playlist[body['insert_before']:body['insert_before']] = moved
+                return {'snapshot_id': 'reordered'}
+            index = int(body['uris'][0].split(':')[-1]) // 100
+            with turn:
+                self.assertTrue(turn.wait_for(lambda: landing_order[len(landed)] == index, 5))
+                playlist[body['position']:body['position']] = body['uris']
+                landed.append(index)
+                turn.notify_all()
+            return {'snapshot_id': f'snapshot{len(landed)}'}
+
+        def get(url):
+            if 'offset=' in url:
+                offset, limit = int(url.split('offset=')[1]), int(url.split('limit=')[1].split('&')[0])
+                return {'items': [{'track': {'uri': u}} for u in playlist[offset:offset + limit]]}
+            return {'snapshot_id': f'snapshot{len(landed)}', 'tracks': {'total': len(playlist)}}
+
+        self.dao.send.side_effect = send
+        self.dao.get.side_effect = get
+        return playlist
+
+    def test_add_tracks_to_playlist_concurrently_reorders_chunks(self):
+        playlist = self._racing_playlist([0, 2, 4, 1, 3])
+        track_uris = [f'spotify:track:{i}' for i in range(450)]
+        progress = MagicMock()
+
+        result = add_tracks_to_playlist(self.dao, 'pl', track_uris, 5, position=1, progress=progress)
+
+        self.assertEqual(['spotify:track:existing'] + track_uris + ['spotify:track:last'], playlist)
+        self.assertEqual(WriteResult('reordered', 5), result)
+        self.assertEqual(5, progress.call_count)
+        self.assertEqual(3, len([c for c in self.dao.send.call_args_list if c[0][0] == 'PUT']))
+
+    def test_add_tracks_to_playlist_concurrently_in_order(self):
+        playlist = self._racing_playlist([2, 1, 0])
+        track_uris = [f'spotify:track:{i}' for i in range(250)]
+
+        result = add_tracks_to_playlist(self.dao, 'pl', track_uris, 3)
+
+        self.assertEqual(['spotify:track:existing', 'spotify:track:last'] + track_uris, playlist)
+        self.assertEqual(WriteResult('snapshot3', 3), result)
+        self.assertEqual(3, self.dao.send.call_count)
+
+    def test_add_tracks_to_playlist_concurrently_against_mock_api(self):
+        token_provider = MagicMock()
+        token_provider.get_token.return_value = 'token'
+        dao = SpotifyDao(token_provider, scheduler=RequestScheduler(backoff_base=0))
+        track_uris = [f'spotify:track:new{i}' for i in range(950)]
+        with MockSpotifyApi(playlists=1, tracks_per_playlist=10, latency=0.001) as server, \
+                patch('spoterm.edit_playlist.API_URL', server.api_url):
+            playlist_id = server.playlist_ids[0]
+            existing = list(server.playlist(playlist_id))
+
+            add_tracks_to_playlist(dao, playlist_id, track_uris, 4, position=5)
+
+            self.assertEqual(existing[:5] + track_uris + existing[5:], server.playlist(playlist_id))
+
+    def test_add_tracks_to_playlist_stops_on_client_error(self):
+        playlist = self._fake_playlist(lambda body: 'bad' in body['uris'])
+        track_uris = [f'spotify:track:{i}' for i in range(150)] + ['bad'] + [f'spotify:track:x{i}' for i in range(100)]
+
+        with self.assertRaises(PartialWriteError) as error:
+            add_tracks_to_playlist(self.dao, 'pl', track_uris, position=1)
+
+        self.assertEqual((1, 'snapshot101'), (error.exception.written, error.exception.snapshot_id))
+        self.assertEqual(101, len(playlist))
+        self.assertEqual(2, self.dao.send.call_count)
+
+    def test_delete_tracks_from_playlist_with_positions(self):
+        self.dao.send.return_value = {'snapshot_id': 'snap2'}
+
+        result = delete_tracks_from_playlist(self.dao, 'pl', ['spotify:track:a'], positions={'spotify:track:a': [0, 3]},
+                                             snapshot_id='snap1')
+
+        self.assertEqual(WriteResult('snap2', 1), result)
+        self.dao.send.assert_called_once_with(
+            'DELETE', 'https://api.spotify.com/v1/playlists/pl/tracks',
+            json.dumps({'tracks': [{'uri': 'spotify:track:a', 'positions': [0, 3]}], 'snapshot_id': 'snap1'}),
+            'application/json'
+        )
+
+
+    def test_load_manifest(self):
+        jsonl = ['{"playlist": "spotify:playlist:a", "op": "add", "uris": ["spotify:track:x", "spotify:track:x"]}\n',
+                 '\n',
+                 '{"playlist": "b", "op": "image", "image": "spotify:album:c"}\n']
+
+        self.assertEqual([ManifestOperation('a', 'add', ['spotify:track:x'], None),
+                          ManifestOperation('b', 'image', [], 'spotify:album:c')], load_manifest(jsonl))
+        self.assertEqual(load_manifest(jsonl), load_manifest(['[', ','.join(l for l in jsonl if l.strip()), ']']))
+        with self.assertRaises(ValueError):
+            load_manifest(['{"playlist": "a", "op": "rename"}'])
+        with self.assertRaises(ValueError):
+            load_manifest(['{"playlist": 1, "op": "add"}'])
+        for uris in ('"spotify:track:x"', '{"a": 1}', '["spotify:track:x", 2]'):
+            with self.assertRaisesRegex(ValueError, 'line 1: uris must be a list'):
+                load_manifest(['{"playlist": "a", "op": "add", "uris": ' + uris + '}'])
+
+    def test_manifest_rejects_single_playlist_options(self):
+        for extra in (['--delete'], ['--sync'], ['--image', 'spotify:album:a'], ['spotify:track:a']):
+            with self.assertRaises(SystemExit), patch('sys.stderr'):
+                main(['--manifest', '-', '-c', 'id', '-s', 'secret'] + extra)
+
+    def test_iter_manifest_results_reports_sync_snapshot(self):
+        self.dao.get.side_effect = lambda url: {'snapshot_id': 'synced'} if 'fields=snapshot_id' in url \
+            else {'items': [{'track': {'uri': 'spotify:track:a'}}], 'total': 1}
+
+        results = list(iter_manifest_results(self.dao, [ManifestOperation('a', 'sync', ['spotify:track:a'], None)]))
+
+        self.assertEqual([PlaylistResult('a', 1, 'synced', None)], results)
+
+    def test_iter_manifest_results(self):
+        calls = []
+        lock = threading.Lock()
+
+        def write(_, url, payload, *__):
+            with lock:
+                calls.append((url.split('/')[-2], json.loads(payload)))
+            if url.split('/')[-2] == 'bad':
+                raise HTTPError('403')
+            return {'snapshot_id': f'{url.split("/")[-2]}{len(calls)}'}
+
+        self.dao.send.side_effect = write
+        operations = [ManifestOperation('a', 'add', ['spotify:track:1'], None),
+                      ManifestOperation('bad', 'add', ['spotify:track:1'], None),
+                      ManifestOperation('a', 'delete', ['spotify:track:2'], None),
+                      ManifestOperation('c', 'add', ['spotify:track:3'], None)]
+
+        results = sorted(iter_manifest_results(self.dao, operations, 1, 3))
+
+        self.assertEqual(['a', 'bad', 'c'], [r.playlist for r in results])
+        self.assertEqual((2, None), (results[0].operations, results[0].error))
+        self.assertEqual('0 of 1 chunks written before failing: 403', results[1].error)
+        a_calls = [body for playlist, body in calls if playlist == 'a']
+        self.assertEqual([{'uris': ['spotify:track:1']}, {'tracks': [{'uri': 'spotify:track:2'}]}], a_calls)
+        self.assertEqual(PlaylistResult('c', 1, results[2].snapshot_id, None), results[2])
+
+    def test_update_playlist_image_uses_smallest_fitting_rendition(self):
+        token_provider = MagicMock()
+        token_provider.get_token.return_value = 'token'
+        dao = SpotifyDao(token_provider, scheduler=RequestScheduler(backoff_base=0))
+        cache = HttpCache(':memory:')
+        with MockSpotifyApi(playlists=1, tracks_per_playlist=1) as server, \
+                patch('spoterm.edit_playlist.API_URL', server.api_url):
+            playlist_id = server.playlist_ids[0]
+            update_playlist_image(dao, playlist_id, 'spotify:album:a', cache)
+            update_playlist_image(dao, playlist_id, 'spotify:album:a', cache)
+
+            self.assertEqual(JPEG_MAGIC + bytes(300 * 300 // 2), base64.b64decode(server.covers[playlist_id]))
+            self.assertEqual({'a-300.jpg': 1}, dict(server.image_downloads))
+        cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
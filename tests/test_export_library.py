@@ -0,0 +1,77 @@
+import json
+import sqlite3
+import tempfile
+import unittest
+from contextlib import ExitStack
+from unittest.mock import MagicMock, patch
+from spoterm.dao.library_store import LibraryStore
+from spoterm.dao.request_scheduler import RequestScheduler
+from spoterm.dao.spotify_dao import SpotifyDao
+from spoterm.export_library import export_library, ExportSummary
+from benchmarks.mock_spotify_api import MockSpotifyApi
+
+
+class TestExportLibrary(unittest.TestCase):
+
+    def setUp(self):
+        token_provider = MagicMock()
+        token_provider.get_token.return_value = 'token'
+        self.dao = SpotifyDao(token_provider, scheduler=RequestScheduler(backoff_base=0))
+        self.stack = ExitStack()
+        self.server = self.stack.enter_context(MockSpotifyApi(playlists=3, tracks_per_playlist=120,
+                                                              followed_artists=60, saved_tracks=70))
+        for module in ('export_library', 'get_my_playlists', 'get_my_followed_artists', 'get_playlist_tracks'):
+            self.stack.enter_context(patch(f'spoterm.{module}.API_URL', self.server.api_url))
+        self.database = self.stack.enter_context(tempfile.TemporaryDirectory()) + '/library.sqlite'
+        self.store = LibraryStore(self.database)
+
+    def tearDown(self):
+        self.store.close()
+        self.stack.close()
+
+    def test_export_and_incremental_refresh(self):
+        self.assertEqual(ExportSummary(3, 0, 0, 360, 60, 0, 70), export_library(self.dao, self.store, 4))
+
+        playlist_id = self.server.playlist_ids[1]
+        self.dao.delete(f'{self.server.api_url}/playlists/{playlist_id}/tracks', 'application/json',
+                        json.dumps({'tracks': [{'uri': self.server.playlist(playlist_id)[0]}]}))
+        self.assertEqual(ExportSummary(1, 2, 0, 119, 0, 0, 0), export_library(self.dao, self.store, 4))
+
+        conn = sqlite3.connect(self.database)
+        self.assertEqual('wal', conn.execute('PRAGMA journal_mode').fetchone()[0])
+        rows = conn.execute('SELECT uri FROM playlist_tracks WHERE playlist_id = ? ORDER BY position',
+                            (playlist_id,)).fetchall()
+        self.assertEqual(self.server.playlist(playlist_id), [r[0] for r in rows])
+        self.assertEqual(70, conn.execute('SELECT COUNT(*) FROM saved_tracks').fetchone()[0])
+        self.assertEqual(60, conn.execute('SELECT COUNT(*) FROM followed_artists').fetchone()[0])
+        conn.close()
+
+    def test_search_exported_library(self):
+        export_library(self.dao, self.store, 4)
+        playlist_id = self.server.playlist_ids[2]
+        track = self.server.playlist(playlist_id)[5]
+
+        self.assertEqual([(f'spotify:playlist:{playlist_id}', f'Playlist {playlist_id}', None)],
+                         self.store.search('playlist', f'playlist {playlist_id.lower()}'))
+        self.assertEqual(3, len(self.store.search('playlist', 'PLAY')))
+        self.assertEqual(60, len(self.store.search('artist', 'artist')))
+        self.assertIn(track, [uri for uri, _, _ in self.store.search('track', f'track {track[-22:]}')])
+        self.assertIn(f'spotify:playlist:{playlist_id}', [uri for uri, _, _ in self.store.playlists_containing(track)])
+
+        self.dao.delete(f'{self.server.api_url}/playlists/{playlist_id}/tracks', 'application/json',
+                        json.dumps({'tracks': [{'uri': track}]}))
+        export_library(self.dao, self.store, 4)
+
+        self.assertNotIn(f'spotify:playlist:{playlist_id}',
+                         [uri for uri, _, _ in self.store.playlists_containing(track)])
+        self.assertNotIn(track, [uri for uri, _, _ in self.store.search('track', f'track {track[-22:]}')])
+        self.assertEqual(359 + 70, len(self.store.search('track', 'track')))
+
+    def test_full_export(self):
+        export_library(self.dao, self.store, 2)
+
+        self.assertEqual(ExportSummary(3, 0, 0, 360, 0, 0, 70), export_library(self.dao, self.store, 2, full=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
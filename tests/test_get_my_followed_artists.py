@@ -0,0 +1,66 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from spoterm.dao.request_scheduler import RequestScheduler
+from spoterm.dao.request_stats import RequestStats
+from spoterm.dao.spotify_dao import SpotifyDao
+from spoterm.get_my_followed_artists import get_my_followed_artists, iter_artist_details, _released_since
+from benchmarks.mock_spotify_api import MockSpotifyApi
+
+
+class TestGetMyFollowedArtists(unittest.TestCase):
+
+    def setUp(self):
+        token_provider = MagicMock()
+        token_provider.get_token.return_value = 'token'
+        self.stats = RequestStats()
+        self.dao = SpotifyDao(token_provider, scheduler=RequestScheduler(backoff_base=0), hooks=[self.stats.record])
+
+    def _requests(self, endpoint):
+        return sum(s.latency.count for (_, e), s in self.stats.endpoints.items() if e == endpoint)
+
+    def test_artist_details_fan_out(self):
+        with MockSpotifyApi(followed_artists=120) as server, \
+                patch('spoterm.get_my_followed_artists.API_URL', server.api_url):
+            artists = get_my_followed_artists(self.dao)
+            details = list(iter_artist_details(self.dao, artists, with_releases=True, with_top_tracks=True,
+                                               concurrency=8, since='2010-01-01'))
+
+        self.assertEqual([a['uri'] for a in artists], [d['uri'] for d in details])
+        self.assertEqual({'uri', 'name', 'genres', 'popularity', 'followers', 'releases', 'top_tracks'},
+                         set(details[7]))
+        self.assertEqual({'total': 7}, details[7]['followers'])
+        self.assertEqual(10, len(details[7]['top_tracks']))
+        self.assertTrue(all(r['release_date'][:4] >= '2010' for d in details for r in d['releases']))
+        self.assertEqual([('Release 8.2', '2010', 'year')],
+                         [(r['name'], r['release_date'], r['release_date_precision']) for r in details[8]['releases']])
+        self.assertEqual(3, self._requests('/v1/artists'))
+        self.assertEqual(120, self._requests('/v1/artists/{id}/albums'))
+        self.assertEqual(120, self._requests('/v1/artists/{id}/top-tracks'))
+
+    def test_releases_follow_next(self):
+        with MockSpotifyApi(followed_artists=2, releases_per_artist=120) as server, \
+                patch('spoterm.get_my_followed_artists.API_URL', server.api_url):
+            details = list(iter_artist_details(self.dao, get_my_followed_artists(self.dao), with_releases=True))
+
+        self.assertEqual([120, 120], [len(d['releases']) for d in details])
+        self.assertEqual(6, self._requests('/v1/artists/{id}/albums'))
+
+    def test_released_since(self):
+        self.assertTrue(_released_since({'release_date': '2010', 'release_date_precision': 'year'}, '2010-06-01'))
+        self.assertTrue(_released_since({'release_date': '2010-06', 'release_date_precision': 'month'}, '2010-06-15'))
+        self.assertFalse(_released_since({'release_date': '2010-05', 'release_date_precision': 'month'}, '2010-06-01'))
+        self.assertFalse(_released_since({'release_date': '2010-05-31', 'release_date_precision': 'day'}, '2010-06-01'))
+        self.assertFalse(_released_since({'release_date': None}, '2010-06-01'))
+
+    def test_artist_details_without_fan_out(self):
+        with MockSpotifyApi(followed_artists=60) as server, \
+                patch('spoterm.get_my_followed_artists.API_URL', server.api_url):
+            details = list(iter_artist_details(self.dao, get_my_followed_artists(self.dao), concurrency=4))
+
+        self.assertEqual(60, len(details))
+        self.assertNotIn('releases', details[0])
+        self.assertEqual(0, self._requests('/v1/artists/{id}/albums'))
+
+
+if __name__ == "__main__":
+    unittest.main()
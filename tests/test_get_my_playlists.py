@@ -0,0 +1,20 @@
+import unittest
+from spoterm.get_my_playlists import filter_playlists
+
+
+class TestGetMyPlaylists(unittest.TestCase):
+
+    def test_filter_playlists(self):
+        playlists = [{'name': 'Chill Vibes'}, {'name': 'Workout mix'}, {'name': None}]
+
+        self.assertEqual(playlists, filter_playlists(playlists))
+        self.assertEqual([{'name': 'Chill Vibes'}], filter_playlists(playlists, 'ill Vib'))
+        self.assertEqual([], filter_playlists(playlists, 'chill'))
+        self.assertEqual([{'name': 'Chill Vibes'}], filter_playlists(playlists, search='chill vib'))
+        self.assertEqual([], filter_playlists(playlists, search='ill'))
+        self.assertEqual([], filter_playlists(playlists, search='!'))
+        self.assertEqual([{'name': 'Workout mix'}], filter_playlists(playlists, 'mix', 'work'))
+
+
+if __name__ == "__main__":
+    unittest.main()
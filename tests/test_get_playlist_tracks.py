@@ -0,0 +1,89 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from urllib.parse import urlparse, parse_qs
+from spoterm.get_playlist_tracks import get_playlist_tracks, sync_playlist_tracks, PlaylistSync
+from spoterm.dao.playlist_mirror import PlaylistMirror
+from spoterm.dao.spotify_dao import SpotifyDao
+from spoterm.dao.request_scheduler import RequestScheduler
+from benchmarks.mock_spotify_api import MockSpotifyApi
+
+
+def _fake_get(totals, snapshots=None):
+    def get(url):
+        parsed = urlparse(url)
+        if not parsed.path.endswith('/tracks'):
+            return {'snapshot_id': snapshots[parsed.path.split('/')[-1]]}
+        playlist_id = parsed.path.split('/')[-2]
+        params = parse_qs(parsed.query)
+        offset, limit = int(params['offset'][0]), int(params['limit'][0])
+        end = min(offset + limit, totals[playlist_id])
+        items = [{'track': {'uri': f'spotify:track:{playlist_id}{i}'}} for i in range(offset, end)]
+        return {'items': items, 'total': totals[playlist_id]}
+    return get
+
+
+class TestGetPlaylistTracks(unittest.TestCase):
+
+    def test_get_playlist_tracks(self):
+        dao = MagicMock()
+        dao.get.side_effect = _fake_get({'a': 250, 'b': 0, 'c': 100})
+
+        playlist_tracks = get_playlist_tracks(dao, ['spotify:playlist:a', 'b', 'spotify:playlist:c'], 4)
+
+        self.assertEqual(['spotify:playlist:a', 'b', 'spotify:playlist:c'], list(playlist_tracks.keys()))
+        self.assertEqual([f'spotify:track:a{i}' for i in range(250)], list(playlist_tracks['spotify:playlist:a']))
+        self.assertEqual([], playlist_tracks['b'])
+        self.assertEqual(100, len(playlist_tracks['spotify:playlist:c']))
+        self.assertEqual(5, dao.get.call_count)
+
+    def test_sync_playlist_tracks(self):
+        mirror = PlaylistMirror(':memory:')
+        mirror.put('a', 'a1', ['spotify:track:a0', 'spotify:track:old'])
+        mirror.put('b', 'b1', ['spotify:track:b0'])
+        dao = MagicMock()
+        dao.get.side_effect = _fake_get({'a': 2, 'b': 1, 'c': 1}, {'a': 'a2', 'b': 'b1', 'c': 'c1'})
+
+        synced = list(sync_playlist_tracks(dao, mirror, ['a', 'b', 'c'], 2))
+
+        self.assertEqual([
+            PlaylistSync('a', ['spotify:track:a0', 'spotify:track:a1'], ['spotify:track:a1'], ['spotify:track:old']),
+            PlaylistSync('b', ['spotify:track:b0'], [], []),
+            PlaylistSync('c', ['spotify:track:c0'], ['spotify:track:c0'], [])
+        ], synced)
+        self.assertEqual(5, dao.get.call_count)
+        self.assertEqual('a2', mirror.get('a').snapshot_id)
+        self.assertEqual(['spotify:track:c0'], mirror.get('c').tracks)
+
+    def test_sync_playlist_tracks_reads_playlists_lazily(self):
+        mirror = PlaylistMirror(':memory:')
+        dao = MagicMock()
+        dao.get.side_effect = _fake_get({'a': 1, 'b': 1}, {'a': 'a1', 'b': 'b1'})
+        read = []
+
+        def playlists():
+            for playlist in ('a', 'b'):
+                read.append(playlist)
+                yield playlist
+
+        with patch('spoterm.get_playlist_tracks.SYNC_BATCH_SIZE', 1):
+            synced = sync_playlist_tracks(dao, mirror, playlists())
+            self.assertEqual('a', next(synced).playlist)
+            self.assertEqual(['a'], read)
+            self.assertEqual(['b'], [s.playlist for s in synced])
+
+    def test_get_playlist_tracks_against_mock_api_with_errors(self):
+        token_provider = MagicMock()
+        token_provider.get_token.return_value = 'token'
+        dao = SpotifyDao(token_provider, scheduler=RequestScheduler(backoff_base=0, max_retries=20))
+
+        with MockSpotifyApi(playlists=3, tracks_per_playlist=230, error_rate=0.2, rate_limit_rate=0.1) as server, \
+                patch('spoterm.get_playlist_tracks.API_URL', server.api_url):
+            playlist_tracks = get_playlist_tracks(dao, server.playlist_ids, 4)
+
+            for playlist_id in server.playlist_ids:
+                self.assertEqual(server.playlist(playlist_id), playlist_tracks[playlist_id])
+            self.assertGreater(server.statuses[429] + server.statuses[503], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
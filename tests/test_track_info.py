@@ -0,0 +1,123 @@
+import io
+import unittest
+from unittest.mock import MagicMock
+from urllib.parse import urlparse, parse_qs
+from spoterm.config.env import API_URL
+from spoterm.dao.entity_store import EntityStore
+from spoterm.track_info import get_track_data, write_track_data, track_fields, TRACK_FIELDS, STORED_TRACK_FIELDS
+
+
+def _fake_get(url, fields=None):
+    parsed = urlparse(url)
+    ids = parse_qs(parsed.query)['ids'][0].split(',')
+    if parsed.path.endswith('/audio-features'):
+        return {'audio_features': [{'uri': f'spotify:track:{i}', 'tempo': int(i) + 0.4} for i in reversed(ids)]}
+    return {'tracks': [{'uri': f'spotify:track:{i}', 'name': f'name{i}', 'artists': [{'name': 'a'}, {'name': 'b'}],
+                        'duration_ms': 61000, 'album': {'name': 'album', 'release_date': '2020'}} for i in ids]}
+
+
+class TestTrackInfo(unittest.TestCase):
+
+    def test_get_track_data(self):
+        dao = MagicMock()
+        dao.get.side_effect = _fake_get
+        track_uris = [f'spotify:track:{i}' for i in range(120)]
+
+        track_data = get_track_data(dao, track_uris, True, True, False, True, 3)
+
+        self.assertEqual(6, dao.get.call_count)
+        self.assertEqual(track_uris, [t['uri'] for t in track_data])
+        self.assertEqual({'uri': 'spotify:track:7', 'name': 'name7', 'artists': 'a, b', 'duration': '01:01',
+                          'BPM': 7, 'release': '2020'}, track_data[7])
+
+    def test_get_track_data_missing_audio_features(self):
+        dao = MagicMock()
+        dao.get.side_effect = lambda url, fields=None: \
+            {'audio_features': [{'uri': 'spotify:track:1', 'tempo': 120}, None]} if '/audio-features' in url \
+            else _fake_get(url)
+
+        track_data = get_track_data(dao, ['spotify:track:1', 'spotify:track:2'], True, False, False, False)
+
+        self.assertEqual([120, None], [t['BPM'] for t in track_data])
+
+    def test_get_track_data_no_bpm(self):
+        dao = MagicMock()
+        dao.get.side_effect = _fake_get
+
+        track_data = get_track_data(dao, ['spotify:track:1'], False, False, True, False)
+
+        dao.get.assert_called_once_with(f'{API_URL}/tracks?ids=1', fields=TRACK_FIELDS)
+        self.assertEqual([{'name': 'name1', 'artists': 'a, b', 'duration': '01:01', 'album': 'album'}], track_data)
+
+    def test_get_track_data_from_entity_store(self):
+        dao = MagicMock()
+        dao.get.side_effect = _fake_get
+        store = EntityStore(':memory:')
+        track_uris = [f'spotify:track:{i}' for i in range(60)]
+
+        first = get_track_data(dao, track_uris[:30], True, True, False, True, 2, store)
+        dao.get.reset_mock()
+        second = get_track_data(dao, track_uris, True, True, False, True, 2, store)
+
+        self.assertEqual(first, second[:30])
+        self.assertEqual(track_uris, [t['uri'] for t in second])
+        self.assertEqual(30, second[30]['BPM'])
+        self.assertEqual(4, dao.get.call_count)
+        dao.get.assert_any_call(f'{API_URL}/tracks?ids=' + '%2C'.join(str(i) for i in range(50, 60)),
+                                fields=STORED_TRACK_FIELDS)
+        self.assertEqual((60, 120), (store.stats()['hits'], store.stats()['misses']))
+        store.close()
+
+    def test_entity_store_caches_missing_audio_features_and_related_entities(self):
+        album = {'uri': 'spotify:album:x', 'name': 'album', 'release_date': '2020'}
+        artists = [{'uri': 'spotify:artist:y', 'name': 'a'}]
+        dao = MagicMock()
+        dao.get.side_effect = lambda url, fields=None: \
+            {'audio_features': [None, {'uri': 'spotify:track:1', 'tempo': 120}]} if '/audio-features' in url \
+            else {'tracks': [dict(t, album=album, artists=artists) for t in _fake_get(url)['tracks']]}
+        store = EntityStore(':memory:')
+        track_uris = ['spotify:track:1', 'spotify:track:2']
+
+        first = get_track_data(dao, track_uris, True, False, False, False, 1, store)
+        dao.get.reset_mock()
+        second = get_track_data(dao, track_uris, True, False, False, False, 1, store)
+
+        self.assertEqual([120, None], [t['BPM'] for t in second])
+        self.assertEqual(first, second)
+        dao.get.assert_not_called()
+        self.assertEqual({'2': {}}, store.get_many('audio_features', ['2']))
+        self.assertEqual(['x'], list(store.get_many('album', ['x'])))
+        self.assertEqual({'y': {'uri': 'spotify:artist:y', 'name': 'a'}}, store.get_many('artist', ['y']))
+        store.close()
+
+    def test_write_track_data(self):
+        batches = [[{'name': 'a', 'artists': 'x, y'}], [], [{'name': 'b', 'artists': 'z'}]]
+        expected = {
+            'ndjson': '{"name": "a", "artists": "x, y"}\n{"name": "b", "artists": "z"}\n',
+            'csv': 'name,artists\na,"x, y"\nb,z\n',
+            'tsv': 'name\tartists\na\tx, y\nb\tz\n'
+        }
+        for output_format, output in expected.items():
+            out = io.StringIO()
+            self.assertEqual(2, write_track_data(iter(batches), output_format, out))
+            self.assertEqual(output, out.getvalue())
+
+
+    def test_write_track_data_fieldnames_from_flags(self):
+        dao = MagicMock()
+        dao.get.side_effect = lambda url, fields=None: \
+            {'audio_features': [None] * 50} if '/audio-features' in url else _fake_get(url)
+        fieldnames = track_fields(True, False, True, True)
+        out = io.StringIO()
+
+        batches = [[{'uri': 'u', 'name': 'a', 'artists': 'x', 'duration': '01:00', 'release': '2020'}],
+                   [{'uri': 'v', 'name': 'b', 'artists': 'y', 'duration': '02:00', 'BPM': 120, 'release': '2021'}]]
+        write_track_data(iter(batches), 'csv', out, fieldnames)
+
+        self.assertEqual('uri,name,artists,duration,BPM,release\nu,a,x,01:00,,2020\nv,b,y,02:00,120,2021\n',
+                         out.getvalue())
+        self.assertEqual(fieldnames, list(get_track_data(dao, ['spotify:track:1'], True, True, False, True)[0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
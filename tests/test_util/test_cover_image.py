@@ -0,0 +1,91 @@
+import base64
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from spoterm.dao.http_cache import HttpCache
+from spoterm.util import cover_image
+from spoterm.util.cover_image import choose_renditions, download_image, fit_jpeg, fetch_cover, read_image_file, \
+    JPEG_MAGIC, MAX_JPEG_BYTES
+
+
+def _response(body, chunk=1000):
+    resp = MagicMock()
+    resp.__enter__.return_value = resp
+    resp.headers = {'Content-Length': str(len(body)), 'ETag': '"e"'}
+    resp.iter_content.return_value = [body[i:i + chunk] for i in range(0, len(body), chunk)]
+    return resp
+
+
+class TestCoverImage(unittest.TestCase):
+
+    def test_choose_renditions(self):
+        images = [{'url': 'big', 'width': 640}, {'url': 'unknown', 'width': None}, {'url': 'medium', 'width': 300},
+                  {'url': 'tiny', 'width': 64}]
+
+        self.assertEqual(['medium', 'big', 'tiny', 'unknown'], choose_renditions(images))
+        self.assertEqual([], choose_renditions([]))
+
+    def test_fit_jpeg_keeps_small_jpeg(self):
+        data = JPEG_MAGIC + bytes(100)
+
+        self.assertIs(data, fit_jpeg(data))
+
+    @unittest.skipIf(cover_image.Image is not None, 'Pillow is installed')
+    def test_fit_jpeg_without_pillow(self):
+        with self.assertRaises(ValueError):
+            fit_jpeg(JPEG_MAGIC + bytes(MAX_JPEG_BYTES))
+        with self.assertRaises(ValueError):
+            fit_jpeg(b'\x89PNG' + bytes(10))
+
+    @unittest.skipIf(cover_image.Image is None, 'Pillow is not installed')
+    def test_fit_jpeg_downsizes(self):
+        import io
+        import random
+        rand = random.Random(0)
+        image = cover_image.Image.frombytes('RGB', (1000, 1000), bytes(rand.getrandbits(8) for _ in range(3000000)))
+        png = io.BytesIO()
+        image.save(png, 'PNG')
+
+        fitted = fit_jpeg(png.getvalue())
+
+        self.assertTrue(fitted.startswith(JPEG_MAGIC))
+        self.assertLessEqual(len(fitted), MAX_JPEG_BYTES)
+
+    def test_download_image_streams_and_caches(self):
+        session = MagicMock()
+        session.get.return_value = _response(JPEG_MAGIC + bytes(5000))
+        cache = HttpCache(':memory:')
+
+        self.assertEqual(JPEG_MAGIC + bytes(5000), download_image(session, 'url', cache))
+        self.assertEqual(JPEG_MAGIC + bytes(5000), download_image(session, 'url', cache))
+
+        session.get.assert_called_once_with('url', stream=True)
+        self.assertEqual(1, cache.stats()['hits'])
+        cache.close()
+
+    def test_download_image_rejects_oversized_body(self):
+        session = MagicMock()
+        session.get.return_value = _response(bytes(3000))
+        session.get.return_value.headers = {}
+
+        with patch.object(cover_image, 'MAX_DOWNLOAD_BYTES', 2000), self.assertRaises(ValueError):
+            download_image(session, 'url')
+
+    def test_fetch_cover_falls_back_to_next_rendition(self):
+        session = MagicMock()
+        session.get.side_effect = [_response(JPEG_MAGIC + bytes(MAX_JPEG_BYTES)), _response(JPEG_MAGIC + bytes(10))]
+
+        cover = fetch_cover(session, ['large', 'small'])
+
+        self.assertEqual(JPEG_MAGIC + bytes(10), base64.b64decode(cover))
+
+    def test_read_image_file(self):
+        with tempfile.NamedTemporaryFile() as image_file:
+            image_file.write(JPEG_MAGIC + bytes(10))
+            image_file.flush()
+
+            self.assertEqual(JPEG_MAGIC + bytes(10), read_image_file(image_file.name))
+
+
+if __name__ == "__main__":
+    unittest.main()
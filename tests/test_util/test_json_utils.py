@@ -0,0 +1,36 @@
+import unittest
+from spoterm.util.json_utils import loads, parse_fields, project
+from spoterm.dao.fields import apply_fields
+
+
+class TestJsonUtils(unittest.TestCase):
+
+    def test_loads(self):
+        self.assertEqual({'a': [1, None]}, loads(b'{"a": [1, null]}'))
+
+    def test_parse_fields(self):
+        self.assertEqual({'tracks': {'uri': None, 'artists': {'name': None}, 'album': {'name': None}}},
+                         parse_fields('tracks(uri,artists(name),album.name)'))
+        self.assertEqual({'items': {'track': None}}, parse_fields('items.track,items.track.uri'))
+        with self.assertRaises(ValueError):
+            parse_fields('tracks(uri))')
+        with self.assertRaises(ValueError):
+            parse_fields('tracks(uri,artists(name)')
+
+    def test_project(self):
+        data = {'tracks': [{'uri': 'u', 'popularity': 1, 'artists': [{'name': 'a', 'id': 'i'}]}, None], 'next': 'n'}
+
+        self.assertEqual({'tracks': [{'uri': 'u', 'artists': [{'name': 'a'}]}, None]},
+                         project(data, parse_fields('tracks(uri,artists(name),album(name))')))
+
+    def test_apply_fields(self):
+        self.assertEqual(('https://api/v1/tracks?ids=1', {'tracks': {'uri': None}}),
+                         apply_fields('https://api/v1/tracks?ids=1', 'tracks(uri)'))
+        self.assertEqual(('https://api/v1/playlists/p/tracks?limit=1&fields=items(track(uri)),total', None),
+                         apply_fields('https://api/v1/playlists/p/tracks?limit=1', 'items(track(uri)),total'))
+        with self.assertRaises(ValueError):
+            apply_fields('https://api/v1/playlists/p?fields=snapshot_id', 'name')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+from spoterm.util.track_id_store import TrackIdStore
+
+
+TRACK = 'spotify:track:4uLU6hMCjMI75M1A2tKUQC'
+EPISODE = 'spotify:episode:512ojhOuo1ktJprKbVcKyQ'
+LOCAL = 'spotify:local:Artist:Album:Title:180'
+
+
+class TestTrackIdStore(unittest.TestCase):
+
+    def test_round_trip(self):
+        store = TrackIdStore([TRACK, LOCAL, EPISODE])
+
+        self.assertEqual([TRACK, LOCAL, EPISODE], list(store))
+        self.assertEqual(3, len(store))
+        self.assertEqual(EPISODE, store[-1])
+        self.assertEqual([LOCAL, EPISODE], store[1:])
+        self.assertEqual(store, [TRACK, LOCAL, EPISODE])
+        with self.assertRaises(IndexError):
+            store[3]  # pylint: disable=pointless-statement
+
+    def test_from_items_skips_unavailable_tracks(self):
+        store = TrackIdStore.from_items([{'track': {'uri': TRACK}}, {'track': None}, {'track': {'uri': LOCAL}}])
+
+        self.assertEqual([TRACK, LOCAL], list(store))
+
+    def test_extend(self):
+        store = TrackIdStore([TRACK])
+        store.extend(TrackIdStore([LOCAL, EPISODE]))
+        store.extend([TRACK])
+
+        self.assertEqual([TRACK, LOCAL, EPISODE, TRACK], list(store))
+
+    def test_records(self):
+        store = TrackIdStore.from_items([{'track': {'uri': TRACK, 'name': 'a'}, 'added_at': '2021-01-01'},
+                                         {'track': {'uri': LOCAL}, 'added_at': '2021-01-02'}],
+                                        fields=('added_at', 'track.name'))
+        store.extend(TrackIdStore.from_items([{'track': {'uri': EPISODE, 'name': 'c'}, 'added_at': None}],
+                                             fields=('added_at', 'track.name')))
+
+        records = list(store.records())
+        self.assertEqual([(TRACK, '2021-01-01', 'a'), (LOCAL, '2021-01-02', None), (EPISODE, None, 'c')],
+                         [(r.uri, r.added_at, r.track_name) for r in records])
+        with self.assertRaises(AttributeError):
+            records[0].other = 1
+        with self.assertRaises(ValueError):
+            next(TrackIdStore([TRACK]).records())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import io
+import unittest
+from spoterm.util.uri_reader import iter_uris, iter_uri_batches
+
+
+class TestUriReader(unittest.TestCase):
+
+    def test_iter_uris(self):
+        lines = io.StringIO('spotify:track:a spotify:track:b\n\n  \nspotify:track:a\tspotify:track:c  \n')
+
+        self.assertEqual(['spotify:track:a', 'spotify:track:b', 'spotify:track:c'], list(iter_uris(lines)))
+
+    def test_iter_uris_keep_duplicates(self):
+        self.assertEqual(['a', 'a'], list(iter_uris(['a', 'a'], unique=False)))
+
+    def test_iter_uri_batches(self):
+        lines = (f'spotify:track:{i}\n' for i in range(5))
+
+        self.assertEqual([['spotify:track:0', 'spotify:track:1'], ['spotify:track:2', 'spotify:track:3'],
+                          ['spotify:track:4']], list(iter_uri_batches(lines, 2)))
+
+    def test_iter_uri_batches_lazy(self):
+        consumed = []
+
+        def lines():
+            for i in range(4):
+                consumed.append(i)
+                yield str(i)
+
+        batches = iter_uri_batches(lines(), 2)
+        self.assertEqual(['0', '1'], next(batches))
+        self.assertEqual([0, 1], consumed)
+
+    def test_iter_uri_batches_empty(self):
+        self.assertEqual([], list(iter_uri_batches(io.StringIO('\n \n'), 50)))
+
+
+if __name__ == "__main__":
+    unittest.main()